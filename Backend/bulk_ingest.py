@@ -0,0 +1,648 @@
+# bulk_ingest.py
+"""
+Bulk resume ingestion — POST /upload-resumes/batch and a CLI:
+
+    python bulk_ingest.py ../Dataset/Real/ACCOUNTANT --llm-workers 8
+
+Stages run concurrently, connected by bounded queues:
+  clean -> process pool over resume_cleaner.clean_resume_file, then a
+           duplicate check (dedup.py) so known resumes skip the later stages
+  llm   -> thread pool running the LLM passes for several resumes at once
+           (pass 1 and pass 2 of each resume run concurrently, or one
+           combined call with --extraction-mode combined)
+  embed -> batched embedding_service.encode
+  store -> batched Postgres inserts (one transaction per batch) + Neo4j sync
+  faiss -> a single faiss_store.add for the whole run
+
+Resumes committed to Postgres but missing from resume_faiss_map (a run that
+died before its FAISS stage) are re-added from candidate_embeddings at
+startup and after each run.
+"""
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import argparse
+import threading
+from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+from psycopg2.extras import execute_values
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from resume_cleaner import clean_resume_file_safe, save_cleaned_text
+from llm_processor import extract_structured_json, save_json_output
+from llm_pass_2 import infer_traits, save_traits_json
+from llm_combined import extract_combined, EXTRACTION_MODES, DEFAULT_EXTRACTION_MODE
+from embedding import flatten_resume_json
+from embedding_service import embedding_service
+from db import get_connection, release_connection
+from graph_builder import insert_candidate_graph
+from faiss_store import faiss_store, IndexLockedError
+from dedup import compute_fingerprint, find_duplicate_resume, save_fingerprint
+from candidate_repository import candidate_repository
+from skill_index import save_candidate_skills, candidate_skill_index
+from candidate_embeddings import save_candidate_embeddings, EMBEDDING_VERSION
+from upload_resume import UPLOAD_DIR, CLEANED_DIR, JSON_DIR, TRAITS_DIR, snippet_metadata_entry
+
+router = APIRouter()
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Server-side directories given to /upload-resumes/batch must live under this root
+BULK_INGEST_ROOT = os.path.realpath(os.getenv("BULK_INGEST_ROOT", ".."))
+
+DEFAULT_CLEAN_WORKERS = int(os.getenv("BULK_CLEAN_WORKERS", str(os.cpu_count() or 2)))
+DEFAULT_LLM_WORKERS = int(os.getenv("BULK_LLM_WORKERS", "4"))
+DEFAULT_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "32"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("BULK_QUEUE_SIZE", "64"))
+# While the server runs, only reconcile resumes stored this long ago so an upload
+# between its Postgres commit and its own FAISS add is not added twice
+RECONCILE_MIN_AGE_SECONDS = int(os.getenv("FAISS_RECONCILE_MIN_AGE_SECONDS", "300"))
+# pg_advisory_xact_lock key that serialises reconcile runs
+RECONCILE_LOCK_KEY = 7311001
+
+_DONE = object()   # end-of-stream marker passed down the queues
+
+
+# -------------------------
+# Pipeline plumbing
+# -------------------------
+class StageStats:
+    """Item counts and wall-clock throughput for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def done(self, items: int = 1, errors: int = 0):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+
+    def as_dict(self) -> dict:
+        elapsed = 0.0
+        if self.started is not None:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 2),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+class _QueueReader:
+    """Iterates a stage's input queue until the end-of-stream marker."""
+
+    def __init__(self, q: queue.Queue):
+        self.q = q
+        self.exhausted = False
+
+    def __iter__(self):
+        while True:
+            item = self.q.get()
+            if item is _DONE:
+                self.exhausted = True
+                return
+            yield item
+
+    def drain(self):
+        for _ in self:
+            pass
+
+
+def _run_stage(name, target, reader: Optional[_QueueReader], out_q: queue.Queue, *args):
+    """
+    Runs one stage in its own thread. Downstream always receives _DONE, and a
+    crashed stage keeps draining its input so upstream never blocks on a full queue.
+    """
+    try:
+        target(reader, out_q, *args)
+    except Exception:
+        logging.exception(f"Bulk ingestion stage '{name}' crashed")
+        if reader is not None and not reader.exhausted:
+            reader.drain()
+    finally:
+        out_q.put(_DONE)
+
+
+def _fail(item: dict, results: list, stats: StageStats, error: str):
+    logging.warning(f"Bulk ingestion failed for {item['file']}: {error}")
+    item["error"] = error
+    results.append(item)
+    stats.done(items=0, errors=1)
+
+
+# -------------------------
+# Stages
+# -------------------------
+def _clean_stage(_, out_q, paths, workers, stats, results):
+    stats.start()
+    seen_in_run = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, cleaned_text, error in pool.map(clean_resume_file_safe, paths, chunksize=4):
+            name = os.path.splitext(os.path.basename(path))[0]
+            item = {"file": path, "name": name}
+            if error:
+                _fail(item, results, stats, error)
+                continue
+
+            item["cleaned_text"] = cleaned_text
+            save_cleaned_text(cleaned_text, os.path.join(CLEANED_DIR, f"{name}_cleaned.txt"))
+            stats.done()
+
+            # Duplicates (already stored, or earlier in this run) never reach the LLM stage
+            item["fingerprint"] = compute_fingerprint(cleaned_text)
+            duplicate = seen_in_run.get(item["fingerprint"]["content_hash"]) \
+                or find_duplicate_resume(item["fingerprint"])
+            if duplicate:
+                item["duplicate"] = duplicate
+                item["resume_id"] = duplicate.get("resume_id")
+                results.append(item)
+                continue
+            seen_in_run[item["fingerprint"]["content_hash"]] = {
+                "file": path, "match_type": "exact", "hamming_distance": 0
+            }
+
+            out_q.put(item)   # blocks while downstream is saturated
+    stats.finish()
+
+
+def _run_llm_passes(item: dict, trait_pool: ThreadPoolExecutor, extraction_mode: str) -> dict:
+    try:
+        combined = None
+        if extraction_mode == "combined":
+            combined = extract_combined(item["cleaned_text"])
+            if not combined:
+                logging.warning(f"Combined extraction failed validation for {item['file']}; using two passes.")
+
+        if combined:
+            item["structured_json"], item["trait_json"] = combined
+        else:
+            # Pass 2 runs on its own pool while this worker runs pass 1
+            traits_future = trait_pool.submit(infer_traits, item["cleaned_text"])
+            item["structured_json"] = extract_structured_json(item["cleaned_text"])
+            item["trait_json"] = traits_future.result()
+
+        save_json_output(item["structured_json"], os.path.join(JSON_DIR, f"{item['name']}_structured.json"))
+        save_traits_json(item["trait_json"], os.path.join(TRAITS_DIR, f"{item['name']}_traits.json"))
+    except Exception as e:
+        item["error"] = str(e)
+    return item
+
+
+def _llm_stage(reader, out_q, workers, extraction_mode, stats, results):
+    stats.start()
+
+    def forward(futures):
+        for future in futures:
+            item = future.result()
+            if item.get("error"):
+                _fail(item, results, stats, item["error"])
+            else:
+                stats.done()
+                out_q.put(item)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=workers) as trait_pool:
+        in_flight = set()
+        for item in reader:
+            in_flight.add(pool.submit(_run_llm_passes, item, trait_pool, extraction_mode))
+            if len(in_flight) >= workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                forward(done)
+        forward(wait(in_flight).done)
+    stats.finish()
+
+
+def _embed_stage(reader, out_q, batch_size, stats, results):
+    stats.start()
+
+    def flush(batch):
+        ready, texts = [], []
+        for item in batch:
+            try:
+                texts.append(flatten_resume_json(item["structured_json"]))
+                ready.append(item)
+            except Exception as e:
+                _fail(item, results, stats, f"Embedding failed: {e}")
+        if not ready:
+            return
+        try:
+            vectors = embedding_service.encode(texts)
+        except Exception as e:
+            for item in ready:
+                _fail(item, results, stats, f"Embedding failed: {e}")
+            return
+        batch = ready
+        for item, text, vector in zip(batch, texts, vectors):
+            item["resume_text"] = text
+            item["embedding"] = vector
+            out_q.put(item)
+        stats.done(items=len(batch))
+
+    batch = []
+    for item in reader:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    stats.finish()
+
+
+def insert_resume_batch(cur, items: List[dict]) -> List[int]:
+    """
+    Insert resumes, structured JSON, traits, fingerprints, normalised skills and
+    embeddings for a batch; returns resume ids in input order.
+    """
+    resume_rows = execute_values(cur, """
+        INSERT INTO resumes (name, email, phone, raw_text, cleaned_text)
+        VALUES %s
+        RETURNING id
+    """, [
+        (
+            item["structured_json"].get('name'),
+            item["structured_json"].get('email'),
+            item["structured_json"].get('phone'),
+            item["cleaned_text"],
+            item["cleaned_text"]
+        )
+        for item in items
+    ], fetch=True)
+    resume_ids = [row[0] for row in resume_rows]
+
+    execute_values(cur, """
+        INSERT INTO resume_structured (resume_id, structured_json)
+        VALUES %s
+    """, [(rid, json.dumps(item["structured_json"])) for rid, item in zip(resume_ids, items)])
+
+    execute_values(cur, """
+        INSERT INTO resume_traits (resume_id, leadership, communication,
+            analytical_thinking, ownership, problem_solving, attention_to_detail)
+        VALUES %s
+    """, [
+        (
+            rid,
+            item["trait_json"].get('leadership', 0.0),
+            item["trait_json"].get('communication', 0.0),
+            item["trait_json"].get('analytical_thinking', 0.0),
+            item["trait_json"].get('ownership', 0.0),
+            item["trait_json"].get('problem_solving', 0.0),
+            item["trait_json"].get('attention_to_detail', 0.0)
+        )
+        for rid, item in zip(resume_ids, items)
+    ])
+
+    for rid, item in zip(resume_ids, items):
+        save_fingerprint(cur, rid, item["fingerprint"])
+        save_candidate_skills(cur, rid, item["structured_json"])
+    save_candidate_embeddings(cur, [(rid, item["embedding"]) for rid, item in zip(resume_ids, items)])
+    return resume_ids
+
+
+def _store_stage(reader, out_q, batch_size, stats, results):
+    stats.start()
+
+    def flush(batch):
+        conn = get_connection()
+        cur = conn.cursor()
+        try:
+            resume_ids = insert_resume_batch(cur, batch)
+            conn.commit()
+            candidate_skill_index.invalidate(resume_ids)
+            for rid in resume_ids:
+                candidate_repository.invalidate(rid)
+        except Exception as e:
+            conn.rollback()
+            for item in batch:
+                _fail(item, results, stats, f"Database insert failed: {e}")
+            return
+        finally:
+            cur.close()
+            release_connection(conn)
+
+        for resume_id, item in zip(resume_ids, batch):
+            item["resume_id"] = int(resume_id)
+            try:
+                insert_candidate_graph(
+                    resume_id=resume_id,
+                    structured_json=item["structured_json"],
+                    traits=item["trait_json"]
+                )
+            except Exception as neo_err:
+                logging.warning(f"Neo4j sync failed for resume {resume_id}: {neo_err}")
+            out_q.put(item)
+        stats.done(items=len(batch))
+
+    batch = []
+    for item in reader:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    stats.finish()
+
+
+def _faiss_stage(items: List[dict], stats: StageStats, results: list):
+    """Add every stored resume to FAISS in one call and record the mapping in Postgres."""
+    stats.start()
+    if items:
+        faiss_ids = faiss_store.add(
+            np.stack([item["embedding"] for item in items]),
+            [
+                (item["resume_id"], snippet_metadata_entry(item["resume_id"], item["structured_json"], item["resume_text"]))
+                for item in items
+            ]
+        )
+
+        conn = get_connection()
+        cur = conn.cursor()
+        try:
+            execute_values(cur, """
+                INSERT INTO resume_faiss_map (resume_id, faiss_index)
+                VALUES %s
+                ON CONFLICT (resume_id)
+                DO UPDATE SET faiss_index = EXCLUDED.faiss_index
+            """, [(item["resume_id"], faiss_idx) for item, faiss_idx in zip(items, faiss_ids)])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Failed to record FAISS mapping for bulk ingestion: {e}")
+        finally:
+            cur.close()
+            release_connection(conn)
+
+        for item, faiss_idx in zip(items, faiss_ids):
+            item["faiss_index"] = int(faiss_idx)
+            results.append(item)
+        stats.done(items=len(items))
+    stats.finish()
+
+
+def reconcile_faiss_index(min_age_seconds: int = 0) -> int:
+    """
+    Add stored resumes that never reached FAISS to the index and record them in
+    resume_faiss_map. Postgres commits per batch while FAISS is written once
+    at the end of a run, so a crash in between leaves resumes that dedup
+    would refuse to ingest again. Uses the stored embeddings; returns the
+    number of resumes added.
+
+    Runs are serialised with a transaction-scoped advisory lock, and resumes
+    the index already holds (added but never mapped) only get their mapping
+    row, so overlapping runs never add a vector twice.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (RECONCILE_LOCK_KEY,))
+        cur.execute("""
+            SELECT ce.resume_id, ce.embedding, rs.structured_json
+            FROM candidate_embeddings ce
+            JOIN resume_structured rs ON rs.resume_id = ce.resume_id
+            LEFT JOIN resume_faiss_map m ON m.resume_id = ce.resume_id
+            WHERE ce.version = %s AND m.resume_id IS NULL
+              AND ce.created_at <= now() - make_interval(secs => %s)
+            ORDER BY ce.resume_id
+        """, (EMBEDDING_VERSION, min_age_seconds))
+        rows = cur.fetchall()
+        if not rows:
+            conn.commit()
+            return 0
+
+        mapping = faiss_store.positions_of([rid for rid, _, _ in rows])
+        rows = [row for row in rows if row[0] not in mapping]
+        if rows:
+            resume_ids = [rid for rid, _, _ in rows]
+            structured = [sj if isinstance(sj, dict) else json.loads(sj) for _, _, sj in rows]
+            faiss_ids = faiss_store.add(
+                np.stack([np.frombuffer(bytes(blob), dtype="float32") for _, blob, _ in rows]),
+                [
+                    (rid, snippet_metadata_entry(rid, sj, flatten_resume_json(sj)))
+                    for rid, sj in zip(resume_ids, structured)
+                ]
+            )
+            mapping.update(zip(resume_ids, faiss_ids))
+
+        execute_values(cur, """
+            INSERT INTO resume_faiss_map (resume_id, faiss_index)
+            VALUES %s
+            ON CONFLICT (resume_id)
+            DO UPDATE SET faiss_index = EXCLUDED.faiss_index
+        """, list(mapping.items()))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+    logging.info(f"FAISS reconcile: re-added {len(rows)} stored resumes, "
+                 f"mapped {len(mapping) - len(rows)} already indexed")
+    return len(rows)
+
+
+def _reconcile_safe(min_age_seconds: int) -> int:
+    try:
+        return reconcile_faiss_index(min_age_seconds)
+    except Exception as e:
+        logging.error(f"FAISS reconciliation failed: {e}")
+        return 0
+
+
+# -------------------------
+# Entry point
+# -------------------------
+def run_pipeline(paths: List[str], clean_workers: int = DEFAULT_CLEAN_WORKERS,
+                 llm_workers: int = DEFAULT_LLM_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 extraction_mode: str = DEFAULT_EXTRACTION_MODE) -> dict:
+    started = time.perf_counter()
+    stats = {name: StageStats(name) for name in ("clean", "llm", "embed", "store", "faiss")}
+    results = []
+
+    cleaned_q, llm_q, embedded_q, stored_q = (queue.Queue(maxsize=queue_size) for _ in range(4))
+
+    threads = [
+        threading.Thread(target=_run_stage, args=(
+            "clean", _clean_stage, None, cleaned_q, paths, clean_workers, stats["clean"], results)),
+        threading.Thread(target=_run_stage, args=(
+            "llm", _llm_stage, _QueueReader(cleaned_q), llm_q, llm_workers, extraction_mode, stats["llm"], results)),
+        threading.Thread(target=_run_stage, args=(
+            "embed", _embed_stage, _QueueReader(llm_q), embedded_q, batch_size, stats["embed"], results)),
+        threading.Thread(target=_run_stage, args=(
+            "store", _store_stage, _QueueReader(embedded_q), stored_q, batch_size, stats["store"], results)),
+    ]
+    for t in threads:
+        t.start()
+
+    # The FAISS stage runs on this thread once everything upstream is stored
+    stored = list(_QueueReader(stored_q))
+    for t in threads:
+        t.join()
+    _faiss_stage(stored, stats["faiss"], results)
+    # Pick up resumes an earlier, interrupted run stored but never indexed
+    reconciled = _reconcile_safe(RECONCILE_MIN_AGE_SECONDS)
+
+    ingested = [r for r in results if not r.get("error") and not r.get("duplicate")]
+    duplicates = [r for r in results if r.get("duplicate")]
+    report = {
+        "total": len(paths),
+        "ingested": len(ingested),
+        "duplicates": len(duplicates),
+        "failed": len(paths) - len(ingested) - len(duplicates),
+        "reconciled": reconciled,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+        "stages": [s.as_dict() for s in stats.values()],
+        "results": [
+            {
+                "file": r["file"],
+                "resume_id": r.get("resume_id"),
+                "faiss_index": r.get("faiss_index"),
+                "name": (r.get("structured_json") or {}).get("name"),
+                "duplicate_of": r.get("duplicate"),
+                "error": r.get("error"),
+            }
+            for r in results
+        ],
+    }
+    logging.info(f"Bulk ingestion finished: {report['ingested']}/{report['total']} resumes "
+                 f"in {report['elapsed_seconds']}s")
+    return report
+
+
+def collect_resume_paths(directory: str, limit: Optional[int] = None) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    paths.sort()
+    return paths[:limit] if limit else paths
+
+
+# -------------------------
+# FastAPI endpoint
+# -------------------------
+@router.on_event("startup")
+def startup_event():
+    # No request can be mid-upload yet, so every unindexed resume is a leftover
+    _reconcile_safe(0)
+
+
+@router.post("/upload-resumes/batch")
+async def upload_resumes_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    directory: Optional[str] = Form(None),
+    limit: Optional[int] = Form(None),
+    llm_workers: int = Form(DEFAULT_LLM_WORKERS),
+    batch_size: int = Form(DEFAULT_BATCH_SIZE),
+    extraction_mode: str = Form(DEFAULT_EXTRACTION_MODE),
+):
+    if extraction_mode not in EXTRACTION_MODES:
+        raise HTTPException(status_code=400, detail=f"extraction_mode must be one of {list(EXTRACTION_MODES)}")
+
+    paths = []
+
+    for file in files or []:
+        upload_path = os.path.join(UPLOAD_DIR, os.path.basename(file.filename))
+        with open(upload_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        paths.append(upload_path)
+
+    if directory:
+        resolved = os.path.realpath(os.path.join(BULK_INGEST_ROOT, directory))
+        if os.path.commonpath([resolved, BULK_INGEST_ROOT]) != BULK_INGEST_ROOT:
+            raise HTTPException(status_code=400, detail="directory must be inside the ingestion root")
+        if not os.path.isdir(resolved):
+            raise HTTPException(status_code=404, detail=f"Directory not found: {directory}")
+        paths.extend(collect_resume_paths(resolved))
+
+    if limit:
+        paths = paths[:limit]
+    if not paths:
+        raise HTTPException(status_code=400, detail="Provide files and/or a directory containing resumes")
+
+    try:
+        report = await run_in_threadpool(
+            run_pipeline, paths, llm_workers=llm_workers, batch_size=batch_size,
+            extraction_mode=extraction_mode
+        )
+        return JSONResponse(status_code=200, content={"success": True, **report})
+    except Exception as e:
+        logging.exception("Bulk ingestion failed")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest resumes through the TalentScope pipeline.")
+    parser.add_argument("inputs", nargs="+", help="Resume files and/or directories (searched recursively)")
+    parser.add_argument("--limit", type=int, default=None, help="Ingest at most this many files")
+    parser.add_argument("--clean-workers", type=int, default=DEFAULT_CLEAN_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--extraction-mode", choices=EXTRACTION_MODES, default=DEFAULT_EXTRACTION_MODE,
+                        help="'combined' uses one LLM call per resume, falling back to two passes")
+    args = parser.parse_args()
+
+    paths = []
+    for entry in args.inputs:
+        if os.path.isdir(entry):
+            paths.extend(collect_resume_paths(entry))
+        elif entry.lower().endswith(SUPPORTED_EXTENSIONS):
+            paths.append(entry)
+    if args.limit:
+        paths = paths[:args.limit]
+
+    try:
+        faiss_store.load()
+    except IndexLockedError as e:
+        parser.exit(1, f"{e}\n")
+    try:
+        report = run_pipeline(
+            paths,
+            clean_workers=args.clean_workers,
+            llm_workers=args.llm_workers,
+            batch_size=args.batch_size,
+            queue_size=args.queue_size,
+            extraction_mode=args.extraction_mode,
+        )
+    finally:
+        faiss_store.close()
+
+    print(f"Ingested {report['ingested']}/{report['total']} resumes "
+          f"({report['duplicates']} duplicates skipped) in {report['elapsed_seconds']}s")
+    for stage in report["stages"]:
+        print(f"   {stage['stage']:<6} items={stage['items']:<6} errors={stage['errors']:<4} "
+              f"elapsed={stage['elapsed_seconds']}s  throughput={stage['items_per_second']}/s")
+    for r in report["results"]:
+        if r["error"]:
+            print(f"   ❌ {r['file']}: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
-from db import get_connection, release_connection
-import json
+from candidate_repository import candidate_repository
+from candidate_embeddings import candidate_embeddings
 
 router = APIRouter()
 
@@ -11,43 +11,29 @@ async def get_all_candidates():
     Fetch all candidates' structured JSON + traits from the database.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Fetch all candidate IDs + structured JSON
-        cur.execute("""
-            SELECT r.id, rs.structured_json, rt.leadership, rt.communication,
-                   rt.analytical_thinking, rt.ownership, rt.problem_solving, rt.attention_to_detail
-            FROM resumes r
-            JOIN resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-        """)
-        rows = cur.fetchall()
-
         candidates = []
-        for row in rows:
-            candidate_id = row[0]
-            structured_json = row[1]
-            traits_json = {
-                "leadership": row[2],
-                "communication": row[3],
-                "analytical_thinking": row[4],
-                "ownership": row[5],
-                "problem_solving": row[6],
-                "attention_to_detail": row[7]
-            }
+        async for profile in candidate_repository.iter_all():
             candidates.append({
-                "candidate_id": candidate_id,
-                "structured_json": structured_json,
-                "traits": traits_json
+                "candidate_id": profile["candidate_id"],
+                "structured_json": profile["structured_json"],
+                "traits": {
+                    trait: (value if profile["has_traits"] else None)
+                    for trait, value in profile["traits"].items()
+                }
             })
 
-        cur.close()
-        release_connection(conn)
-
         return JSONResponse(status_code=200, content=candidates)
 
     except Exception as e:
-        if 'conn' in locals():
-            release_connection(conn)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@router.get("/candidates/cache/stats")
+async def get_candidate_cache_stats():
+    try:
+        return JSONResponse(status_code=200, content={
+            **candidate_repository.stats(),
+            "embeddings": candidate_embeddings.stats(),
+        })
+    except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,173 @@
+# candidate_embeddings.py
+"""
+Persistent candidate embeddings.
+
+Every resume is embedded once at ingestion (flatten_resume_json -> shared
+embedding model) and the vector is stored in candidate_embeddings as float32
+bytes, keyed by resume id and EMBEDDING_VERSION (model name + flattener
+version). Compare and team-fit read vectors from here instead of re-encoding
+profiles on every request. Resumes ingested before the table existed, or under
+an older version, are embedded on first read and written back.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from db import async_db, get_connection, release_connection
+from embedding import flatten_resume_json
+from embedding_service import embedding_service
+
+# Bump when flatten_resume_json changes so stale vectors are re-embedded lazily
+FLATTENER_VERSION = "resume_v1"
+EMBEDDING_VERSION = f"{embedding_service.model_name}|{FLATTENER_VERSION}"
+
+CANDIDATE_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("CANDIDATE_EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+
+
+# -------------------------
+# Table + ingestion writes (psycopg2, inside the ingestion transaction)
+# -------------------------
+def ensure_candidate_embeddings_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_embeddings (
+            resume_id INT REFERENCES resumes(id) ON DELETE CASCADE,
+            version TEXT NOT NULL,
+            dim INT NOT NULL,
+            embedding BYTEA NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (resume_id, version)
+        );
+    """)
+
+
+def init_candidate_embeddings_table():
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        ensure_candidate_embeddings_table(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+def _to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="float32").tobytes()
+
+
+def save_candidate_embeddings(cur, rows: Iterable[Tuple[int, np.ndarray]]):
+    """Upsert (resume_id, vector) pairs for EMBEDDING_VERSION; call inside the ingestion transaction."""
+    values = [(int(rid), EMBEDDING_VERSION, int(len(vec)), _to_bytes(vec)) for rid, vec in rows]
+    if values:
+        execute_values(cur, """
+            INSERT INTO candidate_embeddings (resume_id, version, dim, embedding)
+            VALUES %s
+            ON CONFLICT (resume_id, version) DO UPDATE SET embedding = EXCLUDED.embedding, dim = EXCLUDED.dim
+        """, values)
+
+
+# -------------------------
+# Read path
+# -------------------------
+class CandidateEmbeddingStore:
+    """
+    get_many(profiles) returns {candidate_id: vector} for candidate profiles
+    from candidate_repository. Vectors are served from a bounded in-memory
+    LRU, then from Postgres; anything still missing is embedded through
+    embedding_service and persisted so the next request does no inference.
+    """
+
+    def __init__(self, max_entries: int = CANDIDATE_EMBEDDING_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._backfilled = 0
+
+    def _cached(self, candidate_ids: List[int]) -> Dict[int, np.ndarray]:
+        found = {}
+        with self._lock:
+            for candidate_id in candidate_ids:
+                vector = self._cache.get(candidate_id)
+                if vector is not None:
+                    self._cache.move_to_end(candidate_id)
+                    found[candidate_id] = vector
+            self._memory_hits += len(found)
+        return found
+
+    def _store(self, vectors: Dict[int, np.ndarray]):
+        with self._lock:
+            for candidate_id, vector in vectors.items():
+                self._cache[candidate_id] = vector
+                self._cache.move_to_end(candidate_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def _load(self, candidate_ids: List[int]) -> Dict[int, np.ndarray]:
+        rows = await async_db.fetchall(
+            "SELECT resume_id, embedding FROM candidate_embeddings WHERE version = %s AND resume_id = ANY(%s)",
+            (EMBEDDING_VERSION, candidate_ids)
+        )
+        return {rid: np.frombuffer(bytes(blob), dtype="float32") for rid, blob in rows}
+
+    async def _backfill(self, profiles: List[dict]) -> Dict[int, np.ndarray]:
+        texts = [flatten_resume_json(p["structured_json"]) for p in profiles]
+        vectors = await embedding_service.embed(texts)
+        computed = {p["candidate_id"]: vec for p, vec in zip(profiles, vectors)}
+        async with async_db.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany("""
+                    INSERT INTO candidate_embeddings (resume_id, version, dim, embedding)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (resume_id, version) DO NOTHING
+                """, [(rid, EMBEDDING_VERSION, int(len(vec)), _to_bytes(vec)) for rid, vec in computed.items()])
+        with self._lock:
+            self._backfilled += len(computed)
+        return computed
+
+    async def get_many(self, profiles: List[dict], normalize: bool = False) -> Dict[int, np.ndarray]:
+        ids = list(dict.fromkeys(p["candidate_id"] for p in profiles))
+        vectors = self._cached(ids)
+
+        missing = [cid for cid in ids if cid not in vectors]
+        if missing:
+            loaded = await self._load(missing)
+            with self._lock:
+                self._db_hits += len(loaded)
+            self._store(loaded)
+            vectors.update(loaded)
+
+        unembedded = [p for p in profiles if p["candidate_id"] not in vectors]
+        if unembedded:
+            computed = await self._backfill(list({p["candidate_id"]: p for p in unembedded}.values()))
+            logging.info(f"Embedded {len(computed)} candidates missing from candidate_embeddings")
+            self._store(computed)
+            vectors.update(computed)
+
+        if normalize:
+            vectors = {cid: vec / max(float(np.linalg.norm(vec)), 1e-12) for cid, vec in vectors.items()}
+        return vectors
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": EMBEDDING_VERSION,
+                "cached": len(self._cache),
+                "max_entries": self.max_entries,
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "backfilled": self._backfilled,
+            }
+
+
+# create a global instance
+candidate_embeddings = CandidateEmbeddingStore()
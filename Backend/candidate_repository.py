@@ -0,0 +1,157 @@
+# candidate_repository.py
+"""
+Single access point for candidate profiles (resumes + structured JSON + traits).
+
+Feature endpoints used to each run their own copy of the
+resumes / resume_structured / resume_traits join and rebuild the trait dict.
+CandidateRepository runs that join as a prepared statement on the async pool
+and keeps parsed profiles in a bounded LRU cache with a TTL. Uploads call
+invalidate() once their transaction commits.
+"""
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+
+from db import async_db
+from skill_index import normalize_skills, TRAIT_KEYS
+
+CANDIDATE_CACHE_MAX_ENTRIES = int(os.getenv("CANDIDATE_CACHE_MAX_ENTRIES", "2048"))
+CANDIDATE_CACHE_TTL_SECONDS = float(os.getenv("CANDIDATE_CACHE_TTL_SECONDS", "300"))
+
+PROFILE_SELECT = """
+    SELECT r.id, rs.structured_json, rt.resume_id IS NOT NULL,
+           COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
+           COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
+           COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0)
+    FROM resumes r
+    JOIN resume_structured rs ON r.id = rs.resume_id
+    LEFT JOIN resume_traits rt ON r.id = rt.resume_id
+"""
+
+
+def _profile_from_row(row) -> dict:
+    candidate_id, structured = row[0], row[1] or {}
+    return {
+        "candidate_id": candidate_id,
+        "name": structured.get("name", f"Candidate {candidate_id}"),
+        "structured_json": structured,
+        "has_traits": bool(row[2]),
+        "traits": {trait: float(value) for trait, value in zip(TRAIT_KEYS, row[3:9])},
+        "skills": normalize_skills(structured.get("skills", [])),
+    }
+
+
+class CandidateRepository:
+    """
+    get(id) / get_many(ids) are read-through: cached profiles are served from
+    memory, the rest are fetched in one `WHERE r.id = ANY(%s)` round trip.
+    iter_all() streams the whole pool through a server-side cursor and
+    bypasses the cache so a full scan does not evict the working set.
+
+    Returned profiles are deep copies, so callers may modify them (including
+    structured_json, traits and skills) without touching the cached entry.
+    """
+
+    def __init__(self, max_entries: int = CANDIDATE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = CANDIDATE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._cache: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    # -------------------------
+    # Cache
+    # -------------------------
+    def _cached(self, candidate_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._cache.get(candidate_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._cache[candidate_id]
+                self._misses += 1
+                return None
+            self._cache.move_to_end(candidate_id)
+            self._hits += 1
+            return copy.deepcopy(entry[1])
+
+    def _store(self, profile: dict):
+        with self._lock:
+            self._cache[profile["candidate_id"]] = (time.monotonic(), profile)
+            self._cache.move_to_end(profile["candidate_id"])
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, candidate_id: Optional[int] = None):
+        with self._lock:
+            if candidate_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(candidate_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else None,
+            }
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    async def get(self, candidate_id: int) -> Optional[dict]:
+        profile = self._cached(candidate_id)
+        if profile is not None:
+            return profile
+
+        async with async_db.connection() as conn:
+            cur = await conn.execute(PROFILE_SELECT + " WHERE r.id = %s", (candidate_id,), prepare=True)
+            row = await cur.fetchone()
+        if not row:
+            return None
+
+        profile = _profile_from_row(row)
+        self._store(profile)
+        return copy.deepcopy(profile)
+
+    async def get_many(self, candidate_ids: List[int]) -> Dict[int, dict]:
+        """Profiles keyed by id; ids that do not exist are simply absent."""
+        found: Dict[int, dict] = {}
+        missing = []
+        for candidate_id in dict.fromkeys(candidate_ids):
+            profile = self._cached(candidate_id)
+            if profile is not None:
+                found[candidate_id] = profile
+            else:
+                missing.append(candidate_id)
+
+        if missing:
+            async with async_db.connection() as conn:
+                cur = await conn.execute(PROFILE_SELECT + " WHERE r.id = ANY(%s)", (missing,), prepare=True)
+                rows = await cur.fetchall()
+            for row in rows:
+                profile = _profile_from_row(row)
+                self._store(profile)
+                found[profile["candidate_id"]] = copy.deepcopy(profile)
+        return found
+
+    async def iter_all(self, batch_size: int = 500) -> AsyncIterator[dict]:
+        async with async_db.connection() as conn:
+            async with conn.cursor(name="candidate_profiles_scan") as cur:
+                cur.itersize = batch_size
+                await cur.execute(PROFILE_SELECT + " ORDER BY r.id")
+                async for row in cur:
+                    yield _profile_from_row(row)
+
+
+# create a global instance
+candidate_repository = CandidateRepository()
@@ -1,14 +1,17 @@
-import os
 import json
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
-from db import get_connection, release_connection
+from llm_gateway import llm_gateway
+from candidate_repository import candidate_repository
 from neo4j_client import neo4j_client   # ← use the shared singleton
+from narrative_jobs import narrative_jobs, validate_narrative_mode, sse_event
+from llm_stream import JsonItemStream
 
 load_dotenv()
 
@@ -18,6 +21,7 @@ router = APIRouter()
 class CareerTrajectoryRequest(BaseModel):
     candidate_id: int
     num_paths: int = 3
+    narrative: str = "sync"   # sync | deferred | none
 
 class CareerPath(BaseModel):
     predicted_role: str
@@ -35,49 +39,17 @@ class CareerTrajectoryResponse(BaseModel):
     current_company: str
     predicted_paths: List[CareerPath]
     summary: str
+    career_history: List[Dict] = []
+    narrative_job_id: Optional[str] = None
 
 
 # ========================= LLM SETUP =========================
-def get_llm():
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        raise Exception("GROQ_API_KEY is not set in .env file")
-    return ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.6,
-        api_key=groq_key,
-        max_tokens=3000
-    )
-
-
-# ========================= ENDPOINT =========================
-@router.post("/career-trajectory", response_model=CareerTrajectoryResponse)
-async def career_trajectory(request: CareerTrajectoryRequest):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Get candidate basic info from PostgreSQL
-    cur.execute("""
-        SELECT rs.structured_json 
-        FROM resumes r
-        JOIN resume_structured rs ON r.id = rs.resume_id
-        WHERE r.id = %s
-    """, (request.candidate_id,))
-    row = cur.fetchone()
-    if not row:
-        cur.close()
-        release_connection(conn)
-        raise HTTPException(status_code=404, detail="Candidate not found")
+# Groq call settings (client pooling and limits live in llm_gateway)
+LLM_PARAMS = {"temperature": 0.6, "max_tokens": 3000}
 
-    structured = row[0]
-    candidate_name = structured.get("name", f"Candidate {request.candidate_id}")
-    current_role = structured.get("experience", [{}])[-1].get("job_title", "Unknown")
-    current_company = structured.get("experience", [{}])[-1].get("company", "Unknown")
 
-    cur.close()
-    release_connection(conn)
-
-    # Get career history from Neo4j using the shared client
+# ========================= HELPERS =========================
+def fetch_career_history(candidate_id: int) -> List[Dict]:
     history = []
     try:
         results = neo4j_client.run("""
@@ -89,7 +61,7 @@ async def career_trajectory(request: CareerTrajectoryRequest):
                 p.years AS promotion_years,
                 p.date AS date
             ORDER BY p.date ASC
-        """, {"cid": str(request.candidate_id)})
+        """, {"cid": str(candidate_id)})
 
         for record in results:
             history.append({
@@ -101,6 +73,76 @@ async def career_trajectory(request: CareerTrajectoryRequest):
     except Exception as e:
         logging.error(f"Neo4j error in career trajectory: {e}")
         history = []   # non-blocking — LLM will still run with what it has
+    return history
+
+
+def _path_from_item(p: dict) -> dict:
+    return CareerPath(
+        predicted_role=p.get("predicted_role", ""),
+        company_type=p.get("company_type", ""),
+        time_to_promotion_years=float(p.get("time_to_promotion_years", 0)),
+        probability=float(p.get("probability", 0)),
+        key_skills_needed=p.get("key_skills_needed", []),
+        evidence=p.get("evidence", []),
+        rationale=p.get("rationale", "")
+    ).model_dump()
+
+
+def generate_career_paths(prompt: str) -> dict:
+    """
+    Blocking Groq call. Returns {"predicted_paths": [...], "summary": ...};
+    raises json.JSONDecodeError / Exception on failure.
+    """
+    response_text = llm_gateway.invoke(prompt, **LLM_PARAMS)
+
+    if not response_text or not response_text.strip():
+        raise ValueError("LLM returned an empty response")
+
+    response_text = response_text.strip()
+    logging.info(f"Career trajectory raw response (first 300 chars): {response_text[:300]}")
+    return parse_career_paths(response_text)
+
+
+def parse_career_paths(response_text: str) -> dict:
+    """Parse a complete completion into {"predicted_paths": [...], "summary": ...}."""
+    # Strip markdown code fences robustly
+    if "```json" in response_text:
+        response_text = response_text.split("```json", 1)[1]
+    if "```" in response_text:
+        response_text = response_text.rsplit("```", 1)[0]
+    response_text = response_text.strip()
+
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        logging.error(f"Failed to parse LLM JSON response: {e}\nRaw text: {response_text}")
+        raise
+
+    paths = [_path_from_item(p) for p in data.get("paths", [])]
+
+    return {
+        "predicted_paths": paths,
+        "summary": data.get("summary", "AI-generated career trajectory based on current profile and industry trends.")
+    }
+
+
+# ========================= ENDPOINT =========================
+async def prepare_career_trajectory(request: CareerTrajectoryRequest) -> Tuple[CareerTrajectoryResponse, str]:
+    """Load the candidate and career history and build the prompt; paths are left empty."""
+    validate_narrative_mode(request.narrative)
+
+    # Get candidate basic info from PostgreSQL
+    candidate = await candidate_repository.get(request.candidate_id)
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+
+    structured = candidate["structured_json"]
+    candidate_name = candidate["name"]
+    current_role = structured.get("experience", [{}])[-1].get("job_title", "Unknown")
+    current_company = structured.get("experience", [{}])[-1].get("company", "Unknown")
+
+    # Get career history from Neo4j using the shared client
+    history = await run_in_threadpool(fetch_career_history, request.candidate_id)
 
     # Build prompt
     prompt = f"""
@@ -139,51 +181,81 @@ Return ONLY valid JSON in this format (no markdown fences, no extra text):
 }}
 """
 
-    try:
-        llm = get_llm()
-        response = llm.invoke(prompt)
-        response_text = response.content
-
-        if not response_text or not response_text.strip():
-            raise ValueError("LLM returned an empty response")
+    response = CareerTrajectoryResponse(
+        candidate_id=request.candidate_id,
+        candidate_name=candidate_name,
+        current_role=current_role,
+        current_company=current_company,
+        predicted_paths=[],
+        summary="Career trajectory was not requested.",
+        career_history=history
+    )
+    return response, prompt
 
-        response_text = response_text.strip()
-        logging.info(f"Career trajectory raw response (first 300 chars): {response_text[:300]}")
 
-        # Strip markdown code fences robustly
-        if "```json" in response_text:
-            response_text = response_text.split("```json", 1)[1]
-        if "```" in response_text:
-            response_text = response_text.rsplit("```", 1)[0]
-        response_text = response_text.strip()
+@router.post("/career-trajectory", response_model=CareerTrajectoryResponse)
+async def career_trajectory(request: CareerTrajectoryRequest):
+    response, prompt = await prepare_career_trajectory(request)
 
-        data = json.loads(response_text)
+    if request.narrative == "deferred":
+        response.narrative_job_id = narrative_jobs.submit("career-trajectory", generate_career_paths, prompt)
+        response.summary = "Career trajectory is being generated."
+        return response
+    if request.narrative == "none":
+        return response
 
-        paths = []
-        for p in data.get("paths", []):
-            paths.append(CareerPath(
-                predicted_role=p.get("predicted_role", ""),
-                company_type=p.get("company_type", ""),
-                time_to_promotion_years=float(p.get("time_to_promotion_years", 0)),
-                probability=float(p.get("probability", 0)),
-                key_skills_needed=p.get("key_skills_needed", []),
-                evidence=p.get("evidence", []),
-                rationale=p.get("rationale", "")
-            ))
-
-        return CareerTrajectoryResponse(
-            candidate_id=request.candidate_id,
-            candidate_name=candidate_name,
-            current_role=current_role,
-            current_company=current_company,
-            predicted_paths=paths,
-            summary=data.get("summary", "AI-generated career trajectory based on current profile and industry trends.")
-        )
+    try:
+        data = await run_in_threadpool(generate_career_paths, prompt)
+        response.predicted_paths = [CareerPath(**p) for p in data["predicted_paths"]]
+        response.summary = data["summary"]
+        return response
 
     except json.JSONDecodeError as e:
-        logging.error(f"Failed to parse LLM JSON response: {e}\nRaw text: {response_text}")
         raise HTTPException(status_code=500, detail=f"LLM returned malformed JSON: {str(e)}")
 
     except Exception as e:
         logging.error(f"Career trajectory generation failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate career trajectory: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate career trajectory: {str(e)}")
+
+
+@router.post("/career-trajectory/stream")
+async def career_trajectory_stream(request: CareerTrajectoryRequest):
+    """
+    Server-Sent Events version of /career-trajectory. Emits `meta` (candidate,
+    current role, history), `summary`, one `path` event per predicted path as
+    soon as its JSON object is complete, then `done` (or `error`).
+    """
+    response, prompt = await prepare_career_trajectory(request)
+
+    async def events():
+        meta = response.model_dump()
+        meta.pop("predicted_paths", None)
+        yield sse_event("meta", meta)
+
+        parser = JsonItemStream("paths")
+        count = 0
+        try:
+            async for text in llm_gateway.astream(prompt, **LLM_PARAMS):
+                for kind, value in parser.feed(text):
+                    if kind == "summary":
+                        yield sse_event("summary", {"summary": value})
+                    else:
+                        yield sse_event("path", {"index": count, **_path_from_item(value)})
+                        count += 1
+
+            if not count:
+                # Model drifted from the format; fall back to whole-buffer parsing
+                data = parse_career_paths(parser.buffer.strip())
+                if not parser.scalar_done:
+                    yield sse_event("summary", {"summary": data["summary"]})
+                for path in data["predicted_paths"]:
+                    yield sse_event("path", {"index": count, **path})
+                    count += 1
+
+            yield sse_event("done", {"count": count})
+        except Exception as e:
+            logging.error(f"Career trajectory stream failed: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -6,9 +6,11 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from neo4j import GraphDatabase
-from db import get_connection, release_connection
+from db import async_db
+from candidate_repository import candidate_repository
+from candidate_embeddings import candidate_embeddings as candidate_embedding_store
+from job_embeddings import job_embeddings
 
 load_dotenv()
 
@@ -24,8 +26,6 @@ NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "saadbrohi"
 
-embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-
 # Trait weights (higher for analytical & problem-solving as they are critical)
 TRAIT_WEIGHTS = {
     "leadership":           0.18,
@@ -43,37 +43,6 @@ class CompareRequest(BaseModel):
 
 
 # ========================= HELPERS =========================
-def flatten_structured_json(structured: dict) -> str:
-    """Rich text representation for embeddings."""
-    parts = []
-    if structured.get("name"): parts.append(structured["name"])
-    if structured.get("summary"): parts.append(structured["summary"])
-
-    skills = structured.get("skills", [])
-    if skills:
-        parts.append("Skills: " + ", ".join(skills))
-
-    for exp in structured.get("experience", []):
-        title = exp.get("job_title") or exp.get("role", "")
-        company = exp.get("company", "")
-        desc = exp.get("description", "")
-        parts.append(f"{title} at {company}. {desc}")
-
-    for edu in structured.get("education", []):
-        degree = edu.get("degree", "")
-        institution = edu.get("institution", "")
-        parts.append(f"{degree} from {institution}")
-
-    return " ".join(parts)
-
-
-def get_candidate_embeddings_batch(rows: list) -> Dict[int, np.ndarray]:
-    ids = [row[0] for row in rows]
-    texts = [flatten_structured_json(row[1]) for row in rows]
-    vectors = embed_model.encode(texts, batch_size=16, normalize_embeddings=True).astype("float32")
-    return {cid: vec for cid, vec in zip(ids, vectors)}
-
-
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b))
 
@@ -163,42 +132,22 @@ async def compare_candidates(request: CompareRequest):
         raise HTTPException(status_code=400, detail="Please select between 2 and 5 candidates")
 
     # 1. PostgreSQL data
-    conn = get_connection()
-    cur = conn.cursor()
-    placeholders = ','.join(['%s'] * len(request.candidate_ids))
-    cur.execute(f"""
-        SELECT r.id, rs.structured_json,
-               COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
-               COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
-               COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0)
-        FROM resumes r
-        JOIN resume_structured rs ON r.id = rs.resume_id
-        LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-        WHERE r.id IN ({placeholders})
-    """, request.candidate_ids)
-    rows = cur.fetchall()
-    cur.close()
-    release_connection(conn)
-
-    if len(rows) != len(request.candidate_ids):
+    found = await candidate_repository.get_many(request.candidate_ids)
+    if len(found) != len(request.candidate_ids):
         raise HTTPException(status_code=404, detail="Some candidates not found")
+    profiles = list(found.values())
 
-    # 2. Embeddings
-    candidate_embeddings = get_candidate_embeddings_batch(rows)
+    # 2. Embeddings (stored at ingestion, no model inference)
+    candidate_embeddings = await candidate_embedding_store.get_many(profiles, normalize=True)
 
-    # 3. Job embedding (if provided)
+    # 3. Job embedding (if provided; stored on the jobs row)
     job_embedding = None
     job_skills = []
     if request.job_id:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT title, description, skills FROM jobs WHERE job_id = %s", (request.job_id,))
-        job_row = cur.fetchone()
-        release_connection(conn)
+        job_row = await async_db.fetchone("SELECT skills FROM jobs WHERE job_id = %s", (request.job_id,))
         if job_row:
-            job_text = f"{job_row[0] or ''} {job_row[1] or ''} {' '.join(job_row[2] if isinstance(job_row[2], list) else [])}"
-            job_embedding = embed_model.encode(job_text, normalize_embeddings=True).astype("float32")
-            job_skills = job_row[2] if isinstance(job_row[2], list) else []
+            job_embedding = await job_embeddings.get(request.job_id)
+            job_skills = job_row[0] if isinstance(job_row[0], list) else []
 
     # 4. Graph Signals
     graph_raw = compute_graph_signals(request.candidate_ids)
@@ -211,20 +160,13 @@ async def compare_candidates(request: CompareRequest):
     # 5. Build results
     comparison_results = []
 
-    for row in rows:
-        candidate_id = row[0]
-        structured = row[1]
-        name = structured.get("name", f"Candidate {candidate_id}")
+    for profile in profiles:
+        candidate_id = profile["candidate_id"]
+        structured = profile["structured_json"]
+        name = profile["name"]
         cid_str = str(candidate_id)
 
-        traits = {
-            "leadership": float(row[2]),
-            "communication": float(row[3]),
-            "analytical_thinking": float(row[4]),
-            "ownership": float(row[5]),
-            "problem_solving": float(row[6]),
-            "attention_to_detail": float(row[7]),
-        }
+        traits = profile["traits"]
 
         trait_score = compute_trait_score(traits)
 
@@ -1,6 +1,19 @@
 import psycopg2
 from psycopg2 import pool
 import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+router = APIRouter()
 
 # -------------------------
 # PostgreSQL connection pool
@@ -9,22 +22,201 @@ DB_HOST = os.getenv('DB_HOST', 'localhost')
 DB_PORT = os.getenv('DB_PORT', '5432')
 DB_NAME = os.getenv('DB_NAME', 'talentscope')
 DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'saad') 
+DB_PASSWORD = os.getenv('DB_PASSWORD', 'saad')
+
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+
+# Blocking pool for ingestion threads, CLI scripts and index rebuilds.
+# ThreadedConnectionPool is safe to share across the threadpool workers.
+# It connects on first use, so modules that import db load without a server.
+connection_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_connection_pool_lock = threading.Lock()
+
 
-connection_pool = psycopg2.pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=10,
-    host=DB_HOST,
-    port=DB_PORT,
-    database=DB_NAME,
-    user=DB_USER,
-    password=DB_PASSWORD
-)
+def _sync_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    global connection_pool
+    if connection_pool is None:
+        with _connection_pool_lock:
+            if connection_pool is None:
+                connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                    minconn=1,
+                    maxconn=int(os.getenv('DB_SYNC_POOL_MAX_SIZE', '10')),
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD
+                )
+    return connection_pool
 
 
 def get_connection():
-    return connection_pool.getconn()
+    return _sync_pool().getconn()
 
 
 def release_connection(conn):
-    connection_pool.putconn(conn)
+    _sync_pool().putconn(conn)
+
+
+# -------------------------
+# Async connection pool (request handlers)
+# -------------------------
+if sys.platform == "win32":
+    # psycopg's async mode cannot run on the default Proactor event loop
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Upper bounds (seconds) of the pool-wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class AsyncDatabase:
+    """
+    psycopg 3 AsyncConnectionPool used by the async routers, so a slow query
+    only holds one pooled connection instead of blocking the event loop.
+
+        async with async_db.connection() as conn:
+            cur = await conn.execute("SELECT ...", (param,))
+            row = await cur.fetchone()
+
+    The connection block commits on success and rolls back on error. Every
+    session gets DB_STATEMENT_TIMEOUT_MS as its statement_timeout, and the
+    time spent waiting for a free connection is recorded for /db/stats.
+    """
+
+    def __init__(self, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT, statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+
+        self._metrics_lock = threading.Lock()
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def _conninfo(self) -> str:
+        return (
+            f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASSWORD} "
+            f"options='-c statement_timeout={self.statement_timeout_ms}'"
+        )
+
+    async def open(self):
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._pool is None:
+                pool = AsyncConnectionPool(
+                    self._conninfo(),
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    timeout=self.timeout,
+                    open=False
+                )
+                await pool.open()
+                self._pool = pool
+                logging.info(f"Async PostgreSQL pool opened (min={self.min_size}, max={self.max_size})")
+
+    async def close(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    def _record_wait(self, waited: float, timed_out: bool = False):
+        with self._metrics_lock:
+            if timed_out:
+                self._timeouts += 1
+                return
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self._wait_buckets[i] += 1
+                    break
+            else:
+                self._wait_buckets[-1] += 1
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._pool is None:
+            await self.open()
+
+        # Only the acquire is timed; a PoolTimeout raised by the caller's block is not ours
+        start = time.perf_counter()
+        acquire = self._pool.connection()
+        try:
+            conn = await acquire.__aenter__()
+        except PoolTimeout:
+            self._record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self._record_wait(time.perf_counter() - start)
+
+        try:
+            yield conn
+        except BaseException:
+            # Rolls back and returns the connection, as `async with` would
+            if not await acquire.__aexit__(*sys.exc_info()):
+                raise
+        else:
+            await acquire.__aexit__(None, None, None)
+
+    async def fetchone(self, query: str, params=None):
+        async with self.connection() as conn:
+            cur = await conn.execute(query, params)
+            return await cur.fetchone()
+
+    async def fetchall(self, query: str, params=None) -> list:
+        async with self.connection() as conn:
+            cur = await conn.execute(query, params)
+            return await cur.fetchall()
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            histogram = {f"le_{bound}s": count for bound, count in zip(WAIT_BUCKETS, self._wait_buckets)}
+            histogram["gt_5.0s"] = self._wait_buckets[-1]
+            metrics = {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "statement_timeout_ms": self.statement_timeout_ms,
+                "acquired": self._acquired,
+                "acquire_timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_total / self._acquired * 1000, 3) if self._acquired else None,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "wait_histogram": histogram,
+            }
+        metrics["pool"] = self._pool.get_stats() if self._pool is not None else None
+        return metrics
+
+
+# create a global instance
+async_db = AsyncDatabase()
+
+
+@router.on_event("startup")
+async def startup_event():
+    try:
+        await async_db.open()
+    except Exception as e:
+        logging.error(f"Could not open async PostgreSQL pool: {e}")
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    await async_db.close()
+
+
+# GET /db/stats
+@router.get("/db/stats")
+async def get_db_stats():
+    try:
+        return JSONResponse(status_code=200, content=async_db.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,298 @@
+# dedup.py
+"""
+Upload-time duplicate resume detection.
+
+Every resume gets two fingerprints of its cleaned text:
+  - content_hash : sha256 of the normalised text (exact duplicates)
+  - simhash      : 64-bit SimHash over word 3-shingles (near duplicates)
+
+The SimHash is split into four 16-bit bands stored in indexed columns. Two
+resumes within SIMHASH_MAX_DISTANCE (<= 3) bits must share at least one band,
+so a near-duplicate lookup only compares against rows from matching buckets.
+
+    python dedup.py --init        # create the fingerprint table
+    python dedup.py --report      # backfill fingerprints + print duplicate groups
+"""
+import re
+import sys
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from db import get_connection, release_connection
+
+router = APIRouter()
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+SIMHASH_MAX_DISTANCE = 3   # must stay below SIMHASH_BANDS for the banding guarantee
+SHINGLE_SIZE = 3
+
+
+# -------------------------
+# Fingerprints
+# -------------------------
+def normalize_for_hash(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_for_hash(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of word shingles, returned as an unsigned int."""
+    words = normalize_for_hash(text).split()
+    if not words:
+        return 0
+    if len(words) < SHINGLE_SIZE:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles],
+        dtype=np.uint64
+    )
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.astype(np.int64).sum(axis=0) * 2 - len(shingles)
+
+    value = 0
+    for bit in np.nonzero(votes > 0)[0]:
+        value |= 1 << int(bit)
+    return value
+
+
+def _to_signed(value: int) -> int:
+    """Postgres BIGINT is signed; store the unsigned SimHash in two's complement."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def _bands(value: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(SIMHASH_BANDS)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def compute_fingerprint(cleaned_text: str) -> dict:
+    value = simhash(cleaned_text)
+    return {
+        "content_hash": content_hash(cleaned_text),
+        "simhash": value,
+        "bands": _bands(value),
+    }
+
+
+# -------------------------
+# Storage
+# -------------------------
+def ensure_fingerprint_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resume_fingerprints (
+            resume_id INT PRIMARY KEY REFERENCES resumes(id) ON DELETE CASCADE,
+            content_hash CHAR(64) NOT NULL,
+            simhash BIGINT NOT NULL,
+            band0 INT NOT NULL,
+            band1 INT NOT NULL,
+            band2 INT NOT NULL,
+            band3 INT NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_fingerprints_hash ON resume_fingerprints(content_hash);")
+    for i in range(SIMHASH_BANDS):
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_fingerprints_band{i} ON resume_fingerprints(band{i});")
+
+
+def save_fingerprint(cur, resume_id: int, fingerprint: dict):
+    cur.execute("""
+        INSERT INTO resume_fingerprints (resume_id, content_hash, simhash, band0, band1, band2, band3)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (resume_id) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash, simhash = EXCLUDED.simhash,
+            band0 = EXCLUDED.band0, band1 = EXCLUDED.band1,
+            band2 = EXCLUDED.band2, band3 = EXCLUDED.band3
+    """, (resume_id, fingerprint["content_hash"], _to_signed(fingerprint["simhash"]), *fingerprint["bands"]))
+
+
+def find_duplicate(cur, fingerprint: dict, max_distance: int = SIMHASH_MAX_DISTANCE) -> Optional[dict]:
+    """
+    Returns {"resume_id", "match_type", "hamming_distance"} for the closest
+    existing resume, or None when the text is new.
+    """
+    cur.execute(
+        "SELECT resume_id FROM resume_fingerprints WHERE content_hash = %s ORDER BY resume_id LIMIT 1",
+        (fingerprint["content_hash"],)
+    )
+    row = cur.fetchone()
+    if row:
+        return {"resume_id": row[0], "match_type": "exact", "hamming_distance": 0}
+
+    bands = fingerprint["bands"]
+    cur.execute("""
+        SELECT resume_id, simhash FROM resume_fingerprints
+        WHERE band0 = %s OR band1 = %s OR band2 = %s OR band3 = %s
+    """, tuple(bands))
+
+    best = None
+    for resume_id, stored in cur.fetchall():
+        distance = hamming_distance(fingerprint["simhash"], _to_unsigned(stored))
+        if distance <= max_distance and (best is None or distance < best["hamming_distance"]):
+            best = {"resume_id": resume_id, "match_type": "near", "hamming_distance": distance}
+    return best
+
+
+def find_duplicate_resume(fingerprint: dict) -> Optional[dict]:
+    """Connection-managing wrapper used by the upload endpoints."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        return find_duplicate(cur, fingerprint)
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+def init_fingerprint_table():
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        ensure_fingerprint_table(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+# -------------------------
+# Corpus report
+# -------------------------
+def backfill_fingerprints() -> int:
+    """Fingerprint resumes ingested before dedup existed. Returns how many were added."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT r.id, COALESCE(r.cleaned_text, r.raw_text)
+            FROM resumes r
+            LEFT JOIN resume_fingerprints f ON r.id = f.resume_id
+            WHERE f.resume_id IS NULL
+        """)
+        rows = cur.fetchall()
+        for resume_id, text in rows:
+            save_fingerprint(cur, resume_id, compute_fingerprint(text or ""))
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+def find_duplicates_report(max_distance: int = SIMHASH_MAX_DISTANCE) -> dict:
+    backfilled = backfill_fingerprints()
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT content_hash, array_agg(resume_id ORDER BY resume_id)
+            FROM resume_fingerprints
+            GROUP BY content_hash
+            HAVING COUNT(*) > 1
+        """)
+        exact_groups = [ids for _, ids in cur.fetchall()]
+
+        cur.execute("SELECT resume_id, simhash FROM resume_fingerprints ORDER BY resume_id")
+        fingerprints = [(rid, _to_unsigned(value)) for rid, value in cur.fetchall()]
+    finally:
+        cur.close()
+        release_connection(conn)
+
+    # Only pairs sharing a band can be within max_distance, so compare inside buckets
+    buckets: Dict[tuple, List[tuple]] = defaultdict(list)
+    for rid, value in fingerprints:
+        for i, band in enumerate(_bands(value)):
+            buckets[(i, band)].append((rid, value))
+
+    exact_pairs = {(a, b) for ids in exact_groups for i, a in enumerate(ids) for b in ids[i + 1:]}
+    near_pairs = {}
+    for members in buckets.values():
+        for i, (rid_a, value_a) in enumerate(members):
+            for rid_b, value_b in members[i + 1:]:
+                pair = (min(rid_a, rid_b), max(rid_a, rid_b))
+                if pair in exact_pairs or pair in near_pairs:
+                    continue
+                distance = hamming_distance(value_a, value_b)
+                if distance <= max_distance:
+                    near_pairs[pair] = distance
+
+    return {
+        "total_resumes": len(fingerprints),
+        "backfilled_fingerprints": backfilled,
+        "max_distance": max_distance,
+        "exact_duplicate_groups": exact_groups,
+        "near_duplicate_pairs": [
+            {"resume_ids": list(pair), "hamming_distance": distance}
+            for pair, distance in sorted(near_pairs.items(), key=lambda x: (x[1], x[0]))
+        ],
+    }
+
+
+# GET /duplicates/report
+@router.get("/duplicates/report")
+async def get_duplicates_report(max_distance: int = SIMHASH_MAX_DISTANCE):
+    if max_distance < 0 or max_distance >= SIMHASH_BANDS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"max_distance must be between 0 and {SIMHASH_BANDS - 1}"}
+        )
+    try:
+        report = await run_in_threadpool(find_duplicates_report, max_distance)
+        return JSONResponse(status_code=200, content=report)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Resume duplicate detection utilities.")
+    parser.add_argument("--init", action="store_true", help="Create the resume_fingerprints table")
+    parser.add_argument("--report", action="store_true", help="Backfill fingerprints and report duplicates")
+    parser.add_argument("--max-distance", type=int, default=SIMHASH_MAX_DISTANCE)
+    args = parser.parse_args()
+
+    if not (args.init or args.report):
+        parser.print_help()
+        sys.exit(1)
+
+    if args.init:
+        init_fingerprint_table()
+        print("✅ resume_fingerprints table ready")
+    if args.report:
+        print(json.dumps(find_duplicates_report(args.max_distance), indent=2))
+
+
+if __name__ == "__main__":
+    main()
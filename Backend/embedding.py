@@ -2,7 +2,9 @@ import os
 import json
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from embedding_service import embedding_service
+from faiss_index_factory import create_index, initial_index_type
 
 # -------------------------
 # Directories
@@ -13,11 +15,9 @@ FAISS_INDEX_DIR = "FAISS_Index"    # Store FAISS index and candidate mapping
 os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
 
 # -------------------------
-# Load embedding model
+# Embedding model (shared instance owned by embedding_service)
 # -------------------------
-model_name = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(model_name)
-embedding_dim = model.get_sentence_embedding_dimension()
+model_name = embedding_service.model_name
 
 # -------------------------
 # Flatten JSON for embedding
@@ -57,12 +57,12 @@ def add_candidate_to_index(resume_json_path, traits_json_path, candidate_name, i
     with open(resume_json_path, 'r', encoding='utf-8') as f:
         resume_json = json.load(f)
     resume_text = flatten_resume_json(resume_json)
-    resume_embedding = model.encode(resume_text).astype('float32')
+    resume_embedding = embedding_service.encode([resume_text])[0]
 
     if index_path and os.path.exists(index_path):
         index = faiss.read_index(index_path)
     else:
-        index = faiss.IndexFlatL2(len(resume_embedding))
+        index = create_index(initial_index_type(), len(resume_embedding))
 
     if candidate_ids_path and os.path.exists(candidate_ids_path):
         with open(candidate_ids_path, 'r', encoding='utf-8') as f:
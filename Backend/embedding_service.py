@@ -0,0 +1,239 @@
+# embedding_service.py
+"""
+One process-wide sentence-transformers model for every embedding call.
+
+Uploads, /search and /compare-candidates used to each load their own copy of
+all-MiniLM-L6-v2. EmbeddingService owns the single instance:
+
+  - embed(texts) (async) queues the request; a background worker drains the
+    queue into micro-batches of up to EMBED_MAX_BATCH_SIZE texts, waiting at
+    most EMBED_MAX_WAIT_MS for more requests to join, and runs one
+    model.encode per batch in the threadpool
+  - encode(texts) (sync) encodes directly for code that already runs in a
+    worker thread (bulk ingest, HybridRetriever, FAISS helpers)
+  - batch-size, queue-wait and encode-latency histograms at /embeddings/stats
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sentence_transformers import SentenceTransformer
+
+router = APIRouter()
+
+# -------------------------
+# Config
+# -------------------------
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+
+# Upper bounds of the histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)   # seconds
+
+
+class _Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.total += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self, unit: str = "") -> dict:
+        observed = sum(self.counts)
+        buckets = {f"le_{bound}{unit}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets[f"gt_{self.bounds[-1]}{unit}"] = self.counts[-1]
+        return {
+            "count": observed,
+            "avg": round(self.total / observed, 6) if observed else None,
+            "max": round(self.max, 6),
+            "buckets": buckets,
+        }
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME,
+                 max_batch_size: int = EMBED_MAX_BATCH_SIZE, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._texts = 0
+        self._batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self._encode_latency = _Histogram(LATENCY_BUCKETS)
+        self._queue_wait = _Histogram(LATENCY_BUCKETS)
+
+    # -------------------------
+    # Model
+    # -------------------------
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = SentenceTransformer(self.model_name)
+                    logging.info(f"Loaded embedding model {self.model_name} in {time.perf_counter() - started:.1f}s")
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # -------------------------
+    # Encoding
+    # -------------------------
+    def encode(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """Blocking encode of `texts` as one batch; returns an (n, dim) float32 array."""
+        model = self.model
+        if not texts:
+            return np.zeros((0, self.dimension), dtype="float32")
+        started = time.perf_counter()
+        with self._encode_lock:
+            vectors = model.encode(list(texts), batch_size=min(len(texts), self.max_batch_size))
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._stats_lock:
+            self._batch_sizes.observe(len(texts))
+            self._encode_latency.observe(time.perf_counter() - started)
+        return _normalize(vectors) if normalize else vectors
+
+    async def embed(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        Encode `texts`, sharing one model call with any other requests that
+        arrive within EMBED_MAX_WAIT_MS. Returns an (n, dim) float32 array.
+        """
+        texts = list(texts)
+        with self._stats_lock:
+            self._requests += 1
+            self._texts += len(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype="float32")
+
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((texts, future, time.perf_counter()))
+        vectors = await future
+        return _normalize(vectors) if normalize else vectors
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[List[str], asyncio.Future, float]]):
+        now = time.perf_counter()
+        with self._stats_lock:
+            for _, _, enqueued in batch:
+                self._queue_wait.observe(now - enqueued)
+
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        try:
+            vectors = await run_in_threadpool(self.encode, texts)
+        except Exception as e:
+            logging.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for item_texts, future, _ in batch:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._queue = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "requests": self._requests,
+                "texts": self._texts,
+                "batch_size": self._batch_sizes.snapshot(),
+                "encode_latency": self._encode_latency.snapshot("s"),
+                "queue_wait": self._queue_wait.snapshot("s"),
+            }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# create a global instance
+embedding_service = EmbeddingService()
+
+
+@router.on_event("startup")
+async def startup_event():
+    try:
+        await run_in_threadpool(lambda: embedding_service.model)
+    except Exception as e:
+        logging.error(f"Could not load embedding model: {e}")
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    await embedding_service.close()
+
+
+# GET /embeddings/stats
+@router.get("/embeddings/stats")
+async def get_embedding_stats():
+    try:
+        return JSONResponse(status_code=200, content=embedding_service.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
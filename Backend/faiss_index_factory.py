@@ -0,0 +1,238 @@
+# faiss_index_factory.py
+"""
+FAISS index types for the candidate vector index.
+
+  flat     exact IndexFlatL2; search cost grows linearly with the corpus
+  ivfflat  inverted lists over k-means cells; needs training, tuned by nprobe
+  ivfpq    inverted lists + product-quantised codes; smallest memory, lossy
+  hnsw     graph index; no training, tuned by efSearch
+
+FAISS_INDEX_TYPE picks one of the above or "auto": Flat until the corpus
+reaches FAISS_PROMOTE_AT vectors, then FAISS_PROMOTED_TYPE. FaissIndexStore
+promotes automatically; rebuilds and benchmarks can also be run by hand
+while the API server is stopped (it holds the index lock; use
+POST /faiss/rebuild and GET /faiss/benchmark against a running server):
+
+    python faiss_index_factory.py rebuild --type hnsw
+    python faiss_index_factory.py benchmark --types ivfflat hnsw --k 10
+"""
+import os
+import math
+import time
+import argparse
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import faiss
+
+# -------------------------
+# Config
+# -------------------------
+INDEX_TYPES = ("flat", "ivfflat", "ivfpq", "hnsw")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto").lower()
+FAISS_PROMOTE_AT = int(os.getenv("FAISS_PROMOTE_AT", "50000"))
+FAISS_PROMOTED_TYPE = os.getenv("FAISS_PROMOTED_TYPE", "hnsw").lower()
+
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))            # sub-quantizers; must divide the dimension
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+# FAISS warns below ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+MAX_TRAINING_POINTS_PER_CENTROID = 256
+
+
+def resolve_index_type(n_vectors: int, requested: Optional[str] = None) -> str:
+    index_type = (requested or FAISS_INDEX_TYPE).lower()
+    if index_type == "auto":
+        return FAISS_PROMOTED_TYPE if n_vectors >= FAISS_PROMOTE_AT else "flat"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}'; expected auto or one of {list(INDEX_TYPES)}")
+    return index_type
+
+
+def initial_index_type(requested: Optional[str] = None) -> str:
+    """Type for a brand-new, empty index: IVF types need training data, so they start as Flat."""
+    index_type = resolve_index_type(0, requested)
+    return index_type if index_type in ("flat", "hnsw") else "flat"
+
+
+def ivf_nlist(n_vectors: int) -> int:
+    """~4 * sqrt(n) cells, capped so every cell gets enough training points."""
+    return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def create_index(index_type: str, dim: int, n_vectors: int = 0):
+    """Empty (possibly untrained) index of the given type sized for n_vectors."""
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+        return index
+
+    nlist = ivf_nlist(n_vectors)
+    if index_type == "ivfflat":
+        index = faiss.index_factory(dim, f"IVF{nlist},Flat")
+    elif index_type == "ivfpq":
+        if dim % FAISS_PQ_M:
+            raise ValueError(f"FAISS_PQ_M={FAISS_PQ_M} must divide the embedding dimension {dim}")
+        if n_vectors < 2 ** FAISS_PQ_NBITS:
+            raise ValueError(f"ivfpq needs at least {2 ** FAISS_PQ_NBITS} vectors to train, got {n_vectors}")
+        index = faiss.index_factory(dim, f"IVF{nlist},PQ{FAISS_PQ_M}x{FAISS_PQ_NBITS}")
+    else:
+        raise ValueError(f"Unknown FAISS index type '{index_type}'")
+    faiss.extract_index_ivf(index).nprobe = min(FAISS_IVF_NPROBE, nlist)
+    return index
+
+
+def index_type_of(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return "ivfpq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivfflat"
+    return "flat"
+
+
+def build_index(vectors: np.ndarray, index_type: str):
+    """Create, train (IVF types) and fill an index with `vectors`."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+    if index_type in ("ivfflat", "ivfpq") and n < MIN_POINTS_PER_CENTROID:
+        raise ValueError(f"{index_type} needs at least {MIN_POINTS_PER_CENTROID} vectors to train, got {n}")
+
+    index = create_index(index_type, dim, n)
+    if not index.is_trained:
+        ivf = faiss.extract_index_ivf(index)
+        sample_size = min(n, ivf.nlist * MAX_TRAINING_POINTS_PER_CENTROID)
+        sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)] if sample_size < n else vectors
+        index.train(sample)
+    if n:
+        index.add(vectors)
+    return index
+
+
+def search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Per-call search parameters; the shared index's own settings are left untouched."""
+    index_type = index_type_of(index)
+    if index_type in ("ivfflat", "ivfpq") and nprobe:
+        return faiss.SearchParametersIVF(nprobe=int(nprobe))
+    if index_type == "hnsw" and ef_search:
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
+
+
+def search(index, queries: np.ndarray, k: int, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    params = search_params(index, nprobe, ef_search)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
+
+
+def describe(index) -> dict:
+    index_type = index_type_of(index)
+    info = {"type": index_type, "ntotal": int(index.ntotal), "dim": int(index.d), "is_trained": bool(index.is_trained)}
+    if index_type in ("ivfflat", "ivfpq"):
+        ivf = faiss.extract_index_ivf(index)
+        info.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+    elif index_type == "hnsw":
+        info.update(M=FAISS_HNSW_M, ef_search=int(index.hnsw.efSearch), ef_construction=int(index.hnsw.efConstruction))
+    return info
+
+
+# -------------------------
+# Recall vs latency benchmark
+# -------------------------
+def benchmark(vectors: np.ndarray, index_types: Sequence[str] = ("ivfflat", "ivfpq", "hnsw"), k: int = 10,
+              n_queries: int = 200, nprobes: Sequence[int] = (1, 4, 16, 64),
+              ef_searches: Sequence[int] = (16, 32, 64, 128), seed: int = 0) -> List[Dict]:
+    """
+    recall@k and per-query latency of each index type against exact IndexFlatL2
+    search. Queries are corpus vectors with a little Gaussian noise, so they
+    look like real resume/job embeddings without being exact duplicates.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n = len(vectors)
+    if n == 0:
+        raise ValueError("No vectors to benchmark")
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, min(n_queries, n), replace=False)]
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype("float32")
+
+    def timed_search(index, **params):
+        started = time.perf_counter()
+        _, ids = search(index, queries, k, **params)
+        return ids, (time.perf_counter() - started) / len(queries) * 1000
+
+    exact = build_index(vectors, "flat")
+    truth, exact_ms = timed_search(exact)
+    results = [{"type": "flat", "params": {}, "build_seconds": 0.0, "recall_at_k": 1.0,
+                "latency_ms_per_query": round(exact_ms, 4)}]
+
+    for index_type in index_types:
+        started = time.perf_counter()
+        try:
+            index = build_index(vectors, index_type)
+        except ValueError as e:
+            results.append({"type": index_type, "error": str(e)})
+            continue
+        build_seconds = round(time.perf_counter() - started, 3)
+
+        if index_type == "hnsw":
+            sweep = [{"ef_search": ef} for ef in ef_searches]
+        elif index_type in ("ivfflat", "ivfpq"):
+            nlist = faiss.extract_index_ivf(index).nlist
+            sweep = [{"nprobe": p} for p in nprobes if p <= nlist] or [{"nprobe": nlist}]
+        else:
+            sweep = [{}]
+
+        for params in sweep:
+            ids, latency_ms = timed_search(index, **params)
+            hits = sum(len(set(found[found >= 0]) & set(expected)) for found, expected in zip(ids, truth))
+            results.append({
+                "type": index_type,
+                "params": params,
+                "build_seconds": build_seconds,
+                "recall_at_k": round(hits / (len(queries) * k), 4),
+                "latency_ms_per_query": round(latency_ms, 4),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or benchmark the candidate FAISS index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_cmd = sub.add_parser("rebuild", help="Retrain and rebuild the index from the stored exact vectors")
+    rebuild_cmd.add_argument("--type", default=None, help="auto | " + " | ".join(INDEX_TYPES))
+
+    bench_cmd = sub.add_parser("benchmark", help="Recall@k vs latency against exact search")
+    bench_cmd.add_argument("--types", nargs="+", default=["ivfflat", "ivfpq", "hnsw"])
+    bench_cmd.add_argument("--k", type=int, default=10)
+    bench_cmd.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from faiss_store import faiss_store, IndexLockedError
+    try:
+        faiss_store.load()
+    except IndexLockedError as e:
+        parser.exit(1, f"{e}\n")
+    try:
+        if args.command == "rebuild":
+            print(faiss_store.rebuild(args.type))
+        else:
+            for row in benchmark(faiss_store.exact_vectors(), args.types, k=args.k, n_queries=args.queries):
+                print(row)
+    finally:
+        faiss_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+# faiss_store.py
+import os
+import json
+import time
+import base64
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+from faiss_index_factory import (
+    build_index, create_index, describe, index_type_of, initial_index_type, resolve_index_type,
+    search as index_search,
+    FAISS_INDEX_TYPE, FAISS_PROMOTE_AT, FAISS_PQ_NBITS, MIN_POINTS_PER_CENTROID
+)
+
+# -------------------------
+# FAISS paths
+# -------------------------
+FAISS_INDEX_DIR = "FAISS_Index"
+FAISS_INDEX_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_index.faiss')
+CANDIDATE_IDS_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_ids.json')
+SNIPPET_METADATA_PATH = os.path.join(FAISS_INDEX_DIR, 'snippet_metadata.json')
+WAL_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_index.wal')
+# Exact float32 copy of every indexed vector (row = FAISS position), used to retrain/rebuild ANN indexes
+VECTORS_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_vectors.f32')
+
+os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
+
+# Checkpoint after this many appended vectors, or this many seconds since the last checkpoint
+CHECKPOINT_EVERY = int(os.getenv("FAISS_CHECKPOINT_EVERY", "200"))
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("FAISS_CHECKPOINT_INTERVAL_SECONDS", "300"))
+# IVF indexes are retrained once the corpus grows this many times past the size they were trained on
+FAISS_RETRAIN_FACTOR = float(os.getenv("FAISS_RETRAIN_FACTOR", "4"))
+# After a failed automatic rebuild, wait until the corpus grows this many times before retrying
+FAISS_REBUILD_RETRY_GROWTH = float(os.getenv("FAISS_REBUILD_RETRY_GROWTH", "1.5"))
+
+
+class IndexLockedError(RuntimeError):
+    """Another process already owns the FAISS index files."""
+
+
+class FaissIndexStore:
+    """
+    Keeps the FAISS index, candidate ids and snippet metadata resident in memory.
+
+    Every add() is first appended to a write-ahead log (one JSON line per
+    vector) and only then applied in memory, so an upload costs O(1) disk I/O.
+    The full index is checkpointed every CHECKPOINT_EVERY vectors, after
+    CHECKPOINT_INTERVAL_SECONDS, or on shutdown; load() replays any log
+    entries newer than the last checkpoint.
+
+    The index type comes from faiss_index_factory. Exact vectors are kept in a
+    memory-mapped sidecar file so the index can be retrained or switched type
+    at any time. Under FAISS_INDEX_TYPE=auto the store promotes itself from
+    Flat once the corpus reaches FAISS_PROMOTE_AT, rebuilding in a background
+    thread while searches keep using the current index. A manual rebuild to
+    another type sticks for the life of the process; automatic promotion
+    then works towards that type instead of the configured one.
+
+    load() takes an exclusive lock on the index directory: a second process
+    (e.g. a CLI tool while the API server runs) gets IndexLockedError instead
+    of interleaving WAL writes and checkpoints with the owner.
+    """
+
+    def __init__(self, dim: Optional[int] = None, index_path=FAISS_INDEX_PATH, candidate_ids_path=CANDIDATE_IDS_PATH,
+                 snippet_metadata_path=SNIPPET_METADATA_PATH, wal_path=WAL_PATH, vectors_path=VECTORS_PATH,
+                 lock_path=None):
+        self._dim = dim
+        self.index_path = index_path
+        self.candidate_ids_path = candidate_ids_path
+        self.snippet_metadata_path = snippet_metadata_path
+        self.wal_path = wal_path
+        self.vectors_path = vectors_path
+        # Held exclusively by the one process (API server or CLI tool) that owns the files above
+        self.lock_path = lock_path or os.path.join(os.path.dirname(index_path) or ".", "index.lock")
+        self._lock_file = None
+
+        self.index = None
+        self.candidate_ids = []
+        self.snippet_metadata = {}
+        self.generation = 0
+
+        self._wal = None
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+        self._lock = threading.RLock()
+
+        self._unsaved_vectors: List[np.ndarray] = []   # appended to the sidecar at the next checkpoint
+        self._rebuilding = False
+        self._built_size = 0
+        self._requested_type: Optional[str] = None   # set by a manual rebuild(index_type)
+        self.last_rebuild: Optional[dict] = None
+        self.last_rebuild_failure: Optional[dict] = None
+
+    @property
+    def dim(self) -> int:
+        # Read from the embedding model on first use, so importing the store does not load it
+        if self._dim is None:
+            from embedding_service import embedding_service
+            self._dim = embedding_service.dimension
+        return self._dim
+
+    # -------------------------
+    # Process lock
+    # -------------------------
+    def _acquire_process_lock(self):
+        if self._lock_file is not None:
+            return
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise IndexLockedError(
+                f"FAISS index in {os.path.dirname(self.lock_path) or '.'} is in use by another process. "
+                f"Stop the API server first, or go through POST /upload-resumes/batch and POST /faiss/rebuild."
+            )
+        self._lock_file = lock_file
+
+    def _release_process_lock(self):
+        if self._lock_file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._lock_file.seek(0)
+            msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._lock_file.close()
+        self._lock_file = None
+
+    # -------------------------
+    # Loading / recovery
+    # -------------------------
+    def _load_checkpoint(self):
+        if os.path.exists(self.index_path) and os.path.exists(self.candidate_ids_path):
+            try:
+                index = faiss.read_index(self.index_path)
+                with open(self.candidate_ids_path, 'r', encoding='utf-8') as f:
+                    candidate_ids = json.load(f)
+
+                snippet_metadata = {}
+                if os.path.exists(self.snippet_metadata_path):
+                    with open(self.snippet_metadata_path, 'r', encoding='utf-8') as f:
+                        snippet_metadata = json.load(f)
+
+                logging.info(f"Loaded FAISS checkpoint with {index.ntotal} vectors ({index_type_of(index)})")
+                self._sync_vectors_file(index)
+                return index, candidate_ids, snippet_metadata
+            except Exception as e:
+                logging.warning(f"Failed to load FAISS files: {e}. Creating fresh index.")
+
+        # IVF types cannot start empty (they need training data); start Flat and promote later
+        self._sync_vectors_file(None)
+        return create_index(initial_index_type(), self.dim), [], {}
+
+    def _vector_rows_on_disk(self) -> int:
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _sync_vectors_file(self, index):
+        """Make the sidecar hold exactly one row per checkpointed vector."""
+        ntotal = index.ntotal if index is not None else 0
+        rows = self._vector_rows_on_disk()
+        if rows > ntotal:
+            # Rows written just before a crash that never reached the index checkpoint
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(ntotal * 4 * self.dim)
+        elif rows < ntotal:
+            # Checkpoints written before the sidecar existed were always Flat, which can be reconstructed
+            try:
+                missing = index.reconstruct_n(rows, ntotal - rows)
+            except Exception as e:
+                logging.warning(f"Cannot recover exact vectors from the {index_type_of(index)} index ({e}); "
+                                f"rebuilds will be unavailable until the index is re-ingested")
+                return
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(missing, dtype='float32').tobytes())
+            logging.info(f"Wrote {ntotal - rows} exact vectors to {self.vectors_path}")
+
+    def _replay_wal(self) -> int:
+        if not os.path.exists(self.wal_path):
+            return 0
+
+        replayed = 0
+        with open(self.wal_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write from a crash — everything before it is intact
+                    logging.warning(f"Ignoring truncated WAL record at line {line_no}")
+                    break
+
+                faiss_idx = int(record["faiss_index"])
+                if faiss_idx < self.index.ntotal:
+                    continue  # already part of the checkpoint
+                if faiss_idx != self.index.ntotal:
+                    logging.error(f"WAL gap at faiss_index {faiss_idx} (index has {self.index.ntotal}); stopping replay")
+                    break
+
+                vector = np.frombuffer(base64.b64decode(record["vector"]), dtype='float32')
+                self.index.add(np.expand_dims(vector, axis=0))
+                self._unsaved_vectors.append(np.expand_dims(vector, axis=0))
+                self.candidate_ids.append(record["candidate_id"])
+                self.snippet_metadata[str(faiss_idx)] = record["metadata"]
+                replayed += 1
+
+        return replayed
+
+    def load(self):
+        with self._lock:
+            if self.index is not None:
+                return
+            self._acquire_process_lock()
+            self.index, self.candidate_ids, self.snippet_metadata = self._load_checkpoint()
+            self._built_size = self.index.ntotal
+            replayed = self._replay_wal()
+            if replayed:
+                logging.info(f"Replayed {replayed} vectors from FAISS write-ahead log")
+                self.checkpoint()
+            if self._wal is None:
+                self._wal = open(self.wal_path, 'a', encoding='utf-8')
+            self.generation += 1
+            self._maybe_promote()
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def add(self, vectors: np.ndarray, entries: List[Tuple[int, dict]]) -> List[int]:
+        """
+        Append vectors with their (candidate_id, snippet_metadata) entries.
+        Returns the FAISS positions assigned to them.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype='float32').reshape(-1, self.dim)
+        if len(vectors) != len(entries):
+            raise ValueError("vectors and entries must have the same length")
+
+        with self._lock:
+            self.load()
+            start = self.index.ntotal
+
+            for offset, (vector, (candidate_id, metadata)) in enumerate(zip(vectors, entries)):
+                self._wal.write(json.dumps({
+                    "faiss_index": start + offset,
+                    "candidate_id": candidate_id,
+                    "metadata": metadata,
+                    "vector": base64.b64encode(vector.tobytes()).decode('ascii'),
+                }) + "\n")
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+
+            self.index.add(vectors)
+            self._unsaved_vectors.append(vectors)
+            for offset, (candidate_id, metadata) in enumerate(entries):
+                self.candidate_ids.append(candidate_id)
+                self.snippet_metadata[str(start + offset)] = metadata
+
+            self.generation += 1
+            self._pending += len(entries)
+
+            if (self._pending >= CHECKPOINT_EVERY
+                    or time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS):
+                self.checkpoint()
+            self._maybe_promote()
+
+            return list(range(start, start + len(entries)))
+
+    def checkpoint(self):
+        """Write the full index + metadata atomically, then truncate the WAL."""
+        with self._lock:
+            if self.index is None:
+                return
+
+            # Exact vectors first: on restart the sidecar is truncated back to the checkpointed count
+            if self._unsaved_vectors:
+                with open(self.vectors_path, 'ab') as f:
+                    for vectors in self._unsaved_vectors:
+                        f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._unsaved_vectors = []
+
+            faiss.write_index(self.index, self.index_path + ".tmp")
+            with open(self.candidate_ids_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(self.candidate_ids, f, indent=2)
+            with open(self.snippet_metadata_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(self.snippet_metadata, f, indent=4)
+
+            os.replace(self.index_path + ".tmp", self.index_path)
+            os.replace(self.candidate_ids_path + ".tmp", self.candidate_ids_path)
+            os.replace(self.snippet_metadata_path + ".tmp", self.snippet_metadata_path)
+
+            # Everything in the log is now in the checkpoint
+            if self._wal is not None:
+                self._wal.close()
+            self._wal = open(self.wal_path, 'w', encoding='utf-8')
+
+            self._pending = 0
+            self._last_checkpoint = time.monotonic()
+            logging.info(f"FAISS checkpoint written. Total vectors: {self.index.ntotal}")
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    @property
+    def ntotal(self) -> int:
+        with self._lock:
+            self.load()
+            return self.index.ntotal
+
+    def search(self, query_vectors: np.ndarray, top_k: int,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """nprobe (IVF) / ef_search (HNSW) apply to this call only."""
+        with self._lock:
+            self.load()
+            return index_search(self.index, query_vectors, top_k, nprobe=nprobe, ef_search=ef_search)
+
+    def exact_vectors(self, start: int = 0) -> np.ndarray:
+        """Exact copies of the indexed vectors from FAISS position `start` on."""
+        with self._lock:
+            self.load()
+            parts = []
+            rows = self._vector_rows_on_disk()
+            if rows > start:
+                stored = np.memmap(self.vectors_path, dtype='float32', mode='r', shape=(rows, self.dim))
+                parts.append(np.array(stored[start:]))
+            skip = max(0, start - rows)
+            for vectors in self._unsaved_vectors:
+                if skip >= len(vectors):
+                    skip -= len(vectors)
+                    continue
+                parts.append(vectors[skip:])
+                skip = 0
+            if not parts:
+                return np.zeros((0, self.dim), dtype='float32')
+            return np.ascontiguousarray(np.vstack(parts), dtype='float32')
+
+    # -------------------------
+    # Index type management
+    # -------------------------
+    def _promotion_target(self) -> Optional[str]:
+        ntotal = self.index.ntotal
+        target = resolve_index_type(ntotal, self._requested_type)
+        current = index_type_of(self.index)
+        if target in ("ivfflat", "ivfpq"):
+            needed = 2 ** FAISS_PQ_NBITS if target == "ivfpq" else MIN_POINTS_PER_CENTROID
+            if ntotal < needed:
+                return None
+            if current == target and ntotal < self._built_size * FAISS_RETRAIN_FACTOR:
+                return None
+        elif current == target:
+            return None
+        return target
+
+    def _maybe_promote(self):
+        if self._rebuilding:
+            return
+        # A failed rebuild is not retried on every add(); only once the corpus has grown
+        failure = self.last_rebuild_failure
+        if failure and self.index.ntotal < failure["ntotal"] * FAISS_REBUILD_RETRY_GROWTH:
+            return
+        target = self._promotion_target()
+        if target is None:
+            return
+        self._rebuilding = True
+        logging.info(f"Promoting FAISS index from {index_type_of(self.index)} to {target} at {self.index.ntotal} vectors")
+        threading.Thread(target=self._rebuild, args=(target,), daemon=True).start()
+
+    def rebuild(self, index_type: Optional[str] = None) -> dict:
+        """
+        Retrain and rebuild the index from the exact vectors (blocking).
+        index_type defaults to FAISS_INDEX_TYPE resolved for the current size.
+        A successful manual rebuild also re-enables automatic promotion after
+        an earlier failure.
+        """
+        with self._lock:
+            self.load()
+            if self._rebuilding:
+                raise RuntimeError("A FAISS rebuild is already running")
+            self._rebuilding = True
+        return self._rebuild(index_type, manual=True)
+
+    def _rebuild(self, index_type: Optional[str], manual: bool = False) -> dict:
+        try:
+            with self._lock:
+                if self.index is None:
+                    raise RuntimeError("FAISS store was closed before the rebuild started")
+                vectors = self.exact_vectors()
+                ntotal = self.index.ntotal
+            if len(vectors) < ntotal:
+                raise RuntimeError(f"Only {len(vectors)} of {ntotal} exact vectors are available")
+            target = resolve_index_type(len(vectors), index_type)
+
+            # Train + fill outside the lock; searches and uploads continue on the current index
+            started = time.perf_counter()
+            index = build_index(vectors, target)
+
+            with self._lock:
+                # close() may have run during the build; do not reopen the files
+                if self.index is None:
+                    raise RuntimeError("FAISS store was closed during the rebuild")
+                appended = self.exact_vectors(start=len(vectors))
+                if len(appended):
+                    index.add(appended)
+                self.index = index
+                self._built_size = index.ntotal
+                self.generation += 1
+                self.checkpoint()
+                self.last_rebuild_failure = None
+                if manual:
+                    self._requested_type = index_type
+                self.last_rebuild = {
+                    **describe(index),
+                    "build_seconds": round(time.perf_counter() - started, 3),
+                    "finished_at": time.time(),
+                }
+            logging.info(f"FAISS index rebuilt: {self.last_rebuild}")
+            return self.last_rebuild
+        except Exception as e:
+            with self._lock:
+                self.last_rebuild_failure = {
+                    "ntotal": int(self.index.ntotal) if self.index is not None else 0,
+                    "requested_type": index_type,
+                    "error": str(e),
+                    "failed_at": time.time(),
+                }
+            logging.error(f"FAISS rebuild failed: {e}")
+            raise
+        finally:
+            self._rebuilding = False
+
+    def info(self) -> dict:
+        with self._lock:
+            self.load()
+            return {
+                **describe(self.index),
+                "configured_type": FAISS_INDEX_TYPE,
+                "promote_at": FAISS_PROMOTE_AT,
+                "exact_vectors": self._vector_rows_on_disk() + sum(len(v) for v in self._unsaved_vectors),
+                "rebuilding": self._rebuilding,
+                "last_rebuild": self.last_rebuild,
+                "last_rebuild_failure": self.last_rebuild_failure,
+            }
+
+    def positions_of(self, candidate_ids: List[int]) -> Dict[int, int]:
+        """FAISS position of each given candidate id the index already holds (first one wins)."""
+        wanted = set(candidate_ids)
+        with self._lock:
+            self.load()
+            positions = {}
+            for position, candidate_id in enumerate(self.candidate_ids):
+                if candidate_id in wanted and candidate_id not in positions:
+                    positions[candidate_id] = position
+            return positions
+
+    def nearest_candidates(self, query_vector: np.ndarray, n: int,
+                           nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Up to n (candidate_id, L2 distance) pairs closest to query_vector, one
+        per candidate. Over-fetches so candidates with several vectors do not
+        crowd others out of the result.
+        """
+        with self._lock:
+            self.load()
+            total = self.index.ntotal
+            if total == 0 or n <= 0:
+                return []
+            fetch = min(total, n * 2)
+            while True:
+                D, I = index_search(self.index, np.asarray(query_vector).reshape(1, -1), fetch,
+                                    nprobe=nprobe, ef_search=ef_search)
+                nearest, seen = [], set()
+                for pos, dist in zip(I[0], D[0]):
+                    if pos < 0:
+                        continue
+                    candidate_id = self.candidate_ids[pos]
+                    if not isinstance(candidate_id, int) or candidate_id in seen:
+                        continue   # legacy name-keyed entries / duplicate vectors
+                    seen.add(candidate_id)
+                    nearest.append((candidate_id, float(dist)))
+                    if len(nearest) == n:
+                        return nearest
+                if fetch >= total:
+                    return nearest
+                fetch = min(total, fetch * 2)
+
+    def close(self):
+        with self._lock:
+            if self.index is None:
+                return
+            if self._pending:
+                self.checkpoint()
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            self.index = None
+            self._release_process_lock()
+
+
+# create a global instance
+faiss_store = FaissIndexStore()
@@ -1,16 +1,20 @@
-import os
 import re
 import json
 import logging
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
+from llm_gateway import llm_gateway
 
-from skill_gap import _normalize_skills
-from db import get_connection, release_connection
+from skill_index import normalize_skills
+from db import async_db
+from candidate_repository import candidate_repository
+from narrative_jobs import narrative_jobs, validate_narrative_mode, sse_event
+from llm_stream import JsonItemStream
 
 load_dotenv()
 
@@ -22,6 +26,7 @@ class InterviewRequest(BaseModel):
     job_id: int
     num_questions: int = 8
     focus: str = "balanced"   # balanced, technical, behavioral, leadership
+    narrative: str = "sync"   # sync | deferred | none
 
 
 class InterviewQuestion(BaseModel):
@@ -39,21 +44,13 @@ class InterviewResponse(BaseModel):
     job_title: str
     summary: str
     questions: List[InterviewQuestion]
+    missing_skills: List[str] = []
+    narrative_job_id: Optional[str] = None
 
 
 # ========================= LLM SETUP =========================
-def get_llm():
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        raise Exception("GROQ_API_KEY is not set in .env file")
-
-    logging.info("Using Groq API with model: llama-3.3-70b-versatile")
-    return ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.7,
-        api_key=groq_key,
-        max_tokens=3000
-    )
+# Groq call settings (client pooling and limits live in llm_gateway)
+LLM_PARAMS = {"temperature": 0.7, "max_tokens": 3000}
 
 
 # ========================= HELPERS =========================
@@ -73,65 +70,73 @@ def extract_json(text: str) -> dict:
     return json.loads(json_match.group(0).strip())
 
 
+class NoQuestionsError(ValueError):
+    pass
+
+
+def generate_interview_questions(prompt: str, job_title: str) -> dict:
+    """
+    Blocking Groq call. Returns {"summary", "questions": [...]}; raises
+    ValueError / json.JSONDecodeError when the output is unusable.
+    """
+    raw = llm_gateway.invoke(prompt, **LLM_PARAMS).strip()
+
+    logging.info(f"Groq raw response (first 500 chars): {raw[:500]}")
+
+    data = extract_json(raw)
+
+    raw_questions = data.get("questions", [])
+    if not raw_questions:
+        raise NoQuestionsError("LLM returned no questions in the response.")
+
+    questions = [
+        InterviewQuestion(
+            question=q.get("question", ""),
+            difficulty=q.get("difficulty", "Medium"),
+            category=q.get("category", "General"),
+            rubric=q.get("rubric", "No rubric provided."),
+            evidence=q.get("evidence", [])
+        ).model_dump()
+        for q in raw_questions
+    ]
+
+    return {
+        "summary": data.get(
+            "summary",
+            f"Custom interview for {job_title} focusing on skill gaps and traits."
+        ),
+        "questions": questions
+    }
+
+
 # ========================= ENDPOINT =========================
-@router.post("/generate-interview", response_model=InterviewResponse)
-async def generate_interview(request: InterviewRequest):
+async def prepare_interview(request: InterviewRequest) -> Tuple[InterviewResponse, str]:
+    """Validate, load job + candidate and build the prompt; questions are left empty."""
     if request.num_questions < 4 or request.num_questions > 15:
         raise HTTPException(
             status_code=400,
             detail="Number of questions must be between 4 and 15"
         )
+    validate_narrative_mode(request.narrative)
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    try:
-        # Fetch Job
-        cur.execute(
-            "SELECT title, description, skills FROM jobs WHERE job_id = %s",
-            (request.job_id,)
-        )
-        job_row = cur.fetchone()
-        if not job_row:
-            raise HTTPException(status_code=404, detail="Job not found")
-        job_title, job_desc, job_skills_raw = job_row
-        job_skills = _normalize_skills(job_skills_raw)
-
-        # Fetch Candidate
-        cur.execute("""
-            SELECT rs.structured_json,
-                   COALESCE(rt.leadership, 0),
-                   COALESCE(rt.communication, 0),
-                   COALESCE(rt.analytical_thinking, 0),
-                   COALESCE(rt.ownership, 0),
-                   COALESCE(rt.problem_solving, 0),
-                   COALESCE(rt.attention_to_detail, 0)
-            FROM resumes r
-            JOIN resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-            WHERE r.id = %s
-        """, (request.candidate_id,))
-        cand_row = cur.fetchone()
-
-    finally:
-        cur.close()
-        release_connection(conn)
-
-    if not cand_row:
+    # Fetch Job
+    job_row = await async_db.fetchone(
+        "SELECT title, description, skills FROM jobs WHERE job_id = %s",
+        (request.job_id,)
+    )
+    if not job_row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_title, job_desc, job_skills_raw = job_row
+    job_skills = normalize_skills(job_skills_raw)
+
+    # Fetch Candidate
+    candidate = await candidate_repository.get(request.candidate_id)
+    if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
-    structured = cand_row[0]
-    candidate_name = structured.get("name", f"Candidate {request.candidate_id}")
-    candidate_skills = _normalize_skills(structured.get("skills", []))
-
-    traits = {
-        "leadership":           float(cand_row[1]),
-        "communication":        float(cand_row[2]),
-        "analytical_thinking":  float(cand_row[3]),
-        "ownership":            float(cand_row[4]),
-        "problem_solving":      float(cand_row[5]),
-        "attention_to_detail":  float(cand_row[6]),
-    }
+    candidate_name = candidate["name"]
+    candidate_skills = candidate["skills"]
+    traits = candidate["traits"]
 
     missing_skills = sorted(set(job_skills) - set(candidate_skills))
 
@@ -168,56 +173,102 @@ Required format:
   ]
 }}"""
 
-    try:
-        llm = get_llm()
-        response = llm.invoke(prompt)
-        raw = response.content.strip()
-
-        logging.info(f"Groq raw response (first 500 chars): {raw[:500]}")
-
-        data = extract_json(raw)
-
-        raw_questions = data.get("questions", [])
-        if not raw_questions:
-            raise HTTPException(
-                status_code=500,
-                detail="LLM returned no questions in the response."
-            )
-
-        questions = [
-            InterviewQuestion(
-                question=q.get("question", ""),
-                difficulty=q.get("difficulty", "Medium"),
-                category=q.get("category", "General"),
-                rubric=q.get("rubric", "No rubric provided."),
-                evidence=q.get("evidence", [])
-            )
-            for q in raw_questions
-        ]
-
-        return InterviewResponse(
-            candidate_id=request.candidate_id,
-            candidate_name=candidate_name,
-            job_id=request.job_id,
-            job_title=job_title,
-            summary=data.get(
-                "summary",
-                f"Custom interview for {job_title} focusing on skill gaps and traits."
-            ),
-            questions=questions
+    response = InterviewResponse(
+        candidate_id=request.candidate_id,
+        candidate_name=candidate_name,
+        job_id=request.job_id,
+        job_title=job_title,
+        summary="Interview questions were not requested.",
+        questions=[],
+        missing_skills=missing_skills
+    )
+    return response, prompt
+
+
+@router.post("/generate-interview", response_model=InterviewResponse)
+async def generate_interview(request: InterviewRequest):
+    response, prompt = await prepare_interview(request)
+    job_title = response.job_title
+
+    if request.narrative == "deferred":
+        response.narrative_job_id = narrative_jobs.submit(
+            "generate-interview", generate_interview_questions, prompt, job_title
         )
+        response.summary = "Interview questions are being generated."
+        return response
+    if request.narrative == "none":
+        return response
+
+    try:
+        data = await run_in_threadpool(generate_interview_questions, prompt, job_title)
+        response.questions = [InterviewQuestion(**q) for q in data["questions"]]
+        response.summary = data["summary"]
+        return response
 
+    except NoQuestionsError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     except (json.JSONDecodeError, ValueError) as e:
         logging.error(f"JSON parsing failed: {e}")
         raise HTTPException(
             status_code=500,
             detail="LLM returned invalid JSON. Please try again."
         )
-    except HTTPException:
-        raise
     except Exception as e:
         logging.error(f"Interview generation failed: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate interview: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def _question_from_item(item: dict) -> dict:
+    return InterviewQuestion(
+        question=item.get("question", ""),
+        difficulty=item.get("difficulty", "Medium"),
+        category=item.get("category", "General"),
+        rubric=item.get("rubric", "No rubric provided."),
+        evidence=item.get("evidence", [])
+    ).model_dump()
+
+
+@router.post("/generate-interview/stream")
+async def generate_interview_stream(request: InterviewRequest):
+    """
+    Server-Sent Events version of /generate-interview. Emits `meta` (candidate,
+    job, missing skills), `summary`, one `question` event per question as soon
+    as its JSON object is complete, then `done` (or `error`).
+    """
+    response, prompt = await prepare_interview(request)
+
+    async def events():
+        meta = response.model_dump()
+        meta.pop("questions", None)
+        yield sse_event("meta", meta)
+
+        parser = JsonItemStream("questions")
+        count = 0
+        try:
+            async for text in llm_gateway.astream(prompt, **LLM_PARAMS):
+                for kind, value in parser.feed(text):
+                    if kind == "summary":
+                        yield sse_event("summary", {"summary": value})
+                    else:
+                        yield sse_event("question", {"index": count, **_question_from_item(value)})
+                        count += 1
+
+            if not count:
+                # Model drifted from the format; fall back to whole-buffer extraction
+                data = extract_json(parser.buffer)
+                for index, item in enumerate(data.get("questions", [])):
+                    yield sse_event("question", {"index": index, **_question_from_item(item)})
+                    count += 1
+                if not count:
+                    raise NoQuestionsError("LLM returned no questions in the response.")
+
+            yield sse_event("done", {"count": count})
+        except Exception as e:
+            logging.error(f"Interview stream failed: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
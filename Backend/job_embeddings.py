@@ -0,0 +1,150 @@
+# job_embeddings.py
+"""
+Job embeddings stored on the jobs row.
+
+A job's title + description + skills are embedded once when it is created
+(jobs.embedding as float32 bytes, jobs.embedding_version naming the
+model and text version). Compare, semantic job recommendations and
+job-to-candidate vector search read the stored vector; jobs created before
+the columns existed, or under an older version, are embedded on first read
+and written back.
+"""
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from db import async_db, get_connection, release_connection
+from embedding_service import embedding_service
+
+# Bump when job_text changes so stale vectors are re-embedded lazily
+JOB_TEXT_VERSION = "job_v1"
+JOB_EMBEDDING_VERSION = f"{embedding_service.model_name}|{JOB_TEXT_VERSION}"
+
+
+def job_text(title: Optional[str], description: Optional[str], skills) -> str:
+    skills = skills if isinstance(skills, list) else []
+    return f"{title or ''} {description or ''} {' '.join(skills)}"
+
+
+def ensure_job_embedding_columns(cur):
+    cur.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS embedding BYTEA;")
+    cur.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS embedding_version TEXT;")
+
+
+def init_job_embedding_columns():
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        ensure_job_embedding_columns(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+async def embed_job(title: Optional[str], description: Optional[str], skills) -> np.ndarray:
+    """Normalised embedding of a job's text (one shared-model call)."""
+    return (await embedding_service.embed([job_text(title, description, skills)], normalize=True))[0]
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="float32").tobytes()
+
+
+class JobEmbeddingStore:
+    """
+    get_many(job_ids) returns {job_id: normalised vector}. Vectors are kept in
+    memory after the first read; create_job calls put().
+    After one full load, get_many() without ids is served from memory too.
+    """
+
+    def __init__(self):
+        self._cache: Dict[int, np.ndarray] = {}
+        self._fully_loaded = False
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._backfilled = 0
+
+    def put(self, job_id: int, vector: np.ndarray):
+        with self._lock:
+            self._cache[job_id] = vector
+
+    def invalidate(self, job_id: Optional[int] = None):
+        with self._lock:
+            if job_id is None:
+                self._cache.clear()
+                self._fully_loaded = False
+            else:
+                self._cache.pop(job_id, None)
+
+    async def get(self, job_id: int) -> Optional[np.ndarray]:
+        return (await self.get_many([job_id])).get(job_id)
+
+    async def get_many(self, job_ids: Optional[List[int]] = None) -> Dict[int, np.ndarray]:
+        """Vectors for `job_ids` (every job when None); unknown ids are absent."""
+        found: Dict[int, np.ndarray] = {}
+        if job_ids is not None:
+            with self._lock:
+                found = {jid: self._cache[jid] for jid in job_ids if jid in self._cache}
+                self._hits += len(found)
+            missing = [jid for jid in dict.fromkeys(job_ids) if jid not in found]
+            if not missing:
+                return found
+            rows = await async_db.fetchall(
+                "SELECT job_id, title, description, skills, embedding, embedding_version FROM jobs WHERE job_id = ANY(%s)",
+                (missing,)
+            )
+        else:
+            with self._lock:
+                if self._fully_loaded:
+                    self._hits += len(self._cache)
+                    return dict(self._cache)
+            rows = await async_db.fetchall(
+                "SELECT job_id, title, description, skills, embedding, embedding_version FROM jobs"
+            )
+
+        stale = []
+        for job_id, title, description, skills, blob, version in rows:
+            if blob is not None and version == JOB_EMBEDDING_VERSION:
+                found[job_id] = np.frombuffer(bytes(blob), dtype="float32")
+            else:
+                stale.append((job_id, job_text(title, description, skills)))
+
+        if stale:
+            vectors = await embedding_service.embed([text for _, text in stale], normalize=True)
+            async with async_db.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(
+                        "UPDATE jobs SET embedding = %s, embedding_version = %s WHERE job_id = %s",
+                        [(to_bytes(vec), JOB_EMBEDDING_VERSION, job_id) for (job_id, _), vec in zip(stale, vectors)]
+                    )
+            for (job_id, _), vec in zip(stale, vectors):
+                found[job_id] = vec
+            with self._lock:
+                self._backfilled += len(stale)
+            logging.info(f"Embedded {len(stale)} jobs missing a current embedding")
+
+        with self._lock:
+            self._cache.update(found)
+            if job_ids is None:
+                self._fully_loaded = True
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": JOB_EMBEDDING_VERSION,
+                "cached": len(self._cache),
+                "fully_loaded": self._fully_loaded,
+                "hits": self._hits,
+                "backfilled": self._backfilled,
+            }
+
+
+# create a global instance
+job_embeddings = JobEmbeddingStore()
@@ -0,0 +1,149 @@
+# llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+# -------------------------
+# Config
+# -------------------------
+LLM_CACHE_DIR = "LLM_Cache"
+LLM_CACHE_PATH = os.path.join(LLM_CACHE_DIR, "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed cache of parsed LLM outputs.
+
+    Keys are sha256(cleaned_text) + sha256(prompt template) + model name, so
+    re-uploading the same resume (under any filename) costs zero LLM calls,
+    while editing a prompt or switching model naturally misses. Entries are
+    evicted least-recently-used once LLM_CACHE_MAX_ENTRIES is exceeded.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._conn = None
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_cache(last_accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(namespace: str, text: str, prompt_template: str, model: str) -> str:
+        return f"{namespace}:{_sha256(text)}:{_sha256(prompt_template)[:16]}:{model}"
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        namespace = key.split(":", 1)[0]
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT value FROM llm_cache WHERE cache_key = ?", (key,)).fetchone()
+                if row is None:
+                    self._misses[namespace] = self._misses.get(namespace, 0) + 1
+                    return None
+                conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE cache_key = ?", (time.time(), key))
+                conn.commit()
+                self._hits[namespace] = self._hits.get(namespace, 0) + 1
+            return json.loads(row[0])
+        except Exception as e:
+            logging.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def put(self, key: str, value: dict):
+        if not self.enabled or not value:
+            return
+        namespace = key.split(":", 1)[0]
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("""
+                    INSERT OR REPLACE INTO llm_cache (cache_key, namespace, value, created_at, last_accessed)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (key, namespace, json.dumps(value), now, now))
+
+                count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute("""
+                        DELETE FROM llm_cache WHERE cache_key IN (
+                            SELECT cache_key FROM llm_cache ORDER BY last_accessed ASC LIMIT ?
+                        )
+                    """, (count - self.max_entries,))
+                conn.commit()
+        except Exception as e:
+            logging.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            per_namespace = {}
+            for ns in namespaces:
+                hits, misses = self._hits.get(ns, 0), self._misses.get(ns, 0)
+                per_namespace[ns] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                }
+            total_hits, total_misses = sum(self._hits.values()), sum(self._misses.values())
+            entries = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if self.enabled else 0
+
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": round(total_hits / (total_hits + total_misses), 3) if total_hits + total_misses else None,
+            "namespaces": per_namespace,
+        }
+
+
+# create a global instance
+llm_cache = LLMCache()
+
+
+@router.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    try:
+        return JSONResponse(status_code=200, content=llm_cache.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,119 @@
+import os
+import logging
+from typing import Any, List, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
+from dotenv import load_dotenv
+
+from llm_processor import _parse_response_text, _empty_resume_structure, load_prompt_template
+from llm_cache import llm_cache
+from llm_gateway import llm_gateway, BackendUnavailable
+load_dotenv()
+
+# -------------------------
+# Setup logging
+# -------------------------
+logging.basicConfig(level=logging.INFO)
+
+# -------------------------
+# Files and modes
+# -------------------------
+PROMPT_FILE = "prompt_templates/combined_extraction.txt"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# "two_pass" = llm_processor + llm_pass_2, "combined" = one prompt for both
+EXTRACTION_MODES = ("two_pass", "combined")
+DEFAULT_EXTRACTION_MODE = os.getenv("LLM_EXTRACTION_MODE", "two_pass")
+
+# -------------------------
+# Response schema
+# -------------------------
+class _ResumeSchema(BaseModel):
+    name: Optional[str] = ""
+    email: Optional[str] = ""
+    phone: Optional[str] = ""
+    education: List[Any] = []
+    experience: List[Any] = []
+    skills: List[Any] = []
+    projects: List[Any] = []
+    certifications: List[Any] = []
+
+
+class _TraitsSchema(BaseModel):
+    leadership: float = Field(..., ge=0.0, le=1.0)
+    communication: float = Field(..., ge=0.0, le=1.0)
+    analytical_thinking: float = Field(..., ge=0.0, le=1.0)
+    ownership: float = Field(..., ge=0.0, le=1.0)
+    problem_solving: float = Field(..., ge=0.0, le=1.0)
+    attention_to_detail: float = Field(..., ge=0.0, le=1.0)
+
+
+class _CombinedSchema(BaseModel):
+    resume: _ResumeSchema
+    traits: _TraitsSchema
+
+
+def _validate_combined(parsed: dict) -> Optional[Tuple[dict, dict]]:
+    if not parsed:
+        return None
+    try:
+        validated = _CombinedSchema.model_validate(parsed)
+    except ValidationError as e:
+        logging.warning("Combined extraction failed validation: %s", str(e))
+        return None
+
+    # Keep any extra fields the LLM returned, with the standard keys always present
+    structured_json = {**_empty_resume_structure(), **parsed["resume"]}
+    return structured_json, validated.traits.model_dump()
+
+# -------------------------
+# Combined extraction
+# -------------------------
+def extract_combined(cleaned_text: str, llm_model: str = "qwen2.5:7b-instruct-q5_K_M") -> Optional[Tuple[dict, dict]]:
+    """
+    Extract the structured resume and the six trait scores with a single prompt.
+    Returns (structured_json, trait_json), or None when no backend produced a
+    schema-valid response — callers then fall back to the two-pass path.
+    """
+    prompt_template = load_prompt_template(PROMPT_FILE)
+    prompt_text = prompt_template.replace("{resume_text}", cleaned_text)
+
+    # ── Content-addressed cache (only schema-valid results are stored) ────────
+    cache_key = llm_cache.make_key("combined", cleaned_text, prompt_template, f"{llm_model}|{GROQ_MODEL}")
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        logging.info("LLM cache hit for combined extraction")
+        return cached["resume"], cached["traits"]
+
+    # ── Try Ollama first ──────────────────────────────────────────────────────
+    try:
+        logging.info("Attempting combined extraction with Ollama model: %s", llm_model)
+        response_text = llm_gateway.invoke(prompt_text, backend="ollama", model=llm_model, temperature=0, timeout=30)
+        logging.info("Ollama response received (first 500 chars): %s", response_text[:500])
+        result = _validate_combined(_parse_response_text(response_text))
+        if result:
+            llm_cache.put(cache_key, {"resume": result[0], "traits": result[1]})
+            return result
+    except BackendUnavailable:
+        logging.info("Ollama circuit is open, routing straight to Groq.")
+    except Exception as e:
+        logging.warning("Ollama unavailable or failed (%s). Falling back to Groq API.", str(e))
+
+    # ── Fallback: Groq API ────────────────────────────────────────────────────
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        logging.error("GROQ_API_KEY environment variable is not set. Cannot use Groq fallback.")
+        return None
+
+    try:
+        logging.info("Calling Groq API with model: %s", GROQ_MODEL)
+        response_text = llm_gateway.invoke(prompt_text, backend="groq", model=GROQ_MODEL, temperature=0)
+        logging.info("Groq response received (first 500 chars): %s", response_text[:500])
+        result = _validate_combined(_parse_response_text(response_text))
+        if result:
+            llm_cache.put(cache_key, {"resume": result[0], "traits": result[1]})
+        return result
+
+    except Exception as e:
+        logging.error("Groq API call failed: %s", str(e))
+
+    return None
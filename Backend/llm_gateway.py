@@ -0,0 +1,514 @@
+# llm_gateway.py
+"""
+Central gateway for every LLM call (Groq + Ollama).
+
+  - one pooled LangChain client per (backend, model, params) instead of a new
+    ChatGroq / OllamaLLM (and HTTP client) per call
+  - a concurrency cap per backend (LLM_GROQ_MAX_CONCURRENCY, LLM_OLLAMA_MAX_CONCURRENCY)
+  - token-bucket rate limiting for Groq on requests and tokens per minute
+    (GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE)
+  - retry with jittered exponential backoff on rate-limit / transient errors
+  - coalescing: identical concurrent prompts share one in-flight call
+  - prompt templates read from disk once and reloaded only when they change
+  - a circuit breaker in front of Ollama, fed by call failures and a periodic
+    health probe: while it is open, Ollama calls fail fast with
+    BackendUnavailable and callers go straight to their Groq fallback instead
+    of waiting out the timeout on every request
+"""
+import os
+import json
+import time
+import asyncio
+import random
+import hashlib
+import logging
+import threading
+import urllib.request
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from langchain_ollama import OllamaLLM
+from langchain_groq import ChatGroq
+
+router = APIRouter()
+
+# -------------------------
+# Config
+# -------------------------
+GROQ_MODEL = "llama-3.3-70b-versatile"
+OLLAMA_MODEL = "qwen2.5:7b-instruct-q5_K_M"
+
+LLM_GROQ_MAX_CONCURRENCY = int(os.getenv("LLM_GROQ_MAX_CONCURRENCY", "4"))
+LLM_OLLAMA_MAX_CONCURRENCY = int(os.getenv("LLM_OLLAMA_MAX_CONCURRENCY", "2"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+LLM_MAX_RETRIES = {
+    "groq": int(os.getenv("LLM_GROQ_MAX_RETRIES", "3")),
+    # Callers fall back to Groq when Ollama fails, so don't sit in backoff by default
+    "ollama": int(os.getenv("LLM_OLLAMA_MAX_RETRIES", "0")),
+}
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1.0"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "2"))
+# How long the circuit stays open before a single trial request is let through
+OLLAMA_OPEN_SECONDS = float(os.getenv("OLLAMA_OPEN_SECONDS", "60"))
+OLLAMA_HEALTH_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_INTERVAL_SECONDS", "15"))
+OLLAMA_HEALTH_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_HEALTH_TIMEOUT_SECONDS", "2"))
+
+# Upper bounds (seconds) of the per-backend latency histogram buckets
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+BACKENDS = ("groq", "ollama")
+_RETRYABLE_MARKERS = ("429", "rate limit", "rate_limit", "timeout", "timed out", "temporarily",
+                      "502", "503", "504", "connection reset", "overloaded")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for rate limiting."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute / 60` per
+    second. acquire() blocks until the amount is available; charge() takes
+    tokens without waiting and may leave the bucket in debt (used to bill
+    completion tokens once they are known).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(per_minute, 1.0)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, amount: float):
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+class BackendUnavailable(Exception):
+    """Raised without calling the backend while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `failure_threshold` consecutive failures open it
+    open      -> calls are refused; after `open_seconds` one trial call is allowed
+    half_open -> one trial call is let through; success closes, failure re-opens
+
+    A successful health probe only moves an open circuit to half_open: the
+    server answering /api/tags says nothing about generation, so a real call
+    still has to succeed before the circuit closes. A failed probe opens it.
+    """
+
+    def __init__(self, failure_threshold: int = OLLAMA_FAILURE_THRESHOLD,
+                 open_seconds: float = OLLAMA_OPEN_SECONDS, clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self._opened_at >= self.open_seconds:
+                self.state = "half_open"
+            # A trial that never reported back (abandoned stream) is replaced after open_seconds
+            if self.state == "half_open" and (
+                not self._trial_in_flight or self._clock() - self._trial_started >= self.open_seconds
+            ):
+                self._trial_in_flight = True
+                self._trial_started = self._clock()
+                return True
+            return False
+
+    def _open(self, error: str):
+        if self.state != "open":
+            self.times_opened += 1
+            logging.warning(f"Ollama circuit opened: {error}")
+        self.state = "open"
+        self._opened_at = self._clock()
+        self._trial_in_flight = False
+        self.last_error = error
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info("Ollama circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def probe_succeeded(self):
+        """Let the next call through as a trial without closing the circuit."""
+        with self._lock:
+            if self.state == "open":
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self._open(error)
+
+    def trip(self, error: str):
+        with self._lock:
+            self._failures = max(self._failures, self.failure_threshold)
+            self._open(error)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "open_seconds": self.open_seconds,
+                "times_opened": self.times_opened,
+                "last_error": self.last_error,
+            }
+
+
+class LLMGateway:
+    def __init__(self):
+        self._clients: Dict[tuple, object] = {}
+        self._clients_lock = threading.Lock()
+        self._semaphores = {
+            "groq": threading.BoundedSemaphore(LLM_GROQ_MAX_CONCURRENCY),
+            "ollama": threading.BoundedSemaphore(LLM_OLLAMA_MAX_CONCURRENCY),
+        }
+        self._request_bucket = TokenBucket(GROQ_REQUESTS_PER_MINUTE)
+        self._token_bucket = TokenBucket(GROQ_TOKENS_PER_MINUTE)
+
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        self._templates: Dict[str, tuple] = {}
+        self._templates_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {backend: {"calls": 0, "failures": 0, "retries": 0, "coalesced": 0,
+                                 "short_circuited": 0, "rate_limit_wait_seconds": 0.0,
+                                 "latency_seconds_total": 0.0,
+                                 "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1)}
+                       for backend in BACKENDS}
+
+        self.ollama_breaker = CircuitBreaker()
+        self._last_probe: Optional[dict] = None
+
+    # -------------------------
+    # Clients + templates
+    # -------------------------
+    def client(self, backend: str, model: Optional[str] = None, temperature: float = 0.0,
+               max_tokens: Optional[int] = None, timeout: Optional[float] = None):
+        """Pooled LangChain client; built once per distinct configuration."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {backend}")
+        model = model or (GROQ_MODEL if backend == "groq" else OLLAMA_MODEL)
+        key = (backend, model, temperature, max_tokens, timeout)
+        with self._clients_lock:
+            if key not in self._clients:
+                if backend == "groq":
+                    groq_key = os.getenv("GROQ_API_KEY")
+                    if not groq_key:
+                        raise Exception("GROQ_API_KEY is not set in .env file")
+                    params = {"model": model, "temperature": temperature, "api_key": groq_key}
+                    if max_tokens:
+                        params["max_tokens"] = max_tokens
+                    if timeout:
+                        params["timeout"] = timeout
+                    self._clients[key] = ChatGroq(**params)
+                else:
+                    params = {"model": model, "temperature": temperature, "base_url": OLLAMA_BASE_URL}
+                    if max_tokens:
+                        params["num_predict"] = max_tokens
+                    if timeout:
+                        params["timeout"] = timeout
+                    self._clients[key] = OllamaLLM(**params)
+            return self._clients[key]
+
+    def template(self, path: str) -> str:
+        """Prompt template contents, re-read only when the file's mtime changes."""
+        mtime = os.path.getmtime(path)
+        with self._templates_lock:
+            cached = self._templates.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        with self._templates_lock:
+            self._templates[path] = (mtime, text)
+        return text
+
+    # -------------------------
+    # Calls
+    # -------------------------
+    def _record(self, backend: str, **deltas):
+        with self._stats_lock:
+            for name, value in deltas.items():
+                self._stats[backend][name] += value
+
+    def _record_latency(self, backend: str, seconds: float):
+        with self._stats_lock:
+            stats = self._stats[backend]
+            stats["latency_seconds_total"] += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats["latency_histogram"][i] += 1
+                    break
+            else:
+                stats["latency_histogram"][-1] += 1
+
+    def _admit(self, backend: str):
+        """Routing decision: refuse Ollama calls outright while its circuit is open."""
+        if backend == "ollama" and not self.ollama_breaker.allow():
+            self._record(backend, short_circuited=1)
+            raise BackendUnavailable("Ollama circuit is open; skipping to fallback")
+
+    def _outcome(self, backend: str, started: float, error: Optional[Exception] = None):
+        self._record_latency(backend, time.perf_counter() - started)
+        if backend != "ollama":
+            return
+        if error is None:
+            self.ollama_breaker.record_success()
+        else:
+            self.ollama_breaker.record_failure(f"{type(error).__name__}: {error}")
+
+    def _throttle(self, backend: str, prompt: str):
+        if backend != "groq":
+            return
+        waited = self._request_bucket.acquire(1)
+        waited += self._token_bucket.acquire(estimate_tokens(prompt))
+        if waited:
+            self._record(backend, rate_limit_wait_seconds=waited)
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        message = f"{type(error).__name__} {error}".lower()
+        return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+    def _call(self, prompt: str, backend: str, **params) -> str:
+        llm = self.client(backend, **params)
+        retries = LLM_MAX_RETRIES[backend]
+        for attempt in range(retries + 1):
+            self._admit(backend)
+            try:
+                self._throttle(backend, prompt)
+                with self._semaphores[backend]:
+                    started = time.perf_counter()
+                    try:
+                        response = llm.invoke(prompt)
+                    except Exception as e:
+                        self._outcome(backend, started, e)
+                        raise
+                    self._outcome(backend, started)
+                text = getattr(response, "content", response)
+                if backend == "groq":
+                    self._token_bucket.charge(estimate_tokens(text))
+                self._record(backend, calls=1)
+                return text
+            except Exception as e:
+                if attempt >= retries or not self._retryable(e):
+                    self._record(backend, calls=1, failures=1)
+                    raise
+                delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.5)
+                logging.warning(f"{backend} call failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+                self._record(backend, retries=1)
+                time.sleep(delay)
+
+    def invoke(self, prompt: str, backend: str = "groq", model: Optional[str] = None,
+               temperature: float = 0.0, max_tokens: Optional[int] = None,
+               timeout: Optional[float] = None) -> str:
+        """
+        Blocking completion returning the response text. Identical concurrent
+        requests (same backend, params and prompt) wait on one shared call.
+        """
+        params = {"model": model, "temperature": temperature, "max_tokens": max_tokens, "timeout": timeout}
+        key = hashlib.sha256(f"{backend}|{sorted(params.items())}|{prompt}".encode("utf-8")).hexdigest()
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self._record(backend, coalesced=1)
+            return future.result()
+
+        try:
+            result = self._call(prompt, backend, **params)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def astream(self, prompt: str, backend: str = "groq", model: Optional[str] = None,
+                      temperature: float = 0.0, max_tokens: Optional[int] = None,
+                      timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Streamed completion (text chunks) under the same rate limits and concurrency cap."""
+        llm = self.client(backend, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout)
+        self._admit(backend)
+        await run_in_threadpool(self._throttle, backend, prompt)
+        semaphore = self._semaphores[backend]
+        await run_in_threadpool(semaphore.acquire)
+        generated = 0
+        started = time.perf_counter()
+        try:
+            async for chunk in llm.astream(prompt):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    generated += len(text)
+                    yield text
+            self._outcome(backend, started)
+            self._record(backend, calls=1)
+        except Exception as e:
+            self._outcome(backend, started, e)
+            self._record(backend, calls=1, failures=1)
+            raise
+        finally:
+            semaphore.release()
+            if backend == "groq" and generated:
+                self._token_bucket.charge(max(1, generated // 4))
+
+    # -------------------------
+    # Ollama health
+    # -------------------------
+    def probe_ollama(self) -> dict:
+        """
+        GET /api/tags on the Ollama server. An unreachable server, or one that
+        does not serve OLLAMA_MODEL, opens the circuit; a healthy one only
+        half-opens it so the next real call decides whether it closes.
+        """
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{OLLAMA_BASE_URL}/api/tags", timeout=OLLAMA_HEALTH_TIMEOUT_SECONDS) as resp:
+                models = [m.get("name") for m in json.loads(resp.read().decode("utf-8")).get("models", [])]
+            if OLLAMA_MODEL not in models:
+                raise BackendUnavailable(f"model {OLLAMA_MODEL} is not pulled")
+            self.ollama_breaker.probe_succeeded()
+            healthy, error = True, None
+        except Exception as e:
+            healthy, error = False, f"health probe: {e}"
+            self.ollama_breaker.trip(error)
+        self._last_probe = {
+            "healthy": healthy,
+            "error": error,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "checked_at": time.time(),
+        }
+        return self._last_probe
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = {}
+            for backend, values in self._stats.items():
+                values = dict(values)
+                counts = values.pop("latency_histogram")
+                histogram = {f"le_{bound}s": count for bound, count in zip(LATENCY_BUCKETS, counts)}
+                histogram[f"gt_{LATENCY_BUCKETS[-1]}s"] = counts[-1]
+                observed = sum(counts)
+                total = values.pop("latency_seconds_total")
+                values["avg_latency_ms"] = round(total / observed * 1000, 1) if observed else None
+                values["latency_histogram"] = histogram
+                stats[backend] = values
+        with self._inflight_lock:
+            inflight = len(self._inflight)
+        with self._clients_lock:
+            clients = len(self._clients)
+        return {
+            "backends": stats,
+            "inflight": inflight,
+            "pooled_clients": clients,
+            "ollama_circuit": self.ollama_breaker.snapshot(),
+            "ollama_last_probe": self._last_probe,
+        }
+
+
+# create a global instance
+llm_gateway = LLMGateway()
+_probe_task: Optional[asyncio.Task] = None
+
+
+async def _probe_loop():
+    while True:
+        try:
+            await run_in_threadpool(llm_gateway.probe_ollama)
+        except Exception as e:
+            logging.error(f"Ollama health probe crashed: {e}")
+        await asyncio.sleep(OLLAMA_HEALTH_INTERVAL_SECONDS)
+
+
+@router.on_event("startup")
+async def startup_event():
+    global _probe_task
+    if OLLAMA_HEALTH_INTERVAL_SECONDS > 0:
+        _probe_task = asyncio.get_running_loop().create_task(_probe_loop())
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    if _probe_task is not None:
+        _probe_task.cancel()
+
+
+# GET /llm-gateway/stats
+@router.get("/llm-gateway/stats")
+async def get_llm_gateway_stats():
+    try:
+        return JSONResponse(status_code=200, content=llm_gateway.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# GET /llm-gateway/health
+@router.get("/llm-gateway/health")
+async def get_llm_gateway_health(probe: bool = False):
+    try:
+        last_probe = await run_in_threadpool(llm_gateway.probe_ollama) if probe else llm_gateway.stats()["ollama_last_probe"]
+        return JSONResponse(status_code=200, content={
+            "ollama_circuit": llm_gateway.ollama_breaker.snapshot(),
+            "ollama_last_probe": last_probe,
+        })
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
@@ -2,9 +2,10 @@ import os
 import json
 import logging
 import re
-from langchain_ollama import OllamaLLM
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+
+from llm_cache import llm_cache
+from llm_gateway import llm_gateway, BackendUnavailable
 load_dotenv()
 
 # -------------------------
@@ -23,8 +24,8 @@ os.makedirs(TRAITS_JSON_DIR, exist_ok=True)
 # Load prompt template
 # -------------------------
 def load_prompt_template(prompt_path: str) -> str:
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        return f.read()
+    # Cached by the gateway; re-read only when the file changes
+    return llm_gateway.template(prompt_path)
 
 # -------------------------
 # Infer traits from resume text
@@ -47,21 +48,39 @@ def _empty_traits() -> dict:
         "attention_to_detail": 0.0
     }
 
+def _valid_traits(traits) -> bool:
+    """Only a dict with every trait scored as a number is cached."""
+    return isinstance(traits, dict) and all(
+        isinstance(traits.get(key), (int, float)) and not isinstance(traits.get(key), bool)
+        for key in _empty_traits()
+    )
+
 def infer_traits(clean_text: str, llm_model: str = "qwen2.5:7b-instruct-q5_K_M") -> dict:
-    prompt_text = load_prompt_template(PROMPT_FILE)
-    prompt_text = prompt_text.replace("{resume}", clean_text)
+    prompt_template = load_prompt_template(PROMPT_FILE)
+    prompt_text = prompt_template.replace("{resume}", clean_text)
+
+    # ── Content-addressed cache ───────────────────────────────────────────────
+    cache_key = llm_cache.make_key("traits", clean_text, prompt_template, f"{llm_model}|{GROQ_MODEL}")
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        logging.info("LLM cache hit for trait inference")
+        return cached
 
     # ── Try Ollama first ──────────────────────────────────────────────────────
     try:
         logging.info("Attempting Ollama model: %s", llm_model)
-        llm = OllamaLLM(model=llm_model, temperature=0)
-        response = llm.generate([prompt_text])
-        response_text = response.generations[0][0].text
+        response_text = llm_gateway.invoke(prompt_text, backend="ollama", model=llm_model, temperature=0)
         logging.info("Ollama response received (first 500 chars): %s", response_text[:500])
-        return _parse_response_text(response_text)
+        traits = _parse_response_text(response_text)
+        if _valid_traits(traits):
+            llm_cache.put(cache_key, traits)
+            return traits
+        logging.warning("Ollama output is missing trait scores, trying Groq fallback.")
 
     except json.JSONDecodeError:
         logging.warning("Ollama output was not valid JSON, trying Groq fallback.")
+    except BackendUnavailable:
+        logging.info("Ollama circuit is open, routing straight to Groq.")
     except Exception as e:
         logging.warning("Ollama unavailable (%s). Falling back to Groq API.", str(e))
 
@@ -73,11 +92,13 @@ def infer_traits(clean_text: str, llm_model: str = "qwen2.5:7b-instruct-q5_K_M")
 
     try:
         logging.info("Calling Groq API with model: %s", GROQ_MODEL)
-        groq_llm = ChatGroq(model=GROQ_MODEL, temperature=0, api_key=groq_api_key)
-        groq_response = groq_llm.invoke(prompt_text)
-        response_text = groq_response.content
+        response_text = llm_gateway.invoke(prompt_text, backend="groq", model=GROQ_MODEL, temperature=0)
         logging.info("Groq response received (first 500 chars): %s", response_text[:500])
-        return _parse_response_text(response_text)
+        traits = _parse_response_text(response_text)
+        if _valid_traits(traits):
+            llm_cache.put(cache_key, traits)
+            return traits
+        logging.warning("Groq output is missing trait scores, returning empty trait structure.")
 
     except json.JSONDecodeError:
         logging.warning("Groq output was not valid JSON, returning empty trait structure.")
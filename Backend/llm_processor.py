@@ -4,8 +4,9 @@ import logging
 import re
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_ollama import OllamaLLM
-from langchain_groq import ChatGroq
+
+from llm_cache import llm_cache
+from llm_gateway import llm_gateway, BackendUnavailable
 
 # -------------------------
 # Setup logging
@@ -25,8 +26,8 @@ os.makedirs(JSON_DIR, exist_ok=True)
 # Load prompt template
 # -------------------------
 def load_prompt_template(prompt_path: str) -> str:
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        return f.read()
+    # Cached by the gateway; re-read only when the file changes
+    return llm_gateway.template(prompt_path)
 
 # -------------------------
 # Helper functions
@@ -58,19 +59,27 @@ def _empty_resume_structure() -> dict:
 GROQ_MODEL = "llama-3.3-70b-versatile"
 
 def extract_structured_json(cleaned_text: str, llm_model: str = "qwen2.5:7b-instruct-q5_K_M") -> dict:
-    prompt_text = load_prompt_template(PROMPT_FILE)
-    prompt_text = prompt_text.replace("{resume_text}", cleaned_text)
+    prompt_template = load_prompt_template(PROMPT_FILE)
+    prompt_text = prompt_template.replace("{resume_text}", cleaned_text)
+
+    # ── Content-addressed cache ───────────────────────────────────────────────
+    cache_key = llm_cache.make_key("structured", cleaned_text, prompt_template, f"{llm_model}|{GROQ_MODEL}")
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        logging.info("LLM cache hit for structured extraction")
+        return cached
 
     # ── Try Ollama first ──────────────────────────────────────────────────────
     try:
         logging.info("Attempting Ollama model: %s", llm_model)
-        llm = OllamaLLM(model=llm_model, temperature=0, timeout=30)
-        response = llm.generate([prompt_text])
-        response_text = response.generations[0][0].text
+        response_text = llm_gateway.invoke(prompt_text, backend="ollama", model=llm_model, temperature=0, timeout=30)
         logging.info("Ollama response received (first 500 chars): %s", response_text[:500])
         parsed = _parse_response_text(response_text)
         if parsed:
+            llm_cache.put(cache_key, parsed)
             return parsed
+    except BackendUnavailable:
+        logging.info("Ollama circuit is open, routing straight to Groq.")
     except Exception as e:
         logging.warning("Ollama unavailable or failed (%s). Falling back to Groq API.", str(e))
 
@@ -82,11 +91,13 @@ def extract_structured_json(cleaned_text: str, llm_model: str = "qwen2.5:7b-inst
 
     try:
         logging.info("Calling Groq API with model: %s", GROQ_MODEL)
-        groq_llm = ChatGroq(model=GROQ_MODEL, temperature=0, api_key=groq_api_key)
-        groq_response = groq_llm.invoke(prompt_text)
-        response_text = groq_response.content
+        response_text = llm_gateway.invoke(prompt_text, backend="groq", model=GROQ_MODEL, temperature=0)
         logging.info("Groq response received (first 500 chars): %s", response_text[:500])
-        return _parse_response_text(response_text) or _empty_resume_structure()
+        parsed = _parse_response_text(response_text)
+        if parsed:
+            llm_cache.put(cache_key, parsed)
+            return parsed
+        return _empty_resume_structure()
 
     except Exception as e:
         logging.error("Groq API call failed: %s", str(e))
@@ -0,0 +1,126 @@
+# llm_stream.py
+"""
+Incremental parsing of streamed LLM JSON.
+
+The interview and career-trajectory prompts ask for
+{"summary": "...", "<items>": [{...}, {...}]}. JsonItemStream is fed the
+completion token by token and hands back each object of the items array as
+soon as its closing brace arrives, so SSE endpoints can emit the first
+question / path long before the completion finishes.
+"""
+import re
+import json
+import logging
+from typing import List, Tuple
+
+
+class JsonItemStream:
+    """
+    feed(text) returns newly completed (kind, value) events:
+      ("summary", str)  once the top-level summary string is complete
+      ("item", dict)    for each finished object in the `array_key` array
+
+    Both keys are only recognised directly inside the root object; the
+    summary only before the array starts, so a "summary" inside an item (or
+    after the array) is never reported as the top-level one.
+    """
+
+    def __init__(self, array_key: str, scalar_key: str = "summary"):
+        self.buffer = ""
+        self._array_re = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._scalar_re = re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(scalar_key))
+        self.scalar_key = scalar_key
+        self.scalar_done = False
+        self.array_done = False
+        self.items: List[dict] = []
+
+        self._pos = None          # scan position inside the array, None until "[" is seen
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+
+    def feed(self, text: str) -> List[Tuple[str, object]]:
+        self.buffer += text
+        events = []
+
+        if self._pos is None and not self.array_done:
+            array = self._top_level_match(self._array_re, len(self.buffer))
+            if not self.scalar_done:
+                match = self._top_level_match(self._scalar_re, array.start() if array else len(self.buffer))
+                if match:
+                    self.scalar_done = True
+                    events.append((self.scalar_key, json.loads(f'"{match.group(1)}"')))
+            if array:
+                self._pos = array.end()
+
+        if self._pos is not None and not self.array_done:
+            events.extend(("item", item) for item in self._scan())
+        return events
+
+    def _top_level_match(self, pattern, endpos: int):
+        """First match of `pattern` ending before `endpos` that starts as a key of the root object."""
+        for match in pattern.finditer(self.buffer, 0, endpos):
+            if _root_key_position(self.buffer, match.start()):
+                return match
+        return None
+
+    def _scan(self) -> List[dict]:
+        items = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    raw = buf[self._item_start:i + 1]
+                    self._item_start = None
+                    try:
+                        item = json.loads(raw)
+                        self.items.append(item)
+                        items.append(item)
+                    except json.JSONDecodeError as e:
+                        logging.warning(f"Skipping malformed streamed item: {e}")
+            elif ch == "]" and self._depth == 0:
+                self.array_done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return items
+
+
+
+def _root_key_position(buf: str, end: int) -> bool:
+    """True when buf[end] is outside any string and directly inside the root object."""
+    depth = 0
+    in_string = escape = False
+    for ch in buf[:end]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+    return depth == 1 and not in_string
@@ -9,13 +9,21 @@ load_dotenv()
 
 # Import routers
 from upload_resume import router as upload_resume_router
+from bulk_ingest import router as bulk_ingest_router
+from dedup import router as dedup_router
 from graph_data import router as graph_data_router
 from candidate_data import router as candidate_router
 from retriever_api import router as retriever_router
 from skill_gap import router as skill_gap_router
 from compare_api import router as compare_router
+from interview_generator import router as interview_router
 from career_trajectory import router as career_trajectory_router
 from team_fit import router as team_fit_router 
+from llm_cache import router as llm_cache_router
+from db import router as db_router
+from narrative_jobs import router as narrative_router
+from llm_gateway import router as llm_gateway_router
+from embedding_service import router as embedding_router
 
 app = FastAPI(
     version="1.0.0"
@@ -36,6 +44,8 @@ app.add_middleware(
 # Include routers
 # -------------------------
 app.include_router(upload_resume_router, tags=["Resume Upload"])
+app.include_router(bulk_ingest_router, tags=["Resume Upload"])
+app.include_router(dedup_router, tags=["Resume Upload"])
 app.include_router(graph_data_router, tags=["Graph Data"])
 app.include_router(candidate_router, tags=["Candidate Data"])
 app.include_router(retriever_router, tags=["Retriever Search"])
@@ -44,6 +54,11 @@ app.include_router(compare_router, tags=["Candidate Comparison"])
 app.include_router(interview_router, tags=["Interview Generator"])
 app.include_router(career_trajectory_router, tags=["Career Trajectory"])
 app.include_router(team_fit_router, tags=["Team Fit Analysis"])
+app.include_router(llm_cache_router, tags=["LLM Cache"])
+app.include_router(db_router, tags=["Database"])
+app.include_router(narrative_router, tags=["Narratives"])
+app.include_router(llm_gateway_router, tags=["LLM Gateway"])
+app.include_router(embedding_router, tags=["Embeddings"])
 # -------------------------
 # Root Endpoint
 # -------------------------
@@ -0,0 +1,150 @@
+# narrative_jobs.py
+"""
+Background jobs for LLM narratives.
+
+/team-fit, /career-trajectory and /generate-interview accept
+narrative="deferred": the deterministic part of the response is returned
+straight away with a narrative_job_id, and the LLM call runs here in the
+threadpool. Clients poll GET /narratives/{job_id} or subscribe to
+GET /narratives/{job_id}/events (Server-Sent Events) for the result.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+
+router = APIRouter()
+
+NARRATIVE_MODES = ("sync", "deferred", "none")
+NARRATIVE_JOB_TTL_SECONDS = float(os.getenv("NARRATIVE_JOB_TTL_SECONDS", "3600"))
+NARRATIVE_MAX_JOBS = int(os.getenv("NARRATIVE_MAX_JOBS", "1000"))
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def validate_narrative_mode(mode: str):
+    if mode not in NARRATIVE_MODES:
+        raise HTTPException(status_code=400, detail=f"narrative must be one of {list(NARRATIVE_MODES)}")
+
+
+class NarrativeJobStore:
+    """
+    In-process registry of narrative jobs. Finished jobs are kept for
+    NARRATIVE_JOB_TTL_SECONDS and the oldest finished ones are dropped beyond
+    NARRATIVE_MAX_JOBS; pending and running jobs are never evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = NARRATIVE_JOB_TTL_SECONDS, max_jobs: int = NARRATIVE_MAX_JOBS):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, dict] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks = set()   # keep running tasks referenced until they finish
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] and now - job["finished_at"] > self.ttl_seconds]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._events.pop(job_id, None)
+        excess = len(self._jobs) - self.max_jobs
+        if excess > 0:
+            finished = sorted((job_id for job_id, job in self._jobs.items() if job["finished_at"]),
+                              key=lambda job_id: self._jobs[job_id]["finished_at"])
+            for job_id in finished[:excess]:
+                self._jobs.pop(job_id, None)
+                self._events.pop(job_id, None)
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> str:
+        """Schedule fn(*args, **kwargs) in the threadpool; must be called from the event loop."""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "pending",
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self._events[job_id] = asyncio.Event()
+        task = asyncio.get_running_loop().create_task(self._run(job_id, fn, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job_id: str, fn: Callable, args: tuple, kwargs: dict):
+        job = self._jobs[job_id]
+        job["status"] = "running"
+        try:
+            job["result"] = await run_in_threadpool(fn, *args, **kwargs)
+            job["status"] = "done"
+        except Exception as e:
+            logging.error(f"Narrative job {job_id} ({job['kind']}) failed: {e}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            event = self._events.get(job_id)
+            if event:
+                event.set()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        event = self._events.get(job_id)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# create a global instance
+narrative_jobs = NarrativeJobStore()
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# GET /narratives/{job_id}
+@router.get("/narratives/{job_id}")
+async def get_narrative(job_id: str):
+    job = narrative_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Narrative job {job_id} not found"})
+    return JSONResponse(status_code=200, content=job)
+
+
+# GET /narratives/{job_id}/events
+@router.get("/narratives/{job_id}/events")
+async def stream_narrative(job_id: str):
+    if narrative_jobs.get(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": f"Narrative job {job_id} not found"})
+
+    async def events():
+        yield sse_event("status", {"job_id": job_id, "status": narrative_jobs.get(job_id)["status"]})
+        while not await narrative_jobs.wait(job_id, SSE_KEEPALIVE_SECONDS):
+            yield ": keep-alive\n\n"
+        job = narrative_jobs.get(job_id)
+        if job is None:
+            yield sse_event("error", {"job_id": job_id, "error": "job expired"})
+        elif job["status"] == "done":
+            yield sse_event("result", {"job_id": job_id, "result": job["result"]})
+        else:
+            yield sse_event("error", {"job_id": job_id, "error": job["error"]})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
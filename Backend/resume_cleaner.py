@@ -44,6 +44,16 @@ def clean_resume_file(input_file: str) -> str:
         raise ValueError(f"Unsupported file type: {ext}")
     return strip_noise(raw_text)
 
+def clean_resume_file_safe(input_file: str):
+    """
+    Process-pool friendly wrapper around clean_resume_file.
+    Returns (input_file, cleaned_text, error) instead of raising.
+    """
+    try:
+        return input_file, clean_resume_file(input_file), None
+    except Exception as e:
+        return input_file, None, str(e)
+
 def save_cleaned_text(cleaned_text: str, output_file: str):
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(cleaned_text)
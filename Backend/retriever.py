@@ -1,20 +1,18 @@
-from sentence_transformers import SentenceTransformer
 import faiss
 from neo4j import GraphDatabase
 import numpy as np
 import json
+import logging
+
+from embedding_service import embedding_service
+from faiss_index_factory import search as index_search
 
 class HybridRetriever:
-    def __init__(self, faiss_index_path, snippet_metadata_path, neo4j_uri, neo4j_user, neo4j_pass):
-        # Load FAISS index
-        self.faiss_index = faiss.read_index(faiss_index_path)
-        
-        # Load snippet metadata
-        with open(snippet_metadata_path, "r", encoding='utf-8') as f:
-            self.snippet_metadata = json.load(f)
-        
-        # Load embedding model
-        self.embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, faiss_index_path, snippet_metadata_path, neo4j_uri, neo4j_user, neo4j_pass, index_store=None):
+        # Either search a live in-memory FaissIndexStore or load FAISS index + snippet metadata from disk
+        self.index_store = index_store
+        if index_store is None:
+            self.load_index(faiss_index_path, snippet_metadata_path)
         
         # Neo4j driver
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_pass))
@@ -23,11 +21,44 @@ class HybridRetriever:
         self.alpha = 0.6
         self.beta = 0.4
 
+    def load_index(self, faiss_index_path, snippet_metadata_path):
+        """
+        (Re)load the FAISS index and snippet metadata from disk.
+        Both are swapped in as a single tuple so concurrent searches always
+        see an index and metadata that belong together.
+        """
+        faiss_index = faiss.read_index(faiss_index_path)
+        with open(snippet_metadata_path, "r", encoding='utf-8') as f:
+            snippet_metadata = json.load(f)
+        self._index_snapshot = (faiss_index, snippet_metadata)
+
+    @property
+    def faiss_index(self):
+        return self._index_snapshot[0]
+
+    @property
+    def snippet_metadata(self):
+        return self._index_snapshot[1]
+
+    def close(self):
+        self.driver.close()
+
     def embed_query(self, query_text):
-        return self.embed_model.encode(query_text).astype('float32')
+        return embedding_service.encode([query_text])[0]
 
-    def search_faiss(self, query_vector, top_k=20):
-        D, I = self.faiss_index.search(np.array([query_vector]), top_k)
+    def ntotal(self):
+        if self.index_store is not None:
+            return self.index_store.ntotal
+        return self.faiss_index.ntotal
+
+    def search_faiss(self, query_vector, top_k=20, nprobe=None, ef_search=None):
+        if self.index_store is not None:
+            # Metadata is only ever appended under the store lock, so every returned id is present
+            D, I = self.index_store.search(np.array([query_vector]), top_k, nprobe=nprobe, ef_search=ef_search)
+            snippet_metadata = self.index_store.snippet_metadata
+        else:
+            faiss_index, snippet_metadata = self._index_snapshot
+            D, I = index_search(faiss_index, np.array([query_vector]), top_k, nprobe=nprobe, ef_search=ef_search)
         
         top_snippets = []
         top_sim = []
@@ -35,50 +66,68 @@ class HybridRetriever:
             if idx == -1:
                 continue
             str_idx = str(idx)
-            if str_idx in self.snippet_metadata:
-                top_snippets.append(self.snippet_metadata[str_idx])
+            if str_idx in snippet_metadata:
+                top_snippets.append(snippet_metadata[str_idx])
                 top_sim.append(float(1 / (1 + d)))   # ← Convert to native float
                 
         return top_snippets, top_sim
 
-    def get_graph_score(self, candidate_id, query_entities):
+    def get_graph_scores(self, candidate_ids, query_entities):
+        """
+        Score every candidate from the dense stage in a single round trip.
+        Entity overlap is counted server-side; returns
+        {candidate_id: (score, paths)} for candidates that have neighbours.
+        """
+        if not candidate_ids:
+            return {}
         try:
             with self.driver.session() as session:
                 result = session.run("""
-                    MATCH (c:Candidate {id: $cid})-[r]-(n)
-                    RETURN type(r) AS rel_type, n.name AS neighbor
-                """, cid=candidate_id)
-                
-                score = 0
-                paths = []
-                for record in result:
-                    paths.append(f"{candidate_id} -[{record['rel_type']}]-> {record['neighbor']}")
-                    if record['neighbor'] and record['neighbor'].lower() in query_entities:
-                        score += 1
-                return float(score), paths                  # ← Convert to native float
+                    UNWIND $ids AS cid
+                    MATCH (c:Candidate {id: cid})-[r]-(n)
+                    WITH cid, type(r) AS rel_type, n.name AS neighbor
+                    RETURN cid,
+                           count(CASE WHEN toLower(neighbor) IN $entities THEN 1 END) AS score,
+                           collect(cid + ' -[' + rel_type + ']-> ' + coalesce(neighbor, 'None')) AS paths
+                """, ids=list(candidate_ids), entities=list(query_entities))
+
+                return {
+                    record["cid"]: (float(record["score"]), record["paths"])   # ← Convert to native float
+                    for record in result
+                }
         except Exception as e:
-            print(f"Graph query failed for {candidate_id}: {e}")
-            return 0.0, []
+            logging.error(f"Batched graph query failed for {len(candidate_ids)} candidates: {e}")
+            return {}
+
+    def get_graph_score(self, candidate_id, query_entities):
+        return self.get_graph_scores([candidate_id], query_entities).get(candidate_id, (0.0, []))
 
-    def retrieve(self, query_text, top_k=5):
+    def retrieve(self, query_text, top_k=5, query_vector=None, nprobe=None, ef_search=None):
         query_entities = [word.lower() for word in query_text.split()]
-        query_vector = self.embed_query(query_text)
+        if query_vector is None:
+            query_vector = self.embed_query(query_text)
         
         fetch_k = max(20, top_k * 2)
-        total_in_index = self.faiss_index.ntotal
+        total_in_index = self.ntotal()
         fetch_k = min(fetch_k, total_in_index) if total_in_index > 0 else fetch_k
         
-        top_snippets, dense_sim = self.search_faiss(query_vector, top_k=fetch_k)
+        top_snippets, dense_sim = self.search_faiss(query_vector, top_k=fetch_k, nprobe=nprobe, ef_search=ef_search)
         
-        results = []
+        # Keep the best-ranked snippet per candidate
+        hits = []
         seen_candidates = set()
-        
         for snippet, sim in zip(top_snippets, dense_sim):
             candidate_id = snippet.get("candidate_id")
             if not candidate_id or candidate_id in seen_candidates:
                 continue
-            
-            graph_score, graph_paths = self.get_graph_score(candidate_id, query_entities)
+            hits.append((candidate_id, snippet, sim))
+            seen_candidates.add(candidate_id)
+        
+        graph_scores = self.get_graph_scores([cid for cid, _, _ in hits], query_entities)
+        
+        results = []
+        for candidate_id, snippet, sim in hits:
+            graph_score, graph_paths = graph_scores.get(candidate_id, (0.0, []))
             
             composite = self.alpha * sim + self.beta * graph_score
             
@@ -90,7 +139,6 @@ class HybridRetriever:
                 "graph_score": float(graph_score), # ← Force native float
                 "composite_score": float(composite) # ← Force native float
             })
-            seen_candidates.add(candidate_id)
         
         # Rank and return top_k
         results.sort(key=lambda x: x["composite_score"], reverse=True)
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from typing import List, Optional
 import os
+import logging
+import threading
 from retriever import HybridRetriever   # Make sure the import path is correct
+from faiss_store import faiss_store, FAISS_INDEX_PATH, SNIPPET_METADATA_PATH
+from faiss_index_factory import benchmark as benchmark_indexes
+from embedding_service import embedding_service
 from dotenv import load_dotenv
 
 router = APIRouter()
 load_dotenv()
 
-FAISS_INDEX_DIR = "FAISS_Index"
-FAISS_INDEX_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_index.faiss')
-SNIPPET_METADATA_PATH = os.path.join(FAISS_INDEX_DIR, 'snippet_metadata.json')
-
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")      # Recommended
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "khubaib123")
@@ -18,32 +22,128 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "khubaib123")
 class SearchQuery(BaseModel):
     query: str
     top_k: int = 5
+    nprobe: Optional[int] = None      # IVF indexes: cells probed (recall vs latency)
+    ef_search: Optional[int] = None   # HNSW index: search breadth (recall vs latency)
+
+
+# -------------------------
+# Process-wide retriever
+# -------------------------
+class RetrieverManager:
+    """
+    Owns a single long-lived HybridRetriever (Neo4j driver; the embedding model
+    is the shared one in embedding_service).
+    It searches the in-memory FaissIndexStore that upload_resume appends to,
+    so new resumes are visible immediately without reloading anything.
+    """
+
+    def __init__(self):
+        self._retriever = None
+        self._lock = threading.Lock()
+
+    def get(self) -> HybridRetriever:
+        if self._retriever is not None:
+            return self._retriever
+
+        with self._lock:
+            if self._retriever is None:
+                self._retriever = HybridRetriever(
+                    faiss_index_path=FAISS_INDEX_PATH,
+                    snippet_metadata_path=SNIPPET_METADATA_PATH,
+                    neo4j_uri=NEO4J_URI,
+                    neo4j_user=NEO4J_USER,
+                    neo4j_pass=NEO4J_PASSWORD,
+                    index_store=faiss_store
+                )
+                logging.info(f"HybridRetriever initialised ({faiss_store.ntotal} vectors)")
+            return self._retriever
+
+    def close(self):
+        with self._lock:
+            if self._retriever is not None:
+                self._retriever.close()
+                self._retriever = None
+
+
+retriever_manager = RetrieverManager()
+
+
+@router.on_event("startup")
+def startup_event():
+    try:
+        retriever_manager.get()
+    except Exception as e:
+        logging.error(f"Failed to initialise HybridRetriever at startup: {e}")
+
+
+@router.on_event("shutdown")
+def shutdown_event():
+    retriever_manager.close()
+
 
 @router.post("/search")
 async def search_candidates(query_data: SearchQuery):
-    if not os.path.exists(FAISS_INDEX_PATH):
-        raise HTTPException(status_code=500, detail="FAISS index not found. Please upload resumes first.")
-    if not os.path.exists(SNIPPET_METADATA_PATH):
-        raise HTTPException(status_code=500, detail="Snippet metadata not found. Please upload resumes first.")
-        
+    if faiss_store.ntotal == 0:
+        raise HTTPException(status_code=500, detail="FAISS index is empty. Please upload resumes first.")
+
     try:
-        retriever = HybridRetriever(
-            faiss_index_path=FAISS_INDEX_PATH,
-            snippet_metadata_path=SNIPPET_METADATA_PATH,
-            neo4j_uri=NEO4J_URI,
-            neo4j_user=NEO4J_USER,
-            neo4j_pass=NEO4J_PASSWORD
+        retriever = await run_in_threadpool(retriever_manager.get)
+
+        # Embedded through the shared micro-batcher so concurrent searches share a model call
+        query_vector = (await embedding_service.embed([query_data.query]))[0]
+        results = await run_in_threadpool(
+            retriever.retrieve, query_data.query, query_data.top_k, query_vector,
+            query_data.nprobe, query_data.ef_search
         )
-        
-        results = retriever.retrieve(query_data.query, top_k=query_data.top_k)
-        
+
         return {
             "success": True,
             "query": query_data.query,
             "results": results
         }
-        
+
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+# GET /faiss/info
+@router.get("/faiss/info")
+async def get_faiss_info():
+    try:
+        return JSONResponse(status_code=200, content=await run_in_threadpool(faiss_store.info))
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# POST /faiss/rebuild
+@router.post("/faiss/rebuild")
+async def rebuild_faiss_index(index_type: Optional[str] = None):
+    try:
+        result = await run_in_threadpool(faiss_store.rebuild, index_type)
+        return JSONResponse(status_code=200, content=result)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except RuntimeError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# GET /faiss/benchmark
+@router.get("/faiss/benchmark")
+async def benchmark_faiss_index(
+    index_types: List[str] = Query(["ivfflat", "ivfpq", "hnsw"]),
+    k: int = Query(10, ge=1, le=100),
+    queries: int = Query(200, ge=1, le=5000)
+):
+    """Recall@k and latency of each ANN index type vs exact search over the current corpus."""
+    try:
+        vectors = await run_in_threadpool(faiss_store.exact_vectors)
+        results = await run_in_threadpool(benchmark_indexes, vectors, index_types, k, queries)
+        return JSONResponse(status_code=200, content={"corpus_size": int(len(vectors)), "k": k, "results": results})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
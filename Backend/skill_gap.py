@@ -1,13 +1,29 @@
 # skill_gap.py
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable
+import os
 import json
-from db import get_connection, release_connection
+import heapq
+import logging
+import numpy as np
+from db import async_db
+from candidate_repository import candidate_repository
+from skill_index import normalize_skills, candidate_skill_index, backfill_candidate_skills
+from candidate_embeddings import candidate_embeddings
+from faiss_store import faiss_store
+from job_embeddings import job_embeddings, embed_job, to_bytes, init_job_embedding_columns, JOB_EMBEDDING_VERSION
 
 router = APIRouter()
 
+# Candidates pulled from FAISS before skill/trait scoring in retrieval=semantic mode
+RETRIEVAL_MODES = ("exact", "semantic")
+SEMANTIC_TOP_N = int(os.getenv("SEMANTIC_TOP_N", "200"))
+# Default share of the embedding similarity in the retrieval=semantic ranking score
+SEMANTIC_RANK_WEIGHT = float(os.getenv("SEMANTIC_RANK_WEIGHT", "0.3"))
+
 
 class JobCreate(BaseModel):
     title: str
@@ -16,37 +32,6 @@ class JobCreate(BaseModel):
     required_traits: Optional[Dict[str, float]] = None
 
 
-def _normalize_skills(skills) -> set:
-    if not skills:
-        return set()
-
-    # Handle PostgreSQL array string format: {flutter,dart,kotlin}
-    if isinstance(skills, str):
-        s = skills.strip()
-        if s.startswith('{') and s.endswith('}'):
-            skills = [x.strip().strip('"\'') for x in s[1:-1].split(',')]
-        else:
-            try:
-                skills = json.loads(s)
-            except:
-                skills = [s]
-
-    result = set()
-    for s in skills:
-        s = str(s).strip()
-        if not s:
-            continue
-        # Handle "Category: skill1, skill2, skill3" format
-        if ':' in s:
-            s = s.split(':', 1)[1]
-        # Split by comma to extract individual skills
-        for part in s.split(','):
-            part = part.strip().lower()
-            if part:
-                result.add(part)
-    return result
-
-
 def _calculate_trait_match(candidate_traits: dict, required_traits: dict) -> float:
     if not required_traits:
         return 0.0
@@ -62,16 +47,47 @@ def _calculate_trait_match(candidate_traits: dict, required_traits: dict) -> flo
     return round((score / total_weight) * 100, 1)
 
 
+@router.on_event("startup")
+def startup_event():
+    # Make sure every resume has its skills materialised for the ranking index
+    try:
+        backfilled = backfill_candidate_skills()
+        if backfilled:
+            logging.info(f"Backfilled candidate_skills for {backfilled} resumes")
+    except Exception as e:
+        logging.warning(f"Could not backfill candidate_skills: {e}")
+    try:
+        init_job_embedding_columns()
+    except Exception as e:
+        logging.warning(f"Could not ensure job embedding columns: {e}")
+
+
+def _scatter(n: int, rows: np.ndarray, arrays: tuple) -> tuple:
+    """Place per-row score arrays back at their positions in length-n arrays (zeros elsewhere)."""
+    scattered = []
+    for values in arrays:
+        full = np.zeros(n)
+        full[rows] = values
+        scattered.append(full)
+    return tuple(scattered)
+
+
+def _ndjson_response(header: dict, records: Iterable[dict]) -> StreamingResponse:
+    """Stream a header line followed by one JSON object per line."""
+    def generate():
+        yield json.dumps(header) + "\n"
+        for record in records:
+            yield json.dumps(record) + "\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 # GET /jobs
 @router.get("/jobs")
 async def get_all_jobs():
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT job_id, title, description, skills, required_traits FROM jobs ORDER BY job_id")
-        rows = cur.fetchall()
-        cur.close()
-        release_connection(conn)
+        rows = await async_db.fetchall(
+            "SELECT job_id, title, description, skills, required_traits FROM jobs ORDER BY job_id"
+        )
 
         jobs = [
             {
@@ -93,24 +109,22 @@ async def get_all_jobs():
 @router.post("/jobs")
 async def create_job(job: JobCreate):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
         title = job.title.strip()
         if not title:
             raise HTTPException(status_code=400, detail="Job title cannot be empty")
 
         required_traits = job.required_traits or {}
-
-        cur.execute(
-            "INSERT INTO jobs (title, description, skills, required_traits) VALUES (%s, %s, %s, %s) RETURNING job_id",
-            (title, job.description.strip() if job.description else "", job.skills, json.dumps(required_traits))
-        )
-        job_id = cur.fetchone()[0]
-        conn.commit()
-
-        cur.close()
-        release_connection(conn)
+        description = job.description.strip() if job.description else ""
+        embedding = await embed_job(title, description, job.skills)
+
+        async with async_db.connection() as conn:
+            cur = await conn.execute(
+                "INSERT INTO jobs (title, description, skills, required_traits, embedding, embedding_version) "
+                "VALUES (%s, %s, %s, %s, %s, %s) RETURNING job_id",
+                (title, description, job.skills, json.dumps(required_traits), to_bytes(embedding), JOB_EMBEDDING_VERSION)
+            )
+            job_id = (await cur.fetchone())[0]
+        job_embeddings.put(job_id, embedding)
 
         return JSONResponse(
             status_code=201,
@@ -124,10 +138,6 @@ async def create_job(job: JobCreate):
         )
 
     except Exception as e:
-        if 'conn' in locals():
-            conn.rollback()
-            release_connection(conn)
-
         error_str = str(e).lower()
         if "unique_job_title" in error_str or "duplicate key" in error_str:
             return JSONResponse(status_code=409, content={"error": "A job with this title already exists"})
@@ -135,49 +145,36 @@ async def create_job(job: JobCreate):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+# GET /jobs/embeddings/stats
+@router.get("/jobs/embeddings/stats")
+async def get_job_embedding_stats():
+    try:
+        return JSONResponse(status_code=200, content=job_embeddings.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
 # GET /skill-gap/{job_id}/{candidate_id}
 @router.get("/skill-gap/{job_id}/{candidate_id}")
 async def get_skill_gap(job_id: int, candidate_id: int):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT title, skills, required_traits FROM jobs WHERE job_id = %s", (job_id,))
-        job_row = cur.fetchone()
+        job_row = await async_db.fetchone(
+            "SELECT title, skills, required_traits FROM jobs WHERE job_id = %s", (job_id,)
+        )
         if not job_row:
             raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
 
         job_title, job_skills_raw, required_traits = job_row
-        job_skills = _normalize_skills(job_skills_raw)
+        job_skills = normalize_skills(job_skills_raw)
         required_traits = required_traits or {}
 
-        cur.execute("""
-            SELECT rs.structured_json,
-                   COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
-                   COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
-                   COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0)
-            FROM resumes r
-            JOIN resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-            WHERE r.id = %s
-        """, (candidate_id,))
-
-        candidate_row = cur.fetchone()
-        if not candidate_row:
+        candidate = await candidate_repository.get(candidate_id)
+        if not candidate:
             raise HTTPException(status_code=404, detail=f"Candidate {candidate_id} not found")
 
-        structured_json = candidate_row[0]
-        candidate_name = structured_json.get("name", f"Candidate {candidate_id}")
-        candidate_skills = _normalize_skills(structured_json.get("skills", []))
-
-        candidate_traits = {
-            "leadership": candidate_row[1],
-            "communication": candidate_row[2],
-            "analytical_thinking": candidate_row[3],
-            "ownership": candidate_row[4],
-            "problem_solving": candidate_row[5],
-            "attention_to_detail": candidate_row[6]
-        }
+        candidate_name = candidate["name"]
+        candidate_skills = candidate["skills"]
+        candidate_traits = candidate["traits"]
 
         matched_skills = sorted(job_skills & candidate_skills)
         missing_skills = sorted(job_skills - candidate_skills)
@@ -185,9 +182,6 @@ async def get_skill_gap(job_id: int, candidate_id: int):
         trait_match_pct = _calculate_trait_match(candidate_traits, required_traits)
         final_score = round((skill_match_pct * 0.70) + (trait_match_pct * 0.30), 1)
 
-        cur.close()
-        release_connection(conn)
-
         return JSONResponse(status_code=200, content={
             "job_id": job_id,
             "job_title": job_title,
@@ -209,178 +203,276 @@ async def get_skill_gap(job_id: int, candidate_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        if 'conn' in locals():
-            release_connection(conn)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 # GET /rank-candidates/{job_id}
 @router.get("/rank-candidates/{job_id}")
-async def rank_candidates(job_id: int):
+async def rank_candidates(
+    job_id: int,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    min_score: Optional[float] = None,
+    stream: bool = False,
+    retrieval: str = "exact",
+    semantic_top_n: int = Query(SEMANTIC_TOP_N, ge=1),
+    semantic_weight: float = Query(SEMANTIC_RANK_WEIGHT, ge=0.0, le=1.0),
+    nprobe: Optional[int] = Query(None, ge=1),
+    ef_search: Optional[int] = Query(None, ge=1)
+):
+    if retrieval not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"retrieval must be one of {list(RETRIEVAL_MODES)}")
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT title, skills, required_traits FROM jobs WHERE job_id = %s", (job_id,))
-        job_row = cur.fetchone()
+        job_row = await async_db.fetchone(
+            "SELECT title, skills, required_traits FROM jobs WHERE job_id = %s", (job_id,)
+        )
         if not job_row:
             raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
 
         job_title, job_skills_raw, required_traits = job_row
-        job_skills = _normalize_skills(job_skills_raw)
+        job_skills = normalize_skills(job_skills_raw)
         required_traits = required_traits or {}
         total_required = len(job_skills)
 
-        cur.execute("""
-            SELECT r.id, rs.structured_json,
-                   COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
-                   COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
-                   COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0)
-            FROM resumes r
-            JOIN resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-            ORDER BY r.id
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        release_connection(conn)
-
-        ranked = []
-        for row in rows:
-            candidate_id = row[0]
-            structured_json = row[1]
-            candidate_name = structured_json.get("name", f"Candidate {candidate_id}")
-            raw_skills = structured_json.get("skills", [])
-            candidate_skills = _normalize_skills(raw_skills)
-
-            candidate_traits = {
-                "leadership": row[2], "communication": row[3], "analytical_thinking": row[4],
-                "ownership": row[5], "problem_solving": row[6], "attention_to_detail": row[7]
-            }
-
-            matched = sorted(job_skills & candidate_skills)
-            missing = sorted(job_skills - candidate_skills)
-            skill_pct = round((len(matched) / total_required * 100) if total_required > 0 else 0.0, 1)
-            trait_pct = _calculate_trait_match(candidate_traits, required_traits)
-            final_score = round((skill_pct * 0.70) + (trait_pct * 0.30), 1)
-
-            ranked.append({
-                "rank": 0,
-                "candidate_id": candidate_id,
-                "candidate_name": candidate_name,
-                "skill_match": skill_pct,
-                "trait_match": trait_pct,
-                "final_score": final_score,
-                "match_percentage": final_score,       # Frontend expects this
-                "matched_skills": matched,
-                "missing_skills": missing,
-                "matched_count": len(matched),         # Frontend expects this
-                "missing_count": len(missing),         # Frontend expects this
-                "candidate_traits": candidate_traits
-            })
-
-        ranked.sort(key=lambda x: -x["final_score"])
-        for i, item in enumerate(ranked):
-            item["rank"] = i + 1
-
-        return JSONResponse(status_code=200, content={
+        index = await run_in_threadpool(candidate_skill_index.snapshot)
+        semantic = {}
+        if retrieval == "semantic":
+            # Pre-retrieve the N nearest candidates to the stored job embedding, then score only those
+            job_vector = await job_embeddings.get(job_id)
+            nearest = await run_in_threadpool(
+                faiss_store.nearest_candidates, job_vector, semantic_top_n, nprobe, ef_search
+            )
+            # Squared L2 between unit vectors -> cosine similarity
+            semantic = {cid: 1.0 - dist / 2.0 for cid, dist in nearest}
+            rows = index.rows_for(list(semantic))
+            row_skill, row_trait, row_final = index.score_job(job_skills, required_traits, rows)
+            # Blend like /recommend-jobs so differently-worded skills still earn a score
+            row_semantic = np.round(np.maximum([semantic[int(cid)] for cid in index.candidate_ids[rows]], 0.0) * 100, 1)
+            row_final = np.round(row_final * (1 - semantic_weight) + row_semantic * semantic_weight, 1)
+            skill_pct, trait_pct, final_scores, semantic_pct = _scatter(
+                len(index), rows, (row_skill, row_trait, row_final, row_semantic)
+            )
+        else:
+            # Sparse candidate x skill product over the precomputed index
+            skill_pct, trait_pct, final_scores = index.score_job(job_skills, required_traits)
+            rows = np.arange(len(index))
+
+        if min_score is not None:
+            rows = rows[final_scores[rows] >= min_score]
+
+        # Partial sort: only the requested page is ordered and given match details
+        page_rows = index.top_k(final_scores, offset + limit if limit else None, rows)[offset:]
+
+        def ranked():
+            for rank, row in enumerate(page_rows, start=offset + 1):
+                candidate_skills = index.candidate_skills(row)
+                matched = sorted(job_skills & candidate_skills)
+                missing = sorted(job_skills - candidate_skills)
+
+                record = {
+                    "rank": rank,
+                    "candidate_id": int(index.candidate_ids[row]),
+                    "candidate_name": index.names[row],
+                    "skill_match": float(skill_pct[row]),
+                    "trait_match": float(trait_pct[row]),
+                    "final_score": float(final_scores[row]),
+                    "match_percentage": float(final_scores[row]),   # Frontend expects this
+                    "matched_skills": matched,
+                    "missing_skills": missing,
+                    "matched_count": len(matched),         # Frontend expects this
+                    "missing_count": len(missing),         # Frontend expects this
+                    "candidate_traits": index.candidate_traits(row)
+                }
+                if semantic:
+                    record["semantic_similarity"] = round(semantic[int(index.candidate_ids[row])], 4)
+                    record["semantic_match_percentage"] = float(semantic_pct[row])
+                yield record
+
+        header = {
             "job_id": job_id,
             "job_title": job_title,
             "total_required_skills": total_required,
-            "candidates": ranked
-        })
+            "total_candidates": int(len(rows)),
+            "retrieval": retrieval,
+            "semantic_weight": semantic_weight if retrieval == "semantic" else None,
+            "offset": offset,
+            "limit": limit
+        }
+        if stream:
+            return _ndjson_response(header, ranked())
+
+        return JSONResponse(status_code=200, content={**header, "candidates": list(ranked())})
 
     except HTTPException:
         raise
     except Exception as e:
-        if 'conn' in locals():
-            release_connection(conn)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 # GET /recommend-jobs/{candidate_id}
 @router.get("/recommend-jobs/{candidate_id}")
-async def recommend_jobs(candidate_id: int):
+async def recommend_jobs(
+    candidate_id: int,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    min_score: Optional[float] = None,
+    stream: bool = False,
+    semantic_weight: float = Query(0.0, ge=0.0, le=1.0)
+):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
         # Fetch candidate
-        cur.execute("""
-            SELECT rs.structured_json,
-                   COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
-                   COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
-                   COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0)
-            FROM resumes r
-            JOIN resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits rt ON r.id = rt.resume_id
-            WHERE r.id = %s
-        """, (candidate_id,))
-
-        candidate_row = cur.fetchone()
-        if not candidate_row:
+        candidate = await candidate_repository.get(candidate_id)
+        if not candidate:
             raise HTTPException(status_code=404, detail=f"Candidate {candidate_id} not found")
 
-        structured_json = candidate_row[0]
-        candidate_name = structured_json.get("name", f"Candidate {candidate_id}")
-        candidate_skills = _normalize_skills(structured_json.get("skills", []))
-
-        candidate_traits = {
-            "leadership": candidate_row[1],
-            "communication": candidate_row[2],
-            "analytical_thinking": candidate_row[3],
-            "ownership": candidate_row[4],
-            "problem_solving": candidate_row[5],
-            "attention_to_detail": candidate_row[6]
-        }
+        candidate_name = candidate["name"]
+        candidate_skills = candidate["skills"]
+        candidate_traits = candidate["traits"]
 
         # Fetch all jobs
-        cur.execute("SELECT job_id, title, skills, required_traits FROM jobs ORDER BY job_id")
-        job_rows = cur.fetchall()
-        cur.close()
-        release_connection(conn)
-
-        recommended = []
-        for job_row in job_rows:
+        job_rows = await async_db.fetchall("SELECT job_id, title, skills, required_traits FROM jobs ORDER BY job_id")
+
+        # Semantic blend: cosine of the stored candidate and job embeddings (no model inference)
+        semantic = {}
+        if semantic_weight > 0:
+            candidate_vec = (await candidate_embeddings.get_many([candidate], normalize=True))[candidate_id]
+            job_vectors = await job_embeddings.get_many([row[0] for row in job_rows])
+            semantic = {jid: max(float(np.dot(vec, candidate_vec)), 0.0) * 100 for jid, vec in job_vectors.items()}
+
+        # Score every job cheaply; match lists are only built for the returned page
+        scored = []
+        for position, job_row in enumerate(job_rows):
             job_id, job_title, job_skills_raw, required_traits = job_row
-            job_skills = _normalize_skills(job_skills_raw)
+            job_skills = normalize_skills(job_skills_raw)
             required_traits = required_traits or {}
             total_required = len(job_skills)
 
-            matched = sorted(job_skills & candidate_skills)
-            missing = sorted(job_skills - candidate_skills)
-            skill_pct = round((len(matched) / total_required * 100) if total_required > 0 else 0.0, 1)
+            matched_count = len(job_skills & candidate_skills)
+            skill_pct = round((matched_count / total_required * 100) if total_required > 0 else 0.0, 1)
             trait_pct = _calculate_trait_match(candidate_traits, required_traits)
             final_score = round((skill_pct * 0.70) + (trait_pct * 0.30), 1)
+            semantic_pct = round(semantic.get(job_id, 0.0), 1) if semantic_weight > 0 else None
+            if semantic_pct is not None:
+                final_score = round(final_score * (1 - semantic_weight) + semantic_pct * semantic_weight, 1)
 
-            recommended.append({
-                "rank": 0,
-                "job_id": job_id,
-                "job_title": job_title,
-                "match_percentage": final_score,
-                "skill_match_percentage": skill_pct,
-                "trait_match_percentage": trait_pct,
-                "total_required_skills": total_required,
-                "matched_skills": matched,
-                "missing_skills": missing,
-                "matched_count": len(matched),
-                "missing_count": len(missing)
-            })
-
-        recommended.sort(key=lambda x: -x["match_percentage"])
-        for i, item in enumerate(recommended):
-            item["rank"] = i + 1
+            if min_score is not None and final_score < min_score:
+                continue
+            scored.append((-final_score, position, job_id, job_title, job_skills, skill_pct, trait_pct, semantic_pct))
 
-        return JSONResponse(status_code=200, content={
+        # Heap-based partial sort for the page; full sort only when everything is requested
+        if limit:
+            page = heapq.nsmallest(offset + limit, scored)[offset:]
+        else:
+            page = sorted(scored)[offset:]
+
+        def recommended():
+            for rank, (neg_score, _, job_id, job_title, job_skills, skill_pct, trait_pct, semantic_pct) in enumerate(page, start=offset + 1):
+                matched = sorted(job_skills & candidate_skills)
+                missing = sorted(job_skills - candidate_skills)
+                record = {
+                    "rank": rank,
+                    "job_id": job_id,
+                    "job_title": job_title,
+                    "match_percentage": -neg_score,
+                    "skill_match_percentage": skill_pct,
+                    "trait_match_percentage": trait_pct,
+                    "total_required_skills": len(job_skills),
+                    "matched_skills": matched,
+                    "missing_skills": missing,
+                    "matched_count": len(matched),
+                    "missing_count": len(missing)
+                }
+                if semantic_pct is not None:
+                    record["semantic_match_percentage"] = semantic_pct
+                yield record
+
+        header = {
             "candidate_id": candidate_id,
             "candidate_name": candidate_name,
             "candidate_skills": sorted(candidate_skills),
-            "recommended_jobs": recommended
-        })
+            "total_jobs": len(scored),
+            "offset": offset,
+            "limit": limit
+        }
+        if stream:
+            return _ndjson_response(header, recommended())
+
+        return JSONResponse(status_code=200, content={**header, "recommended_jobs": list(recommended())})
 
     except HTTPException:
         raise
     except Exception as e:
-        if 'conn' in locals():
-            release_connection(conn)
-        return JSONResponse(status_code=500, content={"error": str(e)})
\ No newline at end of file
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# GET /match-matrix
+@router.get("/match-matrix")
+async def match_matrix(
+    job_ids: Optional[List[int]] = Query(None),
+    candidate_ids: Optional[List[int]] = Query(None),
+    top_k: Optional[int] = Query(None, ge=1),
+    min_score: Optional[float] = None,
+    include_components: bool = False
+):
+    """
+    Job x candidate fit grid. Without top_k the dense final_score matrix is
+    returned (rows = jobs, columns = candidates); with top_k each job gets its
+    best candidates (at or above min_score) instead.
+    """
+    try:
+        if job_ids:
+            job_rows = await async_db.fetchall(
+                "SELECT job_id, title, skills, required_traits FROM jobs WHERE job_id = ANY(%s) ORDER BY job_id",
+                (job_ids,)
+            )
+        else:
+            job_rows = await async_db.fetchall("SELECT job_id, title, skills, required_traits FROM jobs ORDER BY job_id")
+
+        jobs = [(normalize_skills(row[2]), row[3] or {}) for row in job_rows]
+
+        index = await run_in_threadpool(candidate_skill_index.snapshot)
+        skill_pct, trait_pct, final_scores = index.score_jobs(jobs)
+
+        columns = np.arange(len(index))
+        if candidate_ids:
+            columns = columns[np.isin(index.candidate_ids, candidate_ids)]
+
+        job_info = [{"job_id": row[0], "job_title": row[1]} for row in job_rows]
+
+        if top_k is None:
+            content = {
+                "jobs": job_info,
+                "candidates": [
+                    {"candidate_id": int(index.candidate_ids[c]), "candidate_name": index.names[c]}
+                    for c in columns
+                ],
+                "final_score": final_scores[:, columns].tolist()
+            }
+            if include_components:
+                content["skill_match"] = skill_pct[:, columns].tolist()
+                content["trait_match"] = trait_pct[:, columns].tolist()
+            return JSONResponse(status_code=200, content=content)
+
+        results = []
+        for j, info in enumerate(job_info):
+            rows = columns
+            if min_score is not None:
+                rows = rows[final_scores[j, rows] >= min_score]
+
+            top = []
+            for rank, c in enumerate(index.top_k(final_scores[j], top_k, rows), start=1):
+                entry = {
+                    "rank": rank,
+                    "candidate_id": int(index.candidate_ids[c]),
+                    "candidate_name": index.names[c],
+                    "final_score": float(final_scores[j, c])
+                }
+                if include_components:
+                    entry["skill_match"] = float(skill_pct[j, c])
+                    entry["trait_match"] = float(trait_pct[j, c])
+                top.append(entry)
+            results.append({**info, "total_candidates": int(len(rows)), "candidates": top})
+
+        return JSONResponse(status_code=200, content={"top_k": top_k, "jobs": results})
+
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,409 @@
+# skill_index.py
+"""
+Precomputed candidate skill index used by /rank-candidates.
+
+Normalised skills are materialised at ingestion time into `candidate_skills`
+(an inverted index: skill -> resume ids). In memory the pool is held as a
+sparse candidate x skill matrix plus a dense candidate x trait matrix, so
+ranking a job is a sparse matrix-vector product and a top-k selection
+rather than a Python loop over JSONB blobs.
+
+    python skill_index.py     # create candidate_skills and backfill it
+"""
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from psycopg2.extras import execute_values
+
+from db import get_connection, release_connection
+
+TRAIT_KEYS = [
+    "leadership", "communication", "analytical_thinking",
+    "ownership", "problem_solving", "attention_to_detail"
+]
+
+
+def normalize_skills(skills) -> set:
+    """
+    Lower-cased skill set from a resume or job skills value: a list (nested
+    lists are flattened), a JSON string, a Postgres array literal, or
+    "Category: a, b" entries. Shared by ranking, recommendations and team fit.
+    """
+    if not skills:
+        return set()
+
+    # Handle PostgreSQL array string format: {flutter,dart,kotlin}
+    if isinstance(skills, str):
+        s = skills.strip()
+        if s.startswith('{') and s.endswith('}'):
+            skills = [x.strip().strip('"\'') for x in s[1:-1].split(',')]
+        else:
+            try:
+                skills = json.loads(s)
+            except:
+                skills = [s]
+
+    result = set()
+    for s in skills:
+        if isinstance(s, (list, tuple)):
+            # Nested groups, e.g. [["python", "sql"], "Docker"]
+            result |= normalize_skills(list(s))
+            continue
+        s = str(s).strip()
+        if not s:
+            continue
+        # Handle "Category: skill1, skill2, skill3" format
+        if ':' in s:
+            s = s.split(':', 1)[1]
+        # Split by comma to extract individual skills
+        for part in s.split(','):
+            part = part.strip().lower()
+            if part:
+                result.add(part)
+    return result
+
+
+# -------------------------
+# candidate_skills table
+# -------------------------
+def ensure_candidate_skills_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_skills (
+            resume_id INT REFERENCES resumes(id) ON DELETE CASCADE,
+            skill TEXT NOT NULL,
+            PRIMARY KEY (resume_id, skill)
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_candidate_skills_skill ON candidate_skills(skill);")
+
+
+def save_candidate_skills(cur, resume_id: int, structured_json: dict):
+    """Materialise a resume's normalised skills; call inside the ingestion transaction."""
+    skills = normalize_skills(structured_json.get("skills", []))
+    cur.execute("DELETE FROM candidate_skills WHERE resume_id = %s", (resume_id,))
+    if skills:
+        execute_values(
+            cur,
+            "INSERT INTO candidate_skills (resume_id, skill) VALUES %s ON CONFLICT DO NOTHING",
+            [(resume_id, skill) for skill in sorted(skills)]
+        )
+
+
+def backfill_candidate_skills() -> int:
+    """Materialise skills for resumes ingested before the index existed."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        ensure_candidate_skills_table(cur)
+        cur.execute("""
+            SELECT r.id, rs.structured_json
+            FROM resumes r
+            JOIN resume_structured rs ON r.id = rs.resume_id
+            WHERE NOT EXISTS (SELECT 1 FROM candidate_skills cs WHERE cs.resume_id = r.id)
+        """)
+        rows = cur.fetchall()
+        for resume_id, structured_json in rows:
+            save_candidate_skills(cur, resume_id, structured_json or {})
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+# -------------------------
+# In-memory index
+# -------------------------
+def _skill_rows(rows: list, vocab: Dict[str, int]) -> sparse.csr_matrix:
+    """Binary CSR of the rows' skills; new skills are appended to `vocab` in place."""
+    indptr, indices = [0], []
+    for row in rows:
+        for skill in row[8]:
+            indices.append(vocab.setdefault(skill, len(vocab)))
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+        shape=(len(rows), len(vocab))
+    )
+
+
+class SkillIndexSnapshot:
+    """
+    Immutable view of the pool: sparse candidate x skill matrix, candidate x
+    trait matrix and the id/name arrays aligned with their rows (ordered by id).
+    """
+
+    def __init__(self, candidate_ids: np.ndarray, names: List[str], vocab: Dict[str, int],
+                 matrix: sparse.csr_matrix, traits: np.ndarray):
+        self.candidate_ids = candidate_ids
+        self.names = names
+        self.vocab = vocab
+        self.skills: List[str] = sorted(vocab, key=vocab.get)
+        self.matrix = matrix
+        self.traits = traits
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "SkillIndexSnapshot":
+        """Build from CandidateSkillIndex._load_rows() rows (already ordered by id)."""
+        vocab: Dict[str, int] = {}
+        matrix = _skill_rows(rows, vocab)
+        return cls(
+            np.array([row[0] for row in rows], dtype=np.int64),
+            [row[1] or f"Candidate {row[0]}" for row in rows],
+            vocab,
+            matrix,
+            np.array([row[2:8] for row in rows], dtype=np.float64).reshape(-1, len(TRAIT_KEYS)),
+        )
+
+    def with_rows(self, rows: list) -> "SkillIndexSnapshot":
+        """
+        New snapshot with `rows` added, replacing existing rows with the same
+        ids. Only the new rows are processed; the vocabulary only grows.
+        """
+        if not rows:
+            return self
+        new_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        keep = np.flatnonzero(~np.isin(self.candidate_ids, new_ids))
+
+        vocab = dict(self.vocab)
+        added = _skill_rows(rows, vocab)
+        kept = self.matrix[keep]
+        kept.resize((len(keep), len(vocab)))
+
+        candidate_ids = np.concatenate([self.candidate_ids[keep], new_ids])
+        names = [self.names[i] for i in keep] + [row[1] or f"Candidate {row[0]}" for row in rows]
+        matrix = sparse.vstack([kept, added], format="csr")
+        traits = np.vstack([self.traits[keep], np.array([row[2:8] for row in rows], dtype=np.float64)])
+
+        # Uploads get increasing ids, so this is normally already sorted
+        order = np.argsort(candidate_ids, kind="stable")
+        if np.any(order != np.arange(len(order))):
+            candidate_ids, matrix, traits = candidate_ids[order], matrix[order], traits[order]
+            names = [names[i] for i in order]
+        return SkillIndexSnapshot(candidate_ids, names, vocab, matrix, traits)
+
+    def __len__(self):
+        return len(self.candidate_ids)
+
+    def rows_for(self, candidate_ids: List[int]) -> np.ndarray:
+        """Row positions of the given ids (rows are ordered by id); unknown ids are dropped."""
+        ids = np.asarray(candidate_ids, dtype=np.int64)
+        if len(self) == 0 or len(ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.candidate_ids, ids), len(self) - 1)
+        return rows[self.candidate_ids[rows] == ids]
+
+    def candidate_skills(self, row: int) -> set:
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return {self.skills[i] for i in self.matrix.indices[start:end]}
+
+    def candidate_traits(self, row: int) -> dict:
+        return {trait: float(self.traits[row, i]) for i, trait in enumerate(TRAIT_KEYS)}
+
+    # -------------------------
+    # Scoring
+    # -------------------------
+    def trait_match(self, required_traits: dict, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorised skill_gap._calculate_trait_match over every candidate (or just `rows`)."""
+        traits = self.traits if rows is None else self.traits[rows]
+        n = len(traits)
+        if not required_traits:
+            return np.zeros(n)
+        total_weight = sum(required_traits.values())
+        if total_weight == 0:
+            return np.zeros(n)
+
+        score = np.zeros(n)
+        for trait, required_score in required_traits.items():
+            if not required_score or trait not in TRAIT_KEYS:
+                continue
+            candidate_scores = traits[:, TRAIT_KEYS.index(trait)]
+            score += np.minimum(candidate_scores / required_score, 1.0) * required_score
+        return np.round((score / total_weight) * 100, 1)
+
+    def job_vector(self, job_skills: set) -> np.ndarray:
+        vector = np.zeros(len(self.vocab), dtype=np.float32)
+        for skill in job_skills:
+            if skill in self.vocab:
+                vector[self.vocab[skill]] = 1.0
+        return vector
+
+    def score_job(self, job_skills: set, required_traits: dict, rows: Optional[np.ndarray] = None):
+        """
+        Returns (skill_pct, trait_pct, final_score) arrays aligned with
+        candidate_ids, or with `rows` when only those candidates are scored.
+        """
+        total_required = len(job_skills)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        matched_counts = matrix @ self.job_vector(job_skills)
+
+        if total_required > 0:
+            skill_pct = np.round(matched_counts / total_required * 100, 1)
+        else:
+            skill_pct = np.zeros(matrix.shape[0])
+        trait_pct = self.trait_match(required_traits, rows)
+        final_score = np.round(skill_pct * 0.70 + trait_pct * 0.30, 1)
+        return skill_pct, trait_pct, final_score
+
+    def score_jobs(self, jobs: List[tuple]):
+        """
+        Many-to-many version of score_job. `jobs` is a list of
+        (job_skills, required_traits); returns (skill_pct, trait_pct, final_score)
+        matrices of shape (n_jobs, n_candidates).
+        """
+        n_jobs, n = len(jobs), len(self)
+
+        # Binary job x skill matrix over the candidate vocabulary
+        indptr, indices = [0], []
+        for job_skills, _ in jobs:
+            indices.extend(self.vocab[skill] for skill in job_skills if skill in self.vocab)
+            indptr.append(len(indices))
+        job_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(n_jobs, len(self.vocab))
+        )
+        matched_counts = (job_matrix @ self.matrix.T).toarray()
+        total_required = np.array([len(job_skills) for job_skills, _ in jobs], dtype=np.float64)[:, None]
+        skill_pct = np.round(np.divide(matched_counts, total_required,
+                                       out=np.zeros((n_jobs, n)), where=total_required > 0) * 100, 1)
+
+        # Broadcast candidate / required trait ratios, one trait column at a time
+        required = np.array(
+            [[float((traits or {}).get(trait) or 0.0) for trait in TRAIT_KEYS] for _, traits in jobs],
+            dtype=np.float64
+        ).reshape(n_jobs, len(TRAIT_KEYS))
+        total_weight = np.array([sum((traits or {}).values()) for _, traits in jobs], dtype=np.float64)[:, None]
+        score = np.zeros((n_jobs, n))
+        for i in range(len(TRAIT_KEYS)):
+            req = required[:, i][:, None]
+            ratio = np.divide(self.traits[:, i][None, :], req, out=np.zeros((n_jobs, n)), where=req > 0)
+            score += np.minimum(ratio, 1.0) * req
+        trait_pct = np.round(np.divide(score, total_weight, out=np.zeros((n_jobs, n)),
+                                       where=total_weight > 0) * 100, 1)
+
+        final_score = np.round(skill_pct * 0.70 + trait_pct * 0.30, 1)
+        return skill_pct, trait_pct, final_score
+
+    def top_k(self, scores: np.ndarray, k: Optional[int] = None, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row positions ordered by score desc (ties by candidate id), truncated to k.
+        `rows` restricts the selection (e.g. to candidates above a min_score).
+        """
+        candidates = np.arange(len(scores)) if rows is None else rows
+        if k is not None and 0 < k < len(candidates):
+            # Partial selection; keep every row tied with the k-th score so tie-breaking by id stays exact
+            subset = scores[candidates]
+            threshold = subset[np.argpartition(-subset, k - 1)[:k]].min()
+            candidates = candidates[subset >= threshold]
+        order = np.lexsort((self.candidate_ids[candidates], -scores[candidates]))
+        ranked = candidates[order]
+        return ranked[:k] if k is not None else ranked
+
+
+class CandidateSkillIndex:
+    """
+    Holds the current SkillIndexSnapshot. Uploads call invalidate(resume_ids)
+    once they commit; the next snapshot() loads just those resumes and
+    appends them. invalidate() without ids forces a full reload.
+
+    Building happens outside the read lock: while one request builds, others
+    keep getting the previous snapshot instead of waiting on the reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._version = 0
+        self._built_version = -1
+        self._snapshot: Optional[SkillIndexSnapshot] = None
+        self._pending_ids = set()
+        self._full_reload = True
+
+    def invalidate(self, resume_ids: Optional[List[int]] = None):
+        with self._lock:
+            self._version += 1
+            if resume_ids is None:
+                self._full_reload = True
+            else:
+                self._pending_ids.update(int(rid) for rid in resume_ids)
+
+    def _load_rows(self, resume_ids: Optional[List[int]] = None) -> list:
+        where, params = ("WHERE r.id = ANY(%s)", (list(resume_ids),)) if resume_ids is not None else ("", None)
+        conn = get_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT r.id,
+                       rs.structured_json->>'name',
+                       COALESCE(rt.leadership, 0.0), COALESCE(rt.communication, 0.0),
+                       COALESCE(rt.analytical_thinking, 0.0), COALESCE(rt.ownership, 0.0),
+                       COALESCE(rt.problem_solving, 0.0), COALESCE(rt.attention_to_detail, 0.0),
+                       COALESCE(array_agg(cs.skill) FILTER (WHERE cs.skill IS NOT NULL), '{}')
+                FROM resumes r
+                JOIN resume_structured rs ON r.id = rs.resume_id
+                LEFT JOIN resume_traits rt ON r.id = rt.resume_id
+                LEFT JOIN candidate_skills cs ON r.id = cs.resume_id
+                """ + where + """
+                GROUP BY r.id, rs.structured_json->>'name', rt.leadership, rt.communication,
+                         rt.analytical_thinking, rt.ownership, rt.problem_solving, rt.attention_to_detail
+                ORDER BY r.id
+            """, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+            release_connection(conn)
+
+    def snapshot(self) -> SkillIndexSnapshot:
+        with self._lock:
+            current = self._snapshot
+            if current is not None and self._built_version == self._version:
+                return current
+
+        # Someone else is already building: serve the stale snapshot meanwhile
+        if not self._build_lock.acquire(blocking=current is None):
+            return current
+        try:
+            with self._lock:
+                current = self._snapshot
+                if current is not None and self._built_version == self._version:
+                    return current
+                version, full = self._version, self._full_reload or current is None
+                pending, self._pending_ids, self._full_reload = self._pending_ids, set(), False
+
+            try:
+                if full:
+                    built = SkillIndexSnapshot.from_rows(self._load_rows())
+                elif pending:
+                    built = current.with_rows(self._load_rows(sorted(pending)))
+                else:
+                    built = current
+            except Exception:
+                with self._lock:
+                    self._pending_ids |= pending
+                    self._full_reload = self._full_reload or full
+                raise
+
+            with self._lock:
+                self._snapshot = built
+                self._built_version = version
+            if full:
+                logging.info(f"Candidate skill index built: {len(built)} candidates x {len(built.vocab)} skills")
+            return built
+        finally:
+            self._build_lock.release()
+
+
+# create a global instance
+candidate_skill_index = CandidateSkillIndex()
+
+
+if __name__ == "__main__":
+    count = backfill_candidate_skills()
+    print(f"✅ candidate_skills ready ({count} resumes backfilled)")
@@ -41,3 +41,37 @@ CREATE TABLE jobs (
     description TEXT,
     skills TEXT[]
 );
+
+-- 5. Duplicate detection fingerprints (see dedup.py)
+CREATE TABLE resume_fingerprints (
+    resume_id INT PRIMARY KEY REFERENCES resumes(id) ON DELETE CASCADE,
+    content_hash CHAR(64) NOT NULL,
+    simhash BIGINT NOT NULL,
+    band0 INT NOT NULL,
+    band1 INT NOT NULL,
+    band2 INT NOT NULL,
+    band3 INT NOT NULL
+);
+CREATE INDEX idx_fingerprints_hash ON resume_fingerprints(content_hash);
+CREATE INDEX idx_fingerprints_band0 ON resume_fingerprints(band0);
+CREATE INDEX idx_fingerprints_band1 ON resume_fingerprints(band1);
+CREATE INDEX idx_fingerprints_band2 ON resume_fingerprints(band2);
+CREATE INDEX idx_fingerprints_band3 ON resume_fingerprints(band3);
+
+-- 6. Normalised skills materialised at ingestion (inverted index for ranking, see skill_index.py)
+CREATE TABLE candidate_skills (
+    resume_id INT REFERENCES resumes(id) ON DELETE CASCADE,
+    skill TEXT NOT NULL,
+    PRIMARY KEY (resume_id, skill)
+);
+CREATE INDEX idx_candidate_skills_skill ON candidate_skills(skill);
+
+-- 7. Candidate embeddings written at ingestion, keyed by model + flattener version (see candidate_embeddings.py)
+CREATE TABLE candidate_embeddings (
+    resume_id INT REFERENCES resumes(id) ON DELETE CASCADE,
+    version TEXT NOT NULL,
+    dim INT NOT NULL,
+    embedding BYTEA NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (resume_id, version)
+);
@@ -6,10 +6,14 @@ from typing import List, Dict, Optional
 import numpy as np
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from langchain_groq import ChatGroq
+from llm_gateway import llm_gateway
 
-from db import get_connection, release_connection
+from candidate_repository import candidate_repository
+from candidate_embeddings import candidate_embeddings
+from skill_index import candidate_skill_index, normalize_skills
+from narrative_jobs import narrative_jobs, validate_narrative_mode
 from neo4j_client import neo4j_client
 
 load_dotenv()
@@ -21,12 +25,17 @@ TRAIT_KEYS = [
     "ownership", "problem_solving", "attention_to_detail"
 ]
 
+# /team-fit/best-candidates: each selection step rescores the pool once per beam
+BEST_CANDIDATES_MAX_SELECT = int(os.getenv("BEST_CANDIDATES_MAX_SELECT", "10"))
+BEST_CANDIDATES_MAX_BEAM_WIDTH = int(os.getenv("BEST_CANDIDATES_MAX_BEAM_WIDTH", "10"))
+
 
 # ========================= MODELS =========================
 
 class TeamFitRequest(BaseModel):
     candidate_id: int
     team_member_ids: List[int]
+    narrative: str = "sync"   # sync | deferred | none
 
 
 class MemberFitScore(BaseModel):
@@ -35,6 +44,7 @@ class MemberFitScore(BaseModel):
     trait_complementarity_score: float
     skill_proximity_score: float
     graph_shared_skills: int
+    semantic_similarity: Optional[float] = None   # cosine of stored resume embeddings, informational
     overall_pairwise_fit: float
 
 
@@ -51,86 +61,53 @@ class TeamFitResponse(BaseModel):
     counterfactual_suggestions: List[str]
     llm_analysis: str
     summary: str
+    narrative_job_id: Optional[str] = None
+
+
+class BestCandidatesRequest(BaseModel):
+    team_member_ids: List[int]
+    top_k: int = 10
+    select: int = 0               # size of the k-person addition to optimise (0 = ranking only)
+    strategy: str = "greedy"      # greedy | beam
+    beam_width: int = 5
+    include_analysis: bool = False
+
+
+class CompatibilityMatrixRequest(BaseModel):
+    team_member_ids: List[int]
 
 
 # ========================= LLM SETUP =========================
 
-def get_llm():
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        raise Exception("GROQ_API_KEY is not set in .env file")
-    return ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.5,
-        api_key=groq_key,
-        max_tokens=2000
-    )
+# Groq call settings for the team-fit narrative (client pooling and limits live in llm_gateway)
+LLM_PARAMS = {"temperature": 0.5, "max_tokens": 2000}
 
 
 # ========================= HELPERS =========================
 
-def extract_skills_list(raw_skills) -> List[str]:
+def to_team_profile(profile: dict) -> dict:
     """
-    Mirrors graph_builder.py skill extraction so results stay consistent
-    with what was actually stored in Neo4j.
-    Handles: plain strings, "Category: s1, s2" strings, and nested lists.
+    Shape a candidate_repository profile into the fields team-fit scoring uses.
+    Skills go through normalize_skills, the normalisation the skill index
+    behind /team-fit/best-candidates and the compatibility matrix is built
+    from, so every endpoint scores a pair identically.
     """
-    skills_list = []
-    for entry in raw_skills:
-        if isinstance(entry, str):
-            if ":" in entry:
-                entry = entry.split(":", 1)[1].strip()
-            skills_list.extend([s.strip() for s in entry.split(",") if s.strip()])
-        elif isinstance(entry, (list, tuple)):
-            skills_list.extend([str(s).strip() for s in entry if s])
-        else:
-            skills_list.append(str(entry).strip())
-
-    seen: set = set()
-    return [s for s in skills_list if s and not (s in seen or seen.add(s))]
+    structured = profile["structured_json"]
+    return {
+        "name":       profile["name"],
+        "traits":     profile["traits"],
+        "skills":     sorted(normalize_skills(structured.get("skills", []))),
+        "experience": structured.get("experience", []),
+    }
 
 
-def fetch_candidate_data(candidate_id: int) -> Optional[dict]:
+async def fetch_candidate_data(candidate_id: int) -> Optional[dict]:
     """
-    Pull structured JSON + trait scores from PostgreSQL for one candidate.
+    Pull structured JSON + trait scores for one candidate.
     Returns None when the ID does not exist.
     """
-    conn = get_connection()
-    cur  = conn.cursor()
-    try:
-        cur.execute("""
-            SELECT rs.structured_json,
-                   rt.leadership, rt.communication, rt.analytical_thinking,
-                   rt.ownership, rt.problem_solving, rt.attention_to_detail
-            FROM resumes r
-            JOIN  resume_structured rs ON r.id = rs.resume_id
-            LEFT JOIN resume_traits  rt ON r.id = rt.resume_id
-            WHERE r.id = %s
-        """, (candidate_id,))
-        row = cur.fetchone()
-    finally:
-        cur.close()
-        release_connection(conn)
-
-    if not row:
-        return None
-
-    structured = row[0]
-    traits = {
-        "leadership":          float(row[1] or 0.0),
-        "communication":       float(row[2] or 0.0),
-        "analytical_thinking": float(row[3] or 0.0),
-        "ownership":           float(row[4] or 0.0),
-        "problem_solving":     float(row[5] or 0.0),
-        "attention_to_detail": float(row[6] or 0.0),
-    }
-
-    return {
-        "name":       structured.get("name", f"Candidate {candidate_id}"),
-        "traits":     traits,
-        "skills":     extract_skills_list(structured.get("skills", [])),
-        "experience": structured.get("experience", []),
-    }
+    profile = await candidate_repository.get(candidate_id)
+    return to_team_profile(profile) if profile else None
 
 
 # ========================= SCORING =========================
@@ -177,25 +154,177 @@ def compute_skill_proximity(skills_a: List[str], skills_b: List[str]) -> float:
     return len(set_a & set_b) / union if union > 0 else 0.0
 
 
-def fetch_shared_skills_neo4j(candidate_id: int, member_id: int) -> int:
+def fetch_shared_skills_batch(candidate_id: int, member_ids: List[int]) -> Dict[int, int]:
     """
-    Count Skill nodes shared between two Candidate nodes via HAS_SKILL edges.
-    Returns 0 on any graph error so the rest of scoring is unaffected.
+    Count Skill nodes shared between the candidate and every member via
+    HAS_SKILL edges, in a single query. Members without shared skills (or
+    any graph error) map to 0 so the rest of scoring is unaffected.
     """
+    shared = {mid: 0 for mid in member_ids}
+    if not member_ids:
+        return shared
     try:
         result = neo4j_client.run("""
-            MATCH (c1:Candidate {id: $cid1})-[:HAS_SKILL]->(s:Skill)
-                  <-[:HAS_SKILL]-(c2:Candidate {id: $cid2})
-            RETURN count(s) AS shared
-        """, {"cid1": str(candidate_id), "cid2": str(member_id)})
+            MATCH (c1:Candidate {id: $cid})-[:HAS_SKILL]->(s:Skill)<-[:HAS_SKILL]-(c2:Candidate)
+            WHERE c2.id IN $member_ids
+            RETURN c2.id AS member_id, count(DISTINCT s) AS shared
+        """, {"cid": str(candidate_id), "member_ids": [str(mid) for mid in member_ids]})
         for record in result:
-            return int(record["shared"] or 0)
+            shared[int(record["member_id"])] = int(record["shared"] or 0)
     except Exception as e:
-        logging.error(
-            f"Neo4j shared-skills error "
-            f"(candidate={candidate_id}, member={member_id}): {e}"
-        )
-    return 0
+        logging.error(f"Neo4j shared-skills error (candidate={candidate_id}): {e}")
+    return shared
+
+
+def fetch_shared_skills_neo4j(candidate_id: int, member_id: int) -> int:
+    """Count Skill nodes shared between two Candidate nodes via HAS_SKILL edges."""
+    return fetch_shared_skills_batch(candidate_id, [member_id])[member_id]
+
+
+# ========================= NARRATIVE =========================
+
+def generate_team_fit_narrative(prompt: str, default_summary: str) -> dict:
+    """
+    Blocking Groq call for the team-fit write-up. Always returns the three
+    narrative fields, falling back to defaults when the LLM fails.
+    """
+    llm_analysis               = "LLM analysis is currently unavailable."
+    counterfactual_suggestions = []
+    summary                    = default_summary
+    text = ""
+
+    try:
+        text = llm_gateway.invoke(prompt, **LLM_PARAMS)
+
+        if not text or not text.strip():
+            raise ValueError("LLM returned an empty response")
+
+        text = text.strip()
+        logging.info(f"Team fit LLM raw response (first 300 chars): {text[:300]}")
+
+        # Robust fence stripping
+        if "```json" in text:
+            text = text.split("```json", 1)[1]
+        if "```" in text:
+            text = text.rsplit("```", 1)[0]
+        text = text.strip()
+
+        parsed                     = json.loads(text)
+        llm_analysis               = parsed.get("llm_analysis",              llm_analysis)
+        counterfactual_suggestions = parsed.get("counterfactual_suggestions", counterfactual_suggestions)
+        summary                    = parsed.get("summary",                    summary)
+
+    except json.JSONDecodeError as e:
+        logging.error(f"Team fit LLM JSON parse error: {e}\nRaw snippet: {text[:500]}")
+    except Exception as e:
+        logging.error(f"Team fit LLM call failed: {e}")
+
+    return {
+        "llm_analysis": llm_analysis,
+        "counterfactual_suggestions": counterfactual_suggestions,
+        "summary": summary,
+    }
+
+
+# ========================= POOL SCORING =========================
+
+def pairwise_components(index, rows_a: np.ndarray, rows_b: np.ndarray) -> tuple:
+    """
+    compute_trait_complementarity(a, [b]) and compute_skill_proximity(a, b)
+    for every (a, b) pair of SkillIndexSnapshot rows, as two len(a) x len(b)
+    matrices. Skill Jaccard comes from one sparse product of the binary
+    candidate x skill rows.
+    """
+    traits_a, traits_b = index.traits[rows_a], index.traits[rows_b]
+    member_gap = np.maximum(0.0, 0.70 - traits_b) + 0.30
+    trait_comp = np.clip(traits_a @ member_gap.T / traits_a.shape[1], 0.0, 1.0)
+
+    skills_a, skills_b = index.matrix[rows_a], index.matrix[rows_b]
+    sizes_a = np.asarray(skills_a.sum(axis=1), dtype=np.float64).ravel()
+    sizes_b = np.asarray(skills_b.sum(axis=1), dtype=np.float64).ravel()
+    intersection = (skills_a @ skills_b.T).toarray().astype(np.float64)
+    union = sizes_a[:, None] + sizes_b[None, :] - intersection
+    jaccard = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+    return trait_comp, jaccard
+
+
+def score_pool_against_team(index, team_rows: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorised team-fit scoring of every candidate in a SkillIndexSnapshot
+    against the team at `team_rows`. Mirrors team_fit_analysis: trait
+    complementarity (45%), mean pairwise fit (35%) and skill uniqueness (20%),
+    where pairwise fit = 0.5 * trait complementarity + 0.4 * skill Jaccard.
+    The Neo4j shared-skill bonus is left out so the whole pool is scored
+    without graph round trips.
+    """
+    traits = index.traits
+
+    # compute_trait_complementarity against the team average
+    team_gap = np.maximum(0.0, 0.70 - traits[team_rows].mean(axis=0)) + 0.30
+    trait_comp = np.clip(traits @ team_gap / traits.shape[1], 0.0, 1.0)
+
+    # ... and against each member, plus skill Jaccard per candidate x member pair
+    pair_trait, jaccard = pairwise_components(index, np.arange(len(index)), team_rows)
+
+    pairwise = np.clip(pair_trait * 0.50 + jaccard * 0.40, 0.0, 1.0)
+    avg_pairwise = pairwise.mean(axis=1)
+
+    # Share of each candidate's skills that nobody on the team has yet
+    skills = index.matrix
+    team_skills = skills[team_rows]
+    sizes = np.asarray(skills.sum(axis=1), dtype=np.float64).ravel()
+    team_vocab = (np.asarray(team_skills.sum(axis=0)).ravel() > 0).astype(np.float32)
+    covered = skills @ team_vocab
+    uniqueness = (sizes - covered) / np.maximum(sizes, 1.0)
+
+    overall = np.clip(trait_comp * 0.45 + avg_pairwise * 0.35 + uniqueness * 0.20, 0.0, 1.0)
+    return {
+        "overall": overall,
+        "trait_complementarity": trait_comp,
+        "avg_pairwise": avg_pairwise,
+        "uniqueness": uniqueness,
+    }
+
+
+def select_team_addition(index, team_rows: np.ndarray, pool_rows: np.ndarray,
+                         size: int, beam_width: int) -> tuple:
+    """
+    Beam search for the best `size`-person addition. Each step re-scores the
+    pool against the team plus the members picked so far; a set's value is
+    the sum of its members' marginal overall scores. beam_width=1 is greedy.
+    Returns (rows, marginal_scores, total).
+    """
+    beams = [((), (), 0.0)]
+    for _ in range(size):
+        expanded = {}
+        for members, marginals, total in beams:
+            scores = score_pool_against_team(index, np.concatenate([team_rows, np.array(members, dtype=np.int64)]))["overall"]
+            allowed = pool_rows[~np.isin(pool_rows, members)]
+            for row in index.top_k(scores, beam_width, allowed):
+                key = frozenset(members + (int(row),))
+                value = total + float(scores[row])
+                if key not in expanded or expanded[key][2] < value:
+                    expanded[key] = (members + (int(row),), marginals + (float(scores[row]),), value)
+        if not expanded:
+            break
+        beams = sorted(expanded.values(), key=lambda b: -b[2])[:beam_width]
+    return beams[0]
+
+
+def summarise_shortlist(team: List[dict], shortlist: List[dict]) -> str:
+    prompt = f"""
+You are an expert talent analyst specialising in team dynamics.
+
+**Existing Team:**
+{json.dumps(team, indent=2)}
+
+**Shortlisted Candidates (ranked by computed team-fit score):**
+{json.dumps(shortlist, indent=2)}
+
+In 1-2 short paragraphs, explain what each shortlisted candidate adds to this team
+and which one you would hire first. Plain text only.
+"""
+    return llm_gateway.invoke(prompt, **LLM_PARAMS).strip()
 
 
 # ========================= ENDPOINT =========================
@@ -204,6 +333,7 @@ def fetch_shared_skills_neo4j(candidate_id: int, member_id: int) -> int:
 async def team_fit_analysis(request: TeamFitRequest):
 
     # ── Validation ──────────────────────────────────────────────────────────
+    validate_narrative_mode(request.narrative)
     if not request.team_member_ids:
         raise HTTPException(
             status_code=400,
@@ -215,19 +345,20 @@ async def team_fit_analysis(request: TeamFitRequest):
             detail="candidate_id cannot also appear in team_member_ids"
         )
 
-    # ── Fetch candidate ──────────────────────────────────────────────────────
-    candidate = fetch_candidate_data(request.candidate_id)
-    if not candidate:
+    # ── Fetch candidate + team members in one round trip ────────────────────
+    found = await candidate_repository.get_many([request.candidate_id] + request.team_member_ids)
+    if request.candidate_id not in found:
         raise HTTPException(
             status_code=404,
             detail=f"Candidate {request.candidate_id} not found"
         )
+    candidate = to_team_profile(found[request.candidate_id])
 
-    # ── Fetch team members (silently skip unresolvable IDs) ─────────────────
+    # ── Team members (silently skip unresolvable IDs) ────────────────────────
     team_members = []
     for mid in request.team_member_ids:
-        member = fetch_candidate_data(mid)
-        if member:
+        if mid in found:
+            member = to_team_profile(found[mid])
             member["id"] = mid
             team_members.append(member)
         else:
@@ -257,12 +388,27 @@ async def team_fit_analysis(request: TeamFitRequest):
     uniqueness_ratio = len(unique_skills) / max(len(candidate["skills"]), 1)
 
     # ── Pairwise member scores ────────────────────────────────────────────────
+    shared_counts = await run_in_threadpool(
+        fetch_shared_skills_batch, request.candidate_id, [m["id"] for m in team_members]
+    )
+    try:
+        vectors = await candidate_embeddings.get_many(
+            [found[request.candidate_id]] + [found[m["id"]] for m in team_members], normalize=True
+        )
+    except Exception as e:
+        logging.warning(f"Candidate embeddings unavailable for team-fit: {e}")
+        vectors = {}
+    candidate_vec = vectors.get(request.candidate_id)
+
     member_scores = []
     for member in team_members:
         t_comp       = compute_trait_complementarity(candidate["traits"], [member["traits"]])
         s_prox       = compute_skill_proximity(candidate["skills"], member["skills"])
-        shared_count = fetch_shared_skills_neo4j(request.candidate_id, member["id"])
+        shared_count = shared_counts[member["id"]]
         graph_bonus  = min(0.10, shared_count * 0.02)  # capped at 0.10
+        member_vec   = vectors.get(member["id"])
+        semantic     = (round(float(np.dot(candidate_vec, member_vec)), 3)
+                        if candidate_vec is not None and member_vec is not None else None)
 
         pairwise = float(np.clip(
             t_comp * 0.50 + s_prox * 0.40 + graph_bonus,
@@ -275,6 +421,7 @@ async def team_fit_analysis(request: TeamFitRequest):
             trait_complementarity_score=round(t_comp, 3),
             skill_proximity_score=round(s_prox, 3),
             graph_shared_skills=shared_count,
+            semantic_similarity=semantic,
             overall_pairwise_fit=round(pairwise, 3),
         ))
 
@@ -337,40 +484,21 @@ Return ONLY valid JSON — no markdown fences, no text outside the JSON object:
 """
 
     # Sensible defaults — endpoint always returns computed scores even if LLM fails
-    llm_analysis               = "LLM analysis is currently unavailable."
-    counterfactual_suggestions = []
-    summary = (
+    default_summary = (
         f"{candidate['name']} has an overall team fit score of "
         f"{overall_score:.0%} based on trait complementarity and skill proximity."
     )
-
-    try:
-        llm  = get_llm()
-        resp = llm.invoke(prompt)
-        text = resp.content
-
-        if not text or not text.strip():
-            raise ValueError("LLM returned an empty response")
-
-        text = text.strip()
-        logging.info(f"Team fit LLM raw response (first 300 chars): {text[:300]}")
-
-        # Robust fence stripping
-        if "```json" in text:
-            text = text.split("```json", 1)[1]
-        if "```" in text:
-            text = text.rsplit("```", 1)[0]
-        text = text.strip()
-
-        parsed                     = json.loads(text)
-        llm_analysis               = parsed.get("llm_analysis",              llm_analysis)
-        counterfactual_suggestions = parsed.get("counterfactual_suggestions", counterfactual_suggestions)
-        summary                    = parsed.get("summary",                    summary)
-
-    except json.JSONDecodeError as e:
-        logging.error(f"Team fit LLM JSON parse error: {e}\nRaw snippet: {text[:500]}")
-    except Exception as e:
-        logging.error(f"Team fit LLM call failed: {e}")
+    narrative = {
+        "llm_analysis": "LLM analysis was not requested.",
+        "counterfactual_suggestions": [],
+        "summary": default_summary,
+    }
+    narrative_job_id = None
+    if request.narrative == "sync":
+        narrative = await run_in_threadpool(generate_team_fit_narrative, prompt, default_summary)
+    elif request.narrative == "deferred":
+        narrative_job_id = narrative_jobs.submit("team-fit", generate_team_fit_narrative, prompt, default_summary)
+        narrative["llm_analysis"] = "LLM analysis is being generated."
 
     # ── Response ──────────────────────────────────────────────────────────────
     return TeamFitResponse(
@@ -383,7 +511,142 @@ Return ONLY valid JSON — no markdown fences, no text outside the JSON object:
         skill_overlap=skill_overlap,
         unique_skills_brought=unique_skills,
         member_scores=member_scores,
-        counterfactual_suggestions=counterfactual_suggestions,
-        llm_analysis=llm_analysis,
-        summary=summary,
-    )
\ No newline at end of file
+        counterfactual_suggestions=narrative["counterfactual_suggestions"],
+        llm_analysis=narrative["llm_analysis"],
+        summary=narrative["summary"],
+        narrative_job_id=narrative_job_id,
+    )
+
+
+@router.post("/team-fit/best-candidates")
+async def best_candidates_for_team(request: BestCandidatesRequest):
+    if not request.team_member_ids:
+        raise HTTPException(status_code=400, detail="team_member_ids must contain at least one member")
+    if request.strategy not in ("greedy", "beam"):
+        raise HTTPException(status_code=400, detail="strategy must be 'greedy' or 'beam'")
+    if request.top_k < 1 or request.select < 0 or request.beam_width < 1:
+        raise HTTPException(status_code=400, detail="top_k and beam_width must be >= 1, select must be >= 0")
+    if request.select > BEST_CANDIDATES_MAX_SELECT or request.beam_width > BEST_CANDIDATES_MAX_BEAM_WIDTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"select must be <= {BEST_CANDIDATES_MAX_SELECT} and beam_width <= {BEST_CANDIDATES_MAX_BEAM_WIDTH}"
+        )
+
+    index = await run_in_threadpool(candidate_skill_index.snapshot)
+    team_rows = index.rows_for(request.team_member_ids)
+    if len(team_rows) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail="None of the provided team_member_ids resolved to valid candidates"
+        )
+
+    pool_rows = np.setdiff1d(np.arange(len(index)), team_rows)
+    scores = score_pool_against_team(index, team_rows)
+
+    def describe(row: int) -> dict:
+        return {
+            "candidate_id": int(index.candidate_ids[row]),
+            "candidate_name": index.names[row],
+            "overall_team_fit_score": round(float(scores["overall"][row]), 3),
+            "trait_complementarity_score": round(float(scores["trait_complementarity"][row]), 3),
+            "avg_pairwise_fit": round(float(scores["avg_pairwise"][row]), 3),
+            "uniqueness_ratio": round(float(scores["uniqueness"][row]), 3),
+        }
+
+    ranked = [describe(row) for row in index.top_k(scores["overall"], request.top_k, pool_rows)]
+
+    selection = None
+    if request.select:
+        beam_width = 1 if request.strategy == "greedy" else request.beam_width
+        rows, marginals, total = await run_in_threadpool(
+            select_team_addition, index, team_rows, pool_rows, request.select, beam_width
+        )
+        selection = {
+            "strategy": request.strategy,
+            "size": len(rows),
+            "total_score": round(total, 3),
+            "members": [
+                {
+                    "candidate_id": int(index.candidate_ids[row]),
+                    "candidate_name": index.names[row],
+                    "marginal_fit_score": round(marginal, 3),
+                }
+                for row, marginal in zip(rows, marginals)
+            ],
+        }
+
+    # LLM only sees the final shortlist, never the pool
+    llm_analysis = None
+    if request.include_analysis:
+        team = [
+            {"name": index.names[row], "traits": index.candidate_traits(row),
+             "skills": sorted(index.candidate_skills(row))[:12]}
+            for row in team_rows
+        ]
+        shortlist = selection["members"] if selection else ranked
+        try:
+            llm_analysis = await run_in_threadpool(summarise_shortlist, team, shortlist)
+        except Exception as e:
+            logging.error(f"Best-candidates LLM call failed: {e}")
+            llm_analysis = "LLM analysis is currently unavailable."
+
+    return {
+        "team_member_ids": [int(index.candidate_ids[row]) for row in team_rows],
+        "team_size": int(len(team_rows)),
+        "pool_size": int(len(pool_rows)),
+        "candidates": ranked,
+        "selection": selection,
+        "llm_analysis": llm_analysis,
+    }
+
+
+@router.post("/team-fit/compatibility-matrix")
+async def team_compatibility_matrix(request: CompatibilityMatrixRequest):
+    """
+    N x N compatibility across a team or department. Row i, column j holds how
+    well member i fits alongside member j: trait_complementarity is
+    directional (i filling j's trait gaps), skill_jaccard is symmetric and
+    pairwise_fit combines them as in /team-fit. Diagonals are self-comparisons
+    and are ignored in the per-member averages.
+    """
+    if len(request.team_member_ids) < 2:
+        raise HTTPException(status_code=400, detail="team_member_ids must contain at least two members")
+
+    index = await run_in_threadpool(candidate_skill_index.snapshot)
+    rows = index.rows_for(list(dict.fromkeys(request.team_member_ids)))
+    if len(rows) < 2:
+        raise HTTPException(status_code=404, detail="Fewer than two team_member_ids resolved to valid candidates")
+
+    trait_comp, jaccard = pairwise_components(index, rows, rows)
+    pairwise = np.clip(trait_comp * 0.50 + jaccard * 0.40, 0.0, 1.0)
+
+    n = len(rows)
+    off_diagonal = ~np.eye(n, dtype=bool)
+    avg_fit = (pairwise * off_diagonal).sum(axis=1) / (n - 1)
+    # Symmetric view for the best / worst pairing
+    mutual = (pairwise + pairwise.T) / 2
+    upper = np.triu_indices(n, k=1)
+    best, worst = np.argmax(mutual[upper]), np.argmin(mutual[upper])
+
+    def pair(k: int) -> dict:
+        i, j = upper[0][k], upper[1][k]
+        return {
+            "member_ids": [int(index.candidate_ids[rows[i]]), int(index.candidate_ids[rows[j]])],
+            "mutual_fit": round(float(mutual[i, j]), 3),
+        }
+
+    return {
+        "members": [
+            {
+                "candidate_id": int(index.candidate_ids[row]),
+                "candidate_name": index.names[row],
+                "avg_pairwise_fit": round(float(avg_fit[i]), 3),
+            }
+            for i, row in enumerate(rows)
+        ],
+        "trait_complementarity": np.round(trait_comp, 3).tolist(),
+        "skill_jaccard": np.round(jaccard, 3).tolist(),
+        "pairwise_fit": np.round(pairwise, 3).tolist(),
+        "most_compatible_pair": pair(best),
+        "least_compatible_pair": pair(worst),
+    }
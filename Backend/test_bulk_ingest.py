@@ -0,0 +1,62 @@
+import queue
+import threading
+
+import bulk_ingest
+from bulk_ingest import StageStats, _DONE, _QueueReader, _run_stage, collect_resume_paths
+
+
+def test_queue_reader_stops_at_end_marker():
+    q = queue.Queue()
+    for item in (1, 2, _DONE, 3):
+        q.put(item)
+    reader = _QueueReader(q)
+    assert list(reader) == [1, 2]
+    assert reader.exhausted
+    assert q.get_nowait() == 3
+
+
+def test_crashed_stage_drains_input_and_signals_downstream():
+    in_q, out_q = queue.Queue(maxsize=2), queue.Queue()
+    reader = _QueueReader(in_q)
+
+    def crashing_stage(reader, out_q):
+        next(iter(reader))
+        raise RuntimeError("stage crashed")
+
+    stage = threading.Thread(target=_run_stage, args=("test", crashing_stage, reader, out_q))
+    stage.start()
+    # Upstream would block forever on the bounded queue if the crashed stage stopped reading
+    for item in range(10):
+        in_q.put(item, timeout=5)
+    in_q.put(_DONE, timeout=5)
+    stage.join(timeout=5)
+
+    assert not stage.is_alive()
+    assert reader.exhausted
+    assert out_q.get_nowait() is _DONE
+
+
+def test_stage_stats(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bulk_ingest.time, "perf_counter", lambda: now[0])
+    stats = StageStats("embed")
+    assert stats.as_dict()["items_per_second"] is None
+
+    stats.start()
+    stats.done(items=8)
+    stats.done(items=0, errors=1)
+    now[0] += 4.0
+    stats.finish()
+    assert stats.as_dict() == {
+        "stage": "embed", "items": 8, "errors": 1, "elapsed_seconds": 4.0, "items_per_second": 2.0
+    }
+
+
+def test_collect_resume_paths(tmp_path):
+    (tmp_path / "nested").mkdir()
+    for name in ("b.pdf", "a.DOCX", "notes.md", "nested/c.txt"):
+        (tmp_path / name).write_text("resume")
+
+    paths = collect_resume_paths(str(tmp_path))
+    assert [p[len(str(tmp_path)) + 1:] for p in paths] == ["a.DOCX", "b.pdf", "nested/c.txt"]
+    assert len(collect_resume_paths(str(tmp_path), limit=2)) == 2
@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from candidate_embeddings import CandidateEmbeddingStore
+
+
+def vector(*values):
+    return np.array(values, dtype="float32")
+
+
+def profile(candidate_id):
+    return {"candidate_id": candidate_id, "structured_json": {"name": f"Candidate {candidate_id}"}}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A store whose Postgres rows are {2: ...} and whose backfill embeds [id, 0]."""
+    store = CandidateEmbeddingStore(max_entries=3)
+    store.loaded, store.embedded = [], []
+    stored_rows = {2: vector(0.0, 2.0)}
+
+    async def load(candidate_ids):
+        store.loaded.append(list(candidate_ids))
+        return {cid: stored_rows[cid] for cid in candidate_ids if cid in stored_rows}
+
+    async def backfill(profiles):
+        store.embedded.append([p["candidate_id"] for p in profiles])
+        return {p["candidate_id"]: vector(float(p["candidate_id"]), 0.0) for p in profiles}
+
+    monkeypatch.setattr(store, "_load", load)
+    monkeypatch.setattr(store, "_backfill", backfill)
+    return store
+
+
+def test_memory_then_database_then_backfill(store):
+    store._store({1: vector(3.0, 4.0)})
+    vectors = asyncio.run(store.get_many([profile(1), profile(2), profile(3), profile(3)]))
+
+    assert store.loaded == [[2, 3]]
+    assert store.embedded == [[3]]
+    assert {cid: list(vec) for cid, vec in vectors.items()} == {1: [3.0, 4.0], 2: [0.0, 2.0], 3: [3.0, 0.0]}
+    stats = store.stats()
+    assert (stats["memory_hits"], stats["db_hits"], stats["cached"]) == (1, 1, 3)
+
+    # Everything is in memory now: no further Postgres reads or inference
+    asyncio.run(store.get_many([profile(1), profile(2), profile(3)]))
+    assert store.loaded == [[2, 3]] and store.embedded == [[3]]
+
+
+def test_normalised_vectors_do_not_change_the_cache(store):
+    store._store({1: vector(3.0, 4.0)})
+    vectors = asyncio.run(store.get_many([profile(1)], normalize=True))
+    assert np.allclose(vectors[1], [0.6, 0.8])
+    assert np.allclose(store._cached([1])[1], [3.0, 4.0])
+
+
+def test_least_recently_used_vector_is_evicted(store):
+    store._store({1: vector(1.0), 2: vector(2.0), 3: vector(3.0)})
+    store._cached([1])
+    store._store({4: vector(4.0)})
+    assert sorted(store._cached([1, 2, 3, 4])) == [1, 3, 4]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import candidate_repository as repository_module
+from candidate_repository import CandidateRepository, _profile_from_row
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(repository_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def repository(clock):
+    return CandidateRepository(max_entries=2, ttl_seconds=60)
+
+
+def row(candidate_id, skills=("Python", "SQL")):
+    structured = {"name": f"Candidate {candidate_id}", "skills": list(skills)}
+    return (candidate_id, structured, True, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4)
+
+
+def test_profile_from_row():
+    profile = _profile_from_row((5, {"skills": ["Languages: Python, Go"]}, False, 0, 0, 0, 0, 0, 0))
+    assert profile["name"] == "Candidate 5"
+    assert profile["skills"] == {"python", "go"}
+    assert profile["has_traits"] is False
+    assert profile["traits"]["leadership"] == 0.0
+
+
+def test_entries_expire_after_ttl(repository, clock):
+    repository._store(_profile_from_row(row(1)))
+    clock.advance(60)
+    assert repository._cached(1)["candidate_id"] == 1
+
+    clock.advance(1)
+    assert repository._cached(1) is None
+    assert repository.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(repository):
+    repository._store(_profile_from_row(row(1)))
+    repository._store(_profile_from_row(row(2)))
+    assert repository._cached(1) is not None   # 2 is now the least recently used
+
+    repository._store(_profile_from_row(row(3)))
+    assert repository._cached(2) is None
+    assert repository._cached(1) is not None
+    assert repository._cached(3) is not None
+
+
+def test_returned_profiles_are_copies(repository):
+    repository._store(_profile_from_row(row(1)))
+    profile = asyncio.run(repository.get(1))
+    profile["skills"].add("cobol")
+    profile["traits"]["leadership"] = 0.0
+    profile["structured_json"]["skills"].append("COBOL")
+
+    cached = asyncio.run(repository.get_many([1]))[1]
+    assert cached["skills"] == {"python", "sql"}
+    assert cached["traits"]["leadership"] == pytest.approx(0.9)
+    assert cached["structured_json"]["skills"] == ["Python", "SQL"]
+
+
+def test_invalidate_and_stats(repository):
+    repository._store(_profile_from_row(row(1)))
+    repository._store(_profile_from_row(row(2)))
+    repository.invalidate(1)
+    assert repository._cached(1) is None
+    assert repository._cached(2) is not None
+
+    repository.invalidate()
+    assert repository._cached(2) is None
+    stats = repository.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 0)
+    assert stats["hit_rate"] == pytest.approx(0.333)
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from dedup import (
+    SIMHASH_BANDS, SIMHASH_BITS, SIMHASH_MAX_DISTANCE,
+    _bands, _to_signed, _to_unsigned, compute_fingerprint, content_hash, hamming_distance, simhash
+)
+
+ROLES = ["backend engineer", "data analyst", "product manager", "site reliability engineer", "qa engineer"]
+RESUME = " ".join(
+    f"{2010 + i}: {ROLES[i % 5]} at company{i}, worked on project{i * 7} with team of {i + 3} "
+    f"using tool{i * 3} and tool{i * 5}."
+    for i in range(40)
+)
+UNRELATED = " ".join(
+    f"Registered nurse for {i} years: ICU triage, electronic health records and ward rota at hospital{i}."
+    for i in range(30)
+)
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    assert content_hash("  Jane  DOE\n\tPython ") == content_hash("jane doe python")
+    assert content_hash("jane doe python") != content_hash("jane doe java")
+
+
+@pytest.mark.parametrize("old, new", [
+    ("company7,", "company70,"),
+    ("project21", "project210"),
+    ("team of 10", "team of eleven"),
+])
+def test_small_edit_is_a_near_duplicate(old, new):
+    edited = RESUME.replace(old, new, 1)
+    original, changed = compute_fingerprint(RESUME), compute_fingerprint(edited)
+    assert original["content_hash"] != changed["content_hash"]
+    assert hamming_distance(original["simhash"], changed["simhash"]) <= SIMHASH_MAX_DISTANCE
+
+
+def test_unrelated_text_is_not_a_near_duplicate():
+    assert hamming_distance(simhash(RESUME), simhash(UNRELATED)) > SIMHASH_MAX_DISTANCE
+
+
+def test_short_and_empty_text():
+    assert simhash("") == 0
+    assert simhash("python sql") == simhash("PYTHON   sql")
+
+
+def test_near_duplicates_always_share_a_band():
+    rng = random.Random(7)
+    for _ in range(500):
+        value = rng.getrandbits(SIMHASH_BITS)
+        flipped = value
+        for bit in rng.sample(range(SIMHASH_BITS), SIMHASH_MAX_DISTANCE):
+            flipped ^= 1 << bit
+        assert hamming_distance(value, flipped) == SIMHASH_MAX_DISTANCE
+        assert any(a == b for a, b in zip(_bands(value), _bands(flipped)))
+
+
+def test_bands_reassemble_the_hash():
+    value = simhash(RESUME)
+    bands = _bands(value)
+    assert len(bands) == SIMHASH_BANDS
+    assert sum(band << (i * (SIMHASH_BITS // SIMHASH_BANDS)) for i, band in enumerate(bands)) == value
+
+
+@pytest.mark.parametrize("value", [0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1])
+def test_signed_storage_round_trip(value):
+    stored = _to_signed(value)
+    assert -(1 << 63) <= stored < (1 << 63)
+    assert _to_unsigned(stored) == value
@@ -0,0 +1,94 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from embedding_service import EmbeddingService
+
+DIM = 4
+
+
+class CountingModel:
+    """Encodes each text as [len(text), 0, ...] and records every batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, batch_size=None):
+        self.batches.append(list(texts))
+        vectors = np.zeros((len(texts), DIM), dtype="float32")
+        vectors[:, 0] = [len(text) for text in texts]
+        return vectors
+
+
+@pytest.fixture
+def model():
+    return CountingModel()
+
+
+@pytest.fixture
+def service(model):
+    service = EmbeddingService(model_name="test-model", max_batch_size=64, max_wait_ms=50)
+    service._model = model
+    return service
+
+
+def run_concurrently(service, requests):
+    async def run():
+        try:
+            return await asyncio.gather(*(service.embed(texts) for texts in requests))
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_model_call(service, model):
+    requests = [["a"], ["bb", "ccc"], ["dddd"]]
+    results = run_concurrently(service, requests)
+
+    assert model.batches == [["a", "bb", "ccc", "dddd"]]
+    # Each caller gets back exactly its own rows, in order
+    for texts, vectors in zip(requests, results):
+        assert vectors.shape == (len(texts), DIM)
+        assert list(vectors[:, 0]) == [len(text) for text in texts]
+    assert service.stats()["batch_size"]["count"] == 1
+
+
+def test_batches_are_capped_at_max_batch_size(service, model):
+    service.max_batch_size = 2
+    results = run_concurrently(service, [["a"], ["b"], ["c"], ["d"], ["e"]])
+
+    assert [len(batch) for batch in model.batches] == [2, 2, 1]
+    assert [list(vectors[:, 0]) for vectors in results] == [[1.0]] * 5
+
+
+def test_encode_failure_reaches_every_caller_in_the_batch(service, model):
+    def fail(texts, batch_size=None):
+        raise RuntimeError("model crashed")
+    model.encode = fail
+
+    async def run():
+        try:
+            return await asyncio.gather(service.embed(["a"]), service.embed(["b"]), return_exceptions=True)
+        finally:
+            await service.close()
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["model crashed", "model crashed"]
+
+
+def test_empty_and_normalised_requests(service):
+    assert service.encode([]).shape == (0, DIM)
+
+    async def run():
+        try:
+            return await service.embed([]), await service.embed(["abc"], normalize=True)
+        finally:
+            await service.close()
+
+    empty, normalised = asyncio.run(run())
+    assert empty.shape == (0, DIM)
+    assert np.allclose(np.linalg.norm(normalised, axis=1), 1.0)
@@ -0,0 +1,186 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import faiss_index_factory
+from faiss_store import FaissIndexStore, IndexLockedError
+
+DIM = 8
+
+
+@pytest.fixture(autouse=True)
+def flat_index(monkeypatch):
+    # Keep the store on an exact Flat index so nothing is promoted mid-test
+    monkeypatch.setattr(faiss_index_factory, "FAISS_INDEX_TYPE", "flat")
+
+
+@pytest.fixture
+def store_paths(tmp_path):
+    return {
+        "index_path": str(tmp_path / "candidate_index.faiss"),
+        "candidate_ids_path": str(tmp_path / "candidate_ids.json"),
+        "snippet_metadata_path": str(tmp_path / "snippet_metadata.json"),
+        "wal_path": str(tmp_path / "candidate_index.wal"),
+        "vectors_path": str(tmp_path / "candidate_vectors.f32"),
+    }
+
+
+def random_vectors(n, seed):
+    return np.random.default_rng(seed).random((n, DIM), dtype=np.float32)
+
+
+def entries(ids):
+    return [(cid, {"candidate_id": str(cid), "name": f"Candidate {cid}", "text": ""}) for cid in ids]
+
+
+def crash(store):
+    """Drop the store without checkpointing, as if the process died."""
+    store._wal.close()
+    store._wal = None
+    store._release_process_lock()
+
+
+def test_replay_after_torn_last_record(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    vectors = random_vectors(3, seed=1)
+    assert store.add(vectors, entries([101, 102, 103])) == [0, 1, 2]
+    crash(store)
+
+    # The process died halfway through writing the next record
+    with open(store.wal_path, "a", encoding="utf-8") as f:
+        f.write('{"faiss_index": 3, "candidate_id": 104, "metad')
+
+    recovered = FaissIndexStore(dim=DIM, **store_paths)
+    recovered.load()
+    assert recovered.ntotal == 3
+    assert recovered.candidate_ids == [101, 102, 103]
+    assert recovered.snippet_metadata["2"]["name"] == "Candidate 103"
+    assert np.allclose(recovered.exact_vectors(), vectors)
+
+    # Replay checkpoints, so the torn line is gone and positions continue from 3
+    assert recovered.add(random_vectors(1, seed=2), entries([104])) == [3]
+    recovered.close()
+
+
+def test_checkpoint_truncates_wal(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    vectors = random_vectors(2, seed=3)
+    store.add(vectors, entries([201, 202]))
+    assert os.path.getsize(store.wal_path) > 0
+
+    store.checkpoint()
+    assert os.path.getsize(store.wal_path) == 0
+    with open(store.candidate_ids_path, "r", encoding="utf-8") as f:
+        assert json.load(f) == [201, 202]
+    crash(store)
+
+    reloaded = FaissIndexStore(dim=DIM, **store_paths)
+    reloaded.load()
+    assert reloaded.ntotal == 2
+    assert reloaded.candidate_ids == [201, 202]
+    assert np.allclose(reloaded.exact_vectors(), vectors)
+    reloaded.close()
+
+
+def test_sidecar_truncated_to_checkpoint(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    checkpointed = random_vectors(2, seed=4)
+    store.add(checkpointed, entries([301, 302]))
+    store.checkpoint()
+
+    logged = random_vectors(3, seed=5)
+    store.add(logged, entries([303, 304, 305]))
+    crash(store)
+
+    # A checkpoint that crashed after appending to the sidecar but before writing the index
+    with open(store.vectors_path, "ab") as f:
+        f.write(random_vectors(3, seed=6).tobytes())
+
+    recovered = FaissIndexStore(dim=DIM, **store_paths)
+    recovered.load()
+    # Sidecar cut back to the 2 checkpointed rows, then the 3 WAL vectors replayed after them
+    assert recovered.ntotal == 5
+    assert recovered.candidate_ids == [301, 302, 303, 304, 305]
+    assert os.path.getsize(recovered.vectors_path) == 5 * DIM * 4
+    assert np.allclose(recovered.exact_vectors(), np.vstack([checkpointed, logged]))
+    recovered.close()
+
+    # Without a WAL the sidecar is truncated to exactly the checkpointed count
+    with open(recovered.vectors_path, "ab") as f:
+        f.write(random_vectors(4, seed=7).tobytes())
+    reloaded = FaissIndexStore(dim=DIM, **store_paths)
+    reloaded.load()
+    assert os.path.getsize(reloaded.vectors_path) == 5 * DIM * 4
+    assert np.allclose(reloaded.exact_vectors(), np.vstack([checkpointed, logged]))
+    reloaded.close()
+
+
+def test_second_process_cannot_open_locked_index(store_paths):
+    owner = FaissIndexStore(dim=DIM, **store_paths)
+    owner.load()
+
+    intruder = FaissIndexStore(dim=DIM, **store_paths)
+    with pytest.raises(IndexLockedError):
+        intruder.load()
+
+    owner.close()
+    intruder.load()
+    intruder.close()
+
+
+
+def test_rebuild_swaps_index_and_survives_reload(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    vectors = random_vectors(20, seed=8)
+    store.add(vectors, entries(range(400, 420)))
+    generation = store.generation
+
+    info = store.rebuild("hnsw")
+    assert info["type"] == "hnsw" and info["ntotal"] == 20
+    assert store.generation == generation + 1
+    # Exact vectors are untouched, so an exact query still finds itself first
+    _, positions = store.search(vectors[5:6], 1)
+    assert positions[0][0] == 5
+    # The manual choice is not promoted back to the configured Flat type
+    store.add(random_vectors(1, seed=9), entries([420]))
+    assert store.info()["type"] == "hnsw" and not store.info()["rebuilding"]
+    store.close()
+
+    reloaded = FaissIndexStore(dim=DIM, **store_paths)
+    reloaded.load()
+    assert reloaded.ntotal == 21
+    assert reloaded.candidate_ids == list(range(400, 421))
+    assert np.allclose(reloaded.exact_vectors()[:20], vectors)
+    reloaded.close()
+
+
+def test_nearest_candidates_returns_one_hit_per_candidate(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    query = np.zeros((1, DIM), dtype=np.float32)
+    # Candidate 501 has three vectors closest to the query; 502 and 503 one each
+    offsets = np.array([0.1, 0.2, 0.3, 0.4, 0.5], dtype=np.float32)[:, None]
+    store.add(query + offsets, entries([501, 501, 501, 502, 503]))
+
+    nearest = store.nearest_candidates(query[0], 2)
+    assert [cid for cid, _ in nearest] == [501, 502]
+    assert nearest[0][1] == pytest.approx(DIM * 0.01, rel=1e-5)
+    assert [cid for cid, _ in store.nearest_candidates(query[0], 10)] == [501, 502, 503]
+    assert store.nearest_candidates(query[0], 0) == []
+    store.close()
+
+
+def test_positions_of_reports_already_indexed_ids(store_paths):
+    store = FaissIndexStore(dim=DIM, **store_paths)
+    store.load()
+    store.add(random_vectors(4, seed=10), entries([601, 602, 601, 603]))
+    # Reconciliation maps these instead of adding them a second time
+    assert store.positions_of([601, 603, 699]) == {601: 0, 603: 3}
+    assert store.positions_of([]) == {}
+    store.close()
@@ -0,0 +1,118 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pytest
+
+import job_embeddings as job_embeddings_module
+from job_embeddings import JOB_EMBEDDING_VERSION, JobEmbeddingStore, job_text, to_bytes
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def executemany(self, query, params):
+        for blob, version, job_id in params:
+            self.db.jobs[job_id] = self.db.jobs[job_id][:3] + (blob, version)
+        self.db.updates += len(params)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+
+class FakeJobsTable:
+    """The jobs table as {job_id: (title, description, skills, embedding, embedding_version)}."""
+
+    def __init__(self, jobs):
+        self.jobs = dict(jobs)
+        self.selects = 0
+        self.updates = 0
+
+    async def fetchall(self, query, params=None):
+        self.selects += 1
+        ids = params[0] if params else list(self.jobs)
+        return [(jid,) + self.jobs[jid] for jid in ids if jid in self.jobs]
+
+    @asynccontextmanager
+    async def connection(self):
+        yield FakeConnection(self)
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.texts = []
+
+    async def embed(self, texts, normalize=False):
+        self.texts.extend(texts)
+        return np.ones((len(texts), 2), dtype="float32") / np.sqrt(2)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeJobsTable({
+        1: ("Backend", "APIs", ["Python"], to_bytes(np.array([1.0, 0.0])), JOB_EMBEDDING_VERSION),
+        2: ("Frontend", "UI", ["React"], to_bytes(np.array([0.0, 1.0])), "old-model|job_v0"),
+        3: ("Data", None, ["SQL"], None, None),
+    })
+    monkeypatch.setattr(job_embeddings_module, "async_db", table)
+    return table
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    embedder = FakeEmbeddingService()
+    monkeypatch.setattr(job_embeddings_module, "embedding_service", embedder)
+    return embedder
+
+
+def test_job_text():
+    assert job_text("Backend", None, ["Python", "SQL"]) == "Backend  Python SQL"
+    assert job_text(None, "APIs", "not a list") == " APIs "
+
+
+def test_stale_and_missing_vectors_are_embedded_once(table, embedder):
+    store = JobEmbeddingStore()
+    vectors = asyncio.run(store.get_many([1, 2, 3, 99]))
+
+    assert sorted(vectors) == [1, 2, 3]
+    assert np.allclose(vectors[1], [1.0, 0.0])
+    assert embedder.texts == [job_text("Frontend", "UI", ["React"]), job_text("Data", None, ["SQL"])]
+    assert table.updates == 2 and table.jobs[3][4] == JOB_EMBEDDING_VERSION
+
+    # Served from memory now
+    asyncio.run(store.get_many([1, 2, 3]))
+    assert table.selects == 1 and len(embedder.texts) == 2
+
+
+def test_full_load_is_served_from_memory_until_invalidated(table, embedder):
+    store = JobEmbeddingStore()
+    assert sorted(asyncio.run(store.get_many())) == [1, 2, 3]
+    assert sorted(asyncio.run(store.get_many())) == [1, 2, 3]
+    assert table.selects == 1 and store.stats()["fully_loaded"]
+
+    store.invalidate()
+    asyncio.run(store.get_many())
+    assert table.selects == 2
+
+
+def test_put_is_visible_without_a_read(table, embedder):
+    store = JobEmbeddingStore()
+    store.put(7, np.array([0.6, 0.8], dtype="float32"))
+    assert np.allclose(asyncio.run(store.get(7)), [0.6, 0.8])
+    assert table.selects == 0
+
+    store.invalidate(7)
+    assert asyncio.run(store.get(7)) is None
+    assert table.selects == 1
@@ -0,0 +1,106 @@
+import pytest
+
+from llm_gateway import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, open_seconds=30, clock=clock)
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    assert breaker.state == "closed" and breaker.allow()
+
+    # A success resets the count
+    breaker.record_success()
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    assert breaker.state == "closed"
+
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.snapshot()["times_opened"] == 1
+
+
+def test_half_open_after_open_seconds_allows_one_trial(breaker, clock):
+    breaker.trip("unreachable")
+    clock.advance(29)
+    assert not breaker.allow()
+
+    clock.advance(1)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only the one trial goes through while it is in flight
+    assert not breaker.allow()
+
+
+def test_trial_success_closes(breaker, clock):
+    breaker.trip("unreachable")
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_trial_failure_reopens_for_another_open_period(breaker, clock):
+    breaker.trip("unreachable")
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+
+
+def test_probe_success_half_opens_but_does_not_close(breaker):
+    breaker.trip("timeout")
+    breaker.probe_succeeded()
+    assert breaker.state == "half_open"
+
+    # The next real call is the trial; a failure sends it straight back to open
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+
+
+def test_probe_success_leaves_closed_circuit_alone(breaker):
+    breaker.record_failure("timeout")
+    breaker.probe_succeeded()
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["consecutive_failures"] == 1
+
+
+def test_abandoned_trial_is_replaced_after_open_seconds(breaker, clock):
+    breaker.trip("unreachable")
+    clock.advance(30)
+    assert breaker.allow()
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+
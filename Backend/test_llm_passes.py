@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_ingest
+import upload_resume
+
+STRUCTURED = {"name": "Ada", "skills": ["Python"]}
+TRAITS = {"leadership": 0.7}
+
+
+@pytest.fixture
+def passes(monkeypatch):
+    """
+    Pass 1 and pass 2 both wait on a two-party barrier, so they only return
+    when they run at the same time; run one after the other, the first times out.
+    """
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def extract_structured_json(cleaned_text):
+        calls.append("pass1")
+        barrier.wait()
+        return dict(STRUCTURED)
+
+    def infer_traits(cleaned_text):
+        calls.append("pass2")
+        barrier.wait()
+        return dict(TRAITS)
+
+    def extract_combined(cleaned_text):
+        calls.append("combined")
+        return None   # failed validation
+
+    for module in (upload_resume, bulk_ingest):
+        monkeypatch.setattr(module, "extract_structured_json", extract_structured_json)
+        monkeypatch.setattr(module, "infer_traits", infer_traits)
+        monkeypatch.setattr(module, "extract_combined", extract_combined)
+    return calls
+
+
+def test_upload_runs_both_passes_concurrently(passes):
+    structured_json, trait_json = asyncio.run(upload_resume.run_llm_passes("resume text", "two_pass"))
+    assert (structured_json, trait_json) == (STRUCTURED, TRAITS)
+    assert sorted(passes) == ["pass1", "pass2"]
+
+
+def test_upload_falls_back_to_two_passes_after_invalid_combined(passes):
+    structured_json, trait_json = asyncio.run(upload_resume.run_llm_passes("resume text", "combined"))
+    assert (structured_json, trait_json) == (STRUCTURED, TRAITS)
+    assert passes[0] == "combined" and sorted(passes[1:]) == ["pass1", "pass2"]
+
+
+def test_upload_uses_a_valid_combined_result(passes, monkeypatch):
+    monkeypatch.setattr(upload_resume, "extract_combined", lambda text: (STRUCTURED, TRAITS))
+    assert asyncio.run(upload_resume.run_llm_passes("resume text", "combined")) == (STRUCTURED, TRAITS)
+    assert passes == []
+
+
+def test_bulk_runs_pass_two_on_the_trait_pool(passes, monkeypatch, tmp_path):
+    monkeypatch.setattr(bulk_ingest, "JSON_DIR", str(tmp_path))
+    monkeypatch.setattr(bulk_ingest, "TRAITS_DIR", str(tmp_path))
+    item = {"file": "ada.pdf", "name": "ada", "cleaned_text": "resume text"}
+
+    with ThreadPoolExecutor(max_workers=1) as trait_pool:
+        result = bulk_ingest._run_llm_passes(item, trait_pool, "two_pass")
+
+    assert "error" not in result
+    assert (result["structured_json"], result["trait_json"]) == (STRUCTURED, TRAITS)
+    assert (tmp_path / "ada_structured.json").exists() and (tmp_path / "ada_traits.json").exists()
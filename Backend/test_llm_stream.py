@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from llm_stream import JsonItemStream
+
+COMPLETION = json.dumps({
+    "summary": "Strong backend profile with a \"quoted\" note, braces {like} [these] and a \\ backslash",
+    "questions": [
+        {"question": "Explain {curly} and [square] brackets", "skill": "Python", "summary": "nested"},
+        {"question": "Escaped quote \" and backslash \\ inside", "skill": "SQL"},
+        {"question": "Nested", "details": {"level": "hard", "tags": ["a", "}", "{"]}},
+    ],
+    "summary_after": "ignored",
+})
+
+
+def feed_in_chunks(text, size):
+    parser = JsonItemStream("questions")
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+
+# Chunk size 1 puts a boundary inside every string, escape sequence and brace
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, len(COMPLETION)])
+def test_every_chunk_boundary(size):
+    expected = json.loads(COMPLETION)
+    parser, events = feed_in_chunks(COMPLETION, size)
+    summaries = [value for kind, value in events if kind == "summary"]
+    items = [value for kind, value in events if kind == "item"]
+    assert summaries == [expected["summary"]]
+    assert items == expected["questions"]
+    assert parser.array_done
+
+
+def test_split_between_backslash_and_quote():
+    text = '{"summary": "a\\"b", "questions": [{"q": "x\\\\"}, {"q": "y\\"}"}]}'
+    split = text.index('\\"') + 1
+    parser = JsonItemStream("questions")
+    events = parser.feed(text[:split]) + parser.feed(text[split:])
+    assert events == [("summary", 'a"b'), ("item", {"q": "x\\"}), ("item", {"q": 'y"}'})]
+
+
+def test_summary_inside_item_is_not_top_level():
+    text = '{"questions": [{"q": "one", "summary": "item summary"}], "summary": "late summary"}'
+    _, events = feed_in_chunks(text, 4)
+    assert [kind for kind, _ in events] == ["item"]
+
+
+def test_summary_in_nested_object_is_ignored():
+    text = '{"meta": {"summary": "nested"}, "summary": "top", "questions": []}'
+    _, events = feed_in_chunks(text, 3)
+    assert events == [("summary", "top")]
+
+
+def test_summary_text_inside_a_string_is_ignored():
+    text = '{"intro": "say \\"summary\\": \\"no\\"", "summary": "yes", "questions": []}'
+    _, events = feed_in_chunks(text, 1)
+    assert events == [("summary", "yes")]
+
+
+def test_malformed_item_is_skipped():
+    text = '{"questions": [{"q": "ok"}, {"q": oops}, {"q": "also ok"}]}'
+    _, events = feed_in_chunks(text, 5)
+    assert events == [("item", {"q": "ok"}), ("item", {"q": "also ok"})]
+
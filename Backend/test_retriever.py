@@ -0,0 +1,165 @@
+import json
+import threading
+
+import faiss
+import numpy as np
+import pytest
+
+import faiss_index_factory
+import retriever_api
+from faiss_store import FaissIndexStore
+from retriever import HybridRetriever
+from retriever_api import RetrieverManager
+
+DIM = 8
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.driver.queries.append((query, params))
+        if self.driver.error is not None:
+            raise self.driver.error
+        return [record for record in self.driver.records if record["cid"] in params["ids"]]
+
+
+class FakeDriver:
+    """Stands in for the Neo4j driver; returns the canned records for the requested ids."""
+
+    def __init__(self, records=()):
+        self.records = list(records)
+        self.queries = []
+        self.error = None
+
+    def session(self):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def flat_index(monkeypatch):
+    monkeypatch.setattr(faiss_index_factory, "FAISS_INDEX_TYPE", "flat")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FaissIndexStore(
+        dim=DIM,
+        index_path=str(tmp_path / "candidate_index.faiss"),
+        candidate_ids_path=str(tmp_path / "candidate_ids.json"),
+        snippet_metadata_path=str(tmp_path / "snippet_metadata.json"),
+        wal_path=str(tmp_path / "candidate_index.wal"),
+        vectors_path=str(tmp_path / "candidate_vectors.f32"),
+    )
+    store.load()
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def retriever(store):
+    retriever = HybridRetriever(None, None, "bolt://localhost:7687", "neo4j", "unused", index_store=store)
+    retriever.driver.close()
+    retriever.driver = FakeDriver([
+        {"cid": "1", "score": 2, "paths": ["1 -[HAS_SKILL]-> python"]},
+        {"cid": "2", "score": 0, "paths": ["2 -[HAS_SKILL]-> java"]},
+    ])
+    return retriever
+
+
+def add_snippets(store, rows):
+    """rows: (candidate_id, distance along the first axis from the origin query)."""
+    vectors = np.zeros((len(rows), DIM), dtype=np.float32)
+    vectors[:, 0] = [offset for _, offset in rows]
+    store.add(vectors, [(cid, {"candidate_id": str(cid), "text": f"snippet {i}"}) for i, (cid, _) in enumerate(rows)])
+
+
+def test_graph_scores_use_one_query_for_all_candidates(retriever):
+    scores = retriever.get_graph_scores(["1", "2", "3"], ["python"])
+    assert len(retriever.driver.queries) == 1
+    query, params = retriever.driver.queries[0]
+    assert "UNWIND $ids" in query
+    assert params == {"ids": ["1", "2", "3"], "entities": ["python"]}
+    assert scores == {"1": (2.0, ["1 -[HAS_SKILL]-> python"]), "2": (0.0, ["2 -[HAS_SKILL]-> java"])}
+
+    assert retriever.get_graph_score("3", ["python"]) == (0.0, [])
+    assert retriever.get_graph_scores([], ["python"]) == {}
+    assert len(retriever.driver.queries) == 2
+
+
+def test_graph_query_failure_scores_nothing(retriever):
+    retriever.driver.error = RuntimeError("neo4j down")
+    assert retriever.get_graph_scores(["1"], ["python"]) == {}
+
+
+def test_retrieve_keeps_best_snippet_per_candidate_and_blends_scores(retriever, store):
+    add_snippets(store, [(2, 0.0), (2, 0.1), (1, 1.0), (3, 2.0)])
+    results = retriever.retrieve("Python", top_k=3, query_vector=np.zeros(DIM, dtype=np.float32))
+
+    assert len(retriever.driver.queries) == 1
+    assert sorted(retriever.driver.queries[0][1]["ids"]) == ["1", "2", "3"]
+    by_id = {r["candidate_id"]: r for r in results}
+    assert by_id["2"]["snippet"] == "snippet 0"
+    for r in results:
+        assert r["composite_score"] == pytest.approx(0.6 * r["dense_sim"] + 0.4 * r["graph_score"])
+    assert [r["candidate_id"] for r in results] == ["1", "2", "3"]
+
+
+def test_load_index_swaps_index_and_metadata_together(tmp_path):
+    def write(n):
+        index = faiss.IndexFlatL2(DIM)
+        index.add(np.zeros((n, DIM), dtype=np.float32))
+        faiss.write_index(index, str(tmp_path / "index.faiss"))
+        with open(tmp_path / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump({str(i): {"candidate_id": str(i)} for i in range(n)}, f)
+
+    write(2)
+    retriever = HybridRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.json"),
+                                "bolt://localhost:7687", "neo4j", "unused")
+    retriever.driver.close()
+    before = retriever._index_snapshot
+    assert retriever.ntotal() == 2
+
+    write(3)
+    retriever.load_index(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.json"))
+    assert retriever.ntotal() == 3 and len(retriever.snippet_metadata) == 3
+    assert before[0].ntotal == 2 and len(before[1]) == 2
+
+
+def test_retriever_manager_builds_one_shared_retriever(monkeypatch, store):
+    built = []
+
+    class CountingRetriever:
+        def __init__(self, **kwargs):
+            built.append(self)
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(retriever_api, "HybridRetriever", CountingRetriever)
+    monkeypatch.setattr(retriever_api, "faiss_store", store)
+    manager = RetrieverManager()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(r is built[0] for r in results)
+
+    manager.close()
+    assert built[0].closed
+    assert manager.get() is not built[0]
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import skill_gap
+from skill_gap import _calculate_trait_match, _ndjson_response, _scatter
+from skill_index import SkillIndexSnapshot
+from test_skill_index import JOBS, ROWS
+
+
+@pytest.fixture
+def snapshot():
+    return SkillIndexSnapshot.from_rows(ROWS)
+
+
+@pytest.mark.parametrize("job_skills, required_traits", JOBS)
+def test_score_job_matches_scalar_scoring(snapshot, job_skills, required_traits):
+    skill_pct, trait_pct, final_score = snapshot.score_job(job_skills, required_traits)
+    for row in range(len(snapshot)):
+        candidate_skills = snapshot.candidate_skills(row)
+        expected_skill = round(len(job_skills & candidate_skills) / len(job_skills) * 100, 1) if job_skills else 0.0
+        expected_trait = _calculate_trait_match(snapshot.candidate_traits(row), required_traits)
+        assert skill_pct[row] == pytest.approx(expected_skill)
+        assert trait_pct[row] == pytest.approx(expected_trait)
+        assert final_score[row] == pytest.approx(round(expected_skill * 0.70 + expected_trait * 0.30, 1))
+
+
+def test_score_jobs_matches_scalar_trait_match(snapshot):
+    _, trait_pct, _ = snapshot.score_jobs(JOBS)
+    for j, (_, required_traits) in enumerate(JOBS):
+        for row in range(len(snapshot)):
+            assert trait_pct[j, row] == pytest.approx(
+                _calculate_trait_match(snapshot.candidate_traits(row), required_traits)
+            )
+
+
+def test_scatter_places_rows_and_zero_fills():
+    skill, final = _scatter(5, np.array([3, 0]), (np.array([10.0, 20.0]), np.array([1.0, 2.0])))
+    assert list(skill) == [20.0, 0.0, 0.0, 10.0, 0.0]
+    assert list(final) == [2.0, 0.0, 0.0, 1.0, 0.0]
+
+
+def test_ndjson_response_streams_header_then_records():
+    response = _ndjson_response({"total": 2}, iter([{"rank": 1}, {"rank": 2}]))
+    assert response.media_type == "application/x-ndjson"
+
+    async def read_body():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    body = asyncio.run(read_body())
+    assert [json.loads(line) for line in body.splitlines()] == [{"total": 2}, {"rank": 1}, {"rank": 2}]
+
+
+class FakeAsyncDb:
+    def __init__(self, job_row):
+        self.job_row = job_row
+
+    async def fetchone(self, query, params=None):
+        return self.job_row
+
+
+class FixedSkillIndex:
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def snapshot(self):
+        return self._snapshot
+
+
+@pytest.fixture
+def ranking(monkeypatch, snapshot):
+    """Calls /rank-candidates for a job needing python + sql against the ROWS pool."""
+    monkeypatch.setattr(skill_gap, "async_db", FakeAsyncDb(("Backend", ["Python", "SQL"], {"leadership": 0.5})))
+    monkeypatch.setattr(skill_gap, "candidate_skill_index", FixedSkillIndex(snapshot))
+
+    def rank(limit=None, offset=0, min_score=None, stream=False):
+        async def call():
+            response = await skill_gap.rank_candidates(
+                job_id=1, limit=limit, offset=offset, min_score=min_score, stream=stream, retrieval="exact",
+                semantic_top_n=10, semantic_weight=0.3, nprobe=None, ef_search=None
+            )
+            if stream:
+                return "".join([chunk async for chunk in response.body_iterator])
+            return json.loads(response.body)
+        return asyncio.run(call())
+    return rank
+
+
+def test_rank_candidates_pages_cover_the_full_ranking(ranking):
+    full = ranking()
+    assert full["total_candidates"] == 4
+    assert [c["rank"] for c in full["candidates"]] == [1, 2, 3, 4]
+    scores = [c["final_score"] for c in full["candidates"]]
+    assert scores == sorted(scores, reverse=True)
+
+    pages = ranking(limit=3)["candidates"] + ranking(limit=3, offset=3)["candidates"]
+    assert pages == full["candidates"]
+    assert ranking(limit=2, offset=10)["candidates"] == []
+
+
+def test_rank_candidates_min_score_filters_before_paging(ranking):
+    full = ranking()["candidates"]
+    threshold = full[1]["final_score"]
+    filtered = ranking(min_score=threshold)
+    assert filtered["total_candidates"] == len([c for c in full if c["final_score"] >= threshold])
+    assert all(c["final_score"] >= threshold for c in filtered["candidates"])
+
+
+def test_rank_candidates_stream_matches_json(ranking):
+    lines = [json.loads(line) for line in ranking(limit=3, stream=True).splitlines()]
+    header, records = lines[0], lines[1:]
+    page = ranking(limit=3)
+    assert records == page.pop("candidates")
+    assert header == page
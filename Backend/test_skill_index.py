@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from skill_index import SkillIndexSnapshot, TRAIT_KEYS, normalize_skills
+
+# (id, name, leadership, communication, analytical_thinking, ownership, problem_solving, attention_to_detail, skills)
+ROWS = [
+    (1, "Ada", 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, ["python", "sql"]),
+    (2, "Grace", 0.2, 0.4, 0.9, 0.8, 0.7, 0.9, ["java", "sql", "docker"]),
+    (4, None, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, []),
+    (7, "Linus", 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, ["c", "git", "python"]),
+]
+
+JOBS = [
+    ({"python", "sql", "kubernetes"}, {"leadership": 0.8, "analytical_thinking": 0.6}),
+    ({"java"}, {"communication": 0.5, "ownership": 0.5, "attention_to_detail": 1.0}),
+    (set(), {}),
+    ({"rust", "go"}, {"problem_solving": 0.4, "unknown_trait": 0.3}),
+]
+
+
+@pytest.fixture
+def snapshot():
+    return SkillIndexSnapshot.from_rows(ROWS)
+
+
+def assert_same_snapshot(a, b):
+    assert list(a.candidate_ids) == list(b.candidate_ids)
+    assert a.names == b.names
+    assert np.array_equal(a.traits, b.traits)
+    for row in range(len(a)):
+        assert a.candidate_skills(row) == b.candidate_skills(row)
+
+
+def test_normalize_skills_formats():
+    assert normalize_skills('{Flutter,"Dart", kotlin}') == {"flutter", "dart", "kotlin"}
+    assert normalize_skills('["Python", "SQL"]') == {"python", "sql"}
+    assert normalize_skills(["Languages: Python, Go", ["Docker", ["AWS"]], " ", "Git"]) == \
+        {"python", "go", "docker", "aws", "git"}
+    assert normalize_skills(None) == set()
+
+
+def test_from_rows(snapshot):
+    assert len(snapshot) == 4
+    assert list(snapshot.candidate_ids) == [1, 2, 4, 7]
+    assert snapshot.names[2] == "Candidate 4"
+    assert snapshot.candidate_skills(1) == {"java", "sql", "docker"}
+    assert snapshot.candidate_skills(2) == set()
+    assert snapshot.candidate_traits(0)["leadership"] == pytest.approx(0.9)
+
+
+def test_with_rows_matches_full_build():
+    changed = (2, "Grace H.", 0.3, 0.4, 0.9, 0.8, 0.7, 0.9, ["cobol", "sql"])
+    added = (3, "Alan", 0.6, 0.6, 1.0, 0.6, 1.0, 0.8, ["math", "python"])
+    incremental = SkillIndexSnapshot.from_rows(ROWS[:2]).with_rows([added]).with_rows(ROWS[2:] + [changed])
+    full = SkillIndexSnapshot.from_rows(sorted([ROWS[0], changed, added] + ROWS[2:], key=lambda row: row[0]))
+    assert_same_snapshot(incremental, full)
+
+
+def test_rows_for_drops_unknown_ids(snapshot):
+    assert list(snapshot.rows_for([7, 3, 1, 100])) == [3, 0]
+    assert list(snapshot.rows_for([])) == []
+    assert list(SkillIndexSnapshot.from_rows([]).rows_for([1])) == []
+
+
+@pytest.mark.parametrize("job_skills, required_traits", JOBS)
+def test_score_job_matches_per_candidate_scoring(snapshot, job_skills, required_traits):
+    skill_pct, trait_pct, final_score = snapshot.score_job(job_skills, required_traits)
+    for row in range(len(snapshot)):
+        candidate_skills = snapshot.candidate_skills(row)
+        expected_skill = round(len(job_skills & candidate_skills) / len(job_skills) * 100, 1) if job_skills else 0.0
+        assert skill_pct[row] == pytest.approx(expected_skill)
+        assert final_score[row] == pytest.approx(round(skill_pct[row] * 0.70 + trait_pct[row] * 0.30, 1))
+
+
+def test_score_job_on_rows_matches_full_scoring(snapshot):
+    rows = snapshot.rows_for([7, 2])
+    for job_skills, required_traits in JOBS:
+        full = snapshot.score_job(job_skills, required_traits)
+        subset = snapshot.score_job(job_skills, required_traits, rows)
+        for full_scores, subset_scores in zip(full, subset):
+            assert np.allclose(full_scores[rows], subset_scores)
+
+
+def test_score_jobs_matches_score_job(snapshot):
+    skill_pct, trait_pct, final_score = snapshot.score_jobs(JOBS)
+    assert skill_pct.shape == (len(JOBS), len(snapshot))
+    for j, (job_skills, required_traits) in enumerate(JOBS):
+        single = snapshot.score_job(job_skills, required_traits)
+        assert np.allclose(skill_pct[j], single[0])
+        assert np.allclose(trait_pct[j], single[1])
+        assert np.allclose(final_score[j], single[2])
+
+
+def test_trait_match_ignores_unknown_and_zero_weights(snapshot):
+    scores = snapshot.trait_match({"leadership": 1.0, "charisma": 1.0, "ownership": 0.0})
+    # The unknown trait still counts towards the total weight
+    assert np.allclose(scores, np.round(snapshot.traits[:, TRAIT_KEYS.index("leadership")] / 2 * 100, 1))
+
+
+def test_top_k_orders_by_score_then_id(snapshot):
+    scores = np.array([50.0, 80.0, 50.0, 80.0])
+    assert list(snapshot.top_k(scores)) == [1, 3, 0, 2]
+    assert list(snapshot.top_k(scores, k=3)) == [1, 3, 0]
+    assert list(snapshot.top_k(scores, k=1, rows=np.array([0, 2]))) == [0]
@@ -0,0 +1,127 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+import team_fit
+from skill_index import SkillIndexSnapshot
+from team_fit import (
+    BEST_CANDIDATES_MAX_BEAM_WIDTH, BEST_CANDIDATES_MAX_SELECT, BestCandidatesRequest, best_candidates_for_team,
+    compute_skill_proximity, compute_trait_complementarity, fetch_shared_skills_batch, pairwise_components,
+    score_pool_against_team, select_team_addition, to_team_profile
+)
+from test_skill_index import ROWS
+
+
+@pytest.fixture
+def snapshot():
+    return SkillIndexSnapshot.from_rows(ROWS)
+
+
+def profile(index, row):
+    return index.candidate_traits(row), sorted(index.candidate_skills(row))
+
+
+def test_pairwise_components_match_scalar_scoring(snapshot):
+    rows = np.arange(len(snapshot))
+    trait_comp, jaccard = pairwise_components(snapshot, rows, rows)
+    assert trait_comp.shape == jaccard.shape == (len(snapshot), len(snapshot))
+    for a in rows:
+        traits_a, skills_a = profile(snapshot, a)
+        for b in rows:
+            traits_b, skills_b = profile(snapshot, b)
+            assert trait_comp[a, b] == pytest.approx(compute_trait_complementarity(traits_a, [traits_b]))
+            assert jaccard[a, b] == pytest.approx(compute_skill_proximity(skills_a, skills_b))
+
+
+@pytest.mark.parametrize("team_rows", [[0], [0, 1], [1, 2, 3]])
+def test_score_pool_against_team_matches_scalar_scoring(snapshot, team_rows):
+    scores = score_pool_against_team(snapshot, np.array(team_rows))
+    team = [profile(snapshot, row) for row in team_rows]
+    team_skills = {skill for _, skills in team for skill in skills}
+
+    for row in range(len(snapshot)):
+        traits, skills = profile(snapshot, row)
+        trait_comp = compute_trait_complementarity(traits, [member_traits for member_traits, _ in team])
+        # team_fit_analysis without the Neo4j shared-skill bonus
+        avg_pairwise = np.mean([
+            np.clip(compute_trait_complementarity(traits, [member_traits]) * 0.50
+                    + compute_skill_proximity(skills, member_skills) * 0.40, 0.0, 1.0)
+            for member_traits, member_skills in team
+        ])
+        uniqueness = len([s for s in skills if s not in team_skills]) / max(len(skills), 1)
+        overall = np.clip(trait_comp * 0.45 + avg_pairwise * 0.35 + uniqueness * 0.20, 0.0, 1.0)
+
+        assert scores["trait_complementarity"][row] == pytest.approx(trait_comp)
+        assert scores["avg_pairwise"][row] == pytest.approx(avg_pairwise)
+        assert scores["uniqueness"][row] == pytest.approx(uniqueness)
+        assert scores["overall"][row] == pytest.approx(overall)
+
+
+def test_greedy_selection_takes_the_best_marginal_candidate(snapshot):
+    team_rows, pool_rows = np.array([0]), np.array([1, 2, 3])
+    rows, marginals, total = select_team_addition(snapshot, team_rows, pool_rows, size=2, beam_width=1)
+
+    first = score_pool_against_team(snapshot, team_rows)["overall"]
+    assert rows[0] == snapshot.top_k(first, 1, pool_rows)[0]
+    assert marginals[0] == pytest.approx(first[rows[0]])
+    second = score_pool_against_team(snapshot, np.array([0, rows[0]]))["overall"]
+    assert rows[1] == snapshot.top_k(second, 1, pool_rows[pool_rows != rows[0]])[0]
+    assert total == pytest.approx(sum(marginals))
+
+
+def test_beam_search_is_never_worse_than_greedy(snapshot):
+    team_rows, pool_rows = np.array([3]), np.array([0, 1, 2])
+    _, _, greedy = select_team_addition(snapshot, team_rows, pool_rows, size=2, beam_width=1)
+    rows, _, beam = select_team_addition(snapshot, team_rows, pool_rows, size=2, beam_width=3)
+    assert len(set(rows)) == 2 and set(rows) <= set(pool_rows)
+    assert beam >= greedy - 1e-9
+
+
+
+@pytest.mark.parametrize("overrides", [
+    {"select": BEST_CANDIDATES_MAX_SELECT + 1},
+    {"select": 1, "strategy": "beam", "beam_width": BEST_CANDIDATES_MAX_BEAM_WIDTH + 1},
+])
+def test_best_candidates_rejects_oversized_searches(overrides):
+    request = BestCandidatesRequest(team_member_ids=[1], **overrides)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(best_candidates_for_team(request))
+    assert error.value.status_code == 400
+
+class RecordingNeo4j:
+    def __init__(self, records=(), error=None):
+        self.records = list(records)
+        self.error = error
+        self.calls = []
+
+    def run(self, cypher, params=None):
+        self.calls.append(params)
+        if self.error is not None:
+            raise self.error
+        return self.records
+
+
+def test_shared_skills_for_all_members_in_one_query(monkeypatch):
+    neo4j = RecordingNeo4j([{"member_id": "12", "shared": 3}])
+    monkeypatch.setattr(team_fit, "neo4j_client", neo4j)
+
+    assert fetch_shared_skills_batch(5, [11, 12, 13]) == {11: 0, 12: 3, 13: 0}
+    assert neo4j.calls == [{"cid": "5", "member_ids": ["11", "12", "13"]}]
+    assert fetch_shared_skills_batch(5, []) == {}
+    assert len(neo4j.calls) == 1
+
+
+def test_shared_skills_graph_error_scores_zero(monkeypatch):
+    monkeypatch.setattr(team_fit, "neo4j_client", RecordingNeo4j(error=RuntimeError("neo4j down")))
+    assert fetch_shared_skills_batch(5, [11, 12]) == {11: 0, 12: 0}
+
+
+def test_team_profile_skills_match_the_skill_index():
+    profile = {
+        "name": "Ada",
+        "traits": {"leadership": 0.9},
+        "structured_json": {"skills": ["Languages: Python, SQL", ["Docker"]], "experience": []},
+    }
+    assert to_team_profile(profile)["skills"] == ["docker", "python", "sql"]
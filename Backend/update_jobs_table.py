@@ -26,6 +26,17 @@ def update_jobs_table():
             ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
         """)
 
+        # Cached job embedding (see job_embeddings.py)
+        cur.execute("""
+            ALTER TABLE jobs 
+            ADD COLUMN IF NOT EXISTS embedding BYTEA;
+        """)
+
+        cur.execute("""
+            ALTER TABLE jobs 
+            ADD COLUMN IF NOT EXISTS embedding_version TEXT;
+        """)
+
         conn.commit()
         print("✅ Jobs table updated successfully with all required columns!")
 
@@ -1,21 +1,29 @@
 import os
+import asyncio
 import shutil
 import json
 import numpy as np
-import faiss
 import logging
 import traceback
 import psycopg2  # ← Added for specific exception handling
 
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
 from resume_cleaner import clean_resume_file, save_cleaned_text
 from llm_processor import extract_structured_json, save_json_output
 from llm_pass_2 import infer_traits, save_traits_json
-from embedding import model, flatten_resume_json
+from llm_combined import extract_combined, EXTRACTION_MODES, DEFAULT_EXTRACTION_MODE
+from embedding import flatten_resume_json
+from embedding_service import embedding_service
 from db import get_connection, release_connection
 from graph_builder import insert_candidate_graph
+from faiss_store import faiss_store
+from dedup import compute_fingerprint, find_duplicate_resume, save_fingerprint, init_fingerprint_table
+from candidate_repository import candidate_repository
+from skill_index import save_candidate_skills, candidate_skill_index
+from candidate_embeddings import save_candidate_embeddings, init_candidate_embeddings_table
 
 # -------------------------
 # Setup directories
@@ -24,93 +32,76 @@ UPLOAD_DIR = "Uploads"
 CLEANED_DIR = "Cleaned"
 JSON_DIR = "JSON"
 TRAITS_DIR = "Traits_JSON"
-FAISS_INDEX_DIR = "FAISS_Index"
 
-for directory in [UPLOAD_DIR, CLEANED_DIR, JSON_DIR, TRAITS_DIR, FAISS_INDEX_DIR]:
+for directory in [UPLOAD_DIR, CLEANED_DIR, JSON_DIR, TRAITS_DIR]:
     os.makedirs(directory, exist_ok=True)
 
-# -------------------------
-# FAISS paths
-# -------------------------
-FAISS_INDEX_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_index.faiss')
-CANDIDATE_IDS_PATH = os.path.join(FAISS_INDEX_DIR, 'candidate_ids.json')
-SNIPPET_METADATA_PATH = os.path.join(FAISS_INDEX_DIR, 'snippet_metadata.json')
-
 # -------------------------
 # FastAPI Router
 # -------------------------
 router = APIRouter()
 
 
-def load_or_create_faiss_index():
-    """Load FAISS index + metadata safely."""
-    if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(CANDIDATE_IDS_PATH):
-        try:
-            index = faiss.read_index(FAISS_INDEX_PATH)
-            with open(CANDIDATE_IDS_PATH, 'r', encoding='utf-8') as f:
-                candidate_ids = json.load(f)
-
-            snippet_metadata = {}
-            if os.path.exists(SNIPPET_METADATA_PATH):
-                with open(SNIPPET_METADATA_PATH, 'r', encoding='utf-8') as f:
-                    snippet_metadata = json.load(f)
-
-            logging.info(f"Loaded FAISS index with {index.ntotal} vectors")
-            return index, candidate_ids, snippet_metadata
-        except Exception as e:
-            logging.warning(f"Failed to load FAISS files: {e}. Creating fresh index.")
-
-    # Create new index
-    dim = model.get_sentence_embedding_dimension()
-    index = faiss.IndexFlatL2(dim)
-    return index, [], {}
-
-
-def save_faiss_data(index, candidate_ids, snippet_metadata):
-    """Persist FAISS index and metadata."""
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    with open(CANDIDATE_IDS_PATH, 'w', encoding='utf-8') as f:
-        json.dump(candidate_ids, f, indent=2)
-    with open(SNIPPET_METADATA_PATH, 'w', encoding='utf-8') as f:
-        json.dump(snippet_metadata, f, indent=4)
-    logging.info(f"FAISS index saved. Total vectors: {index.ntotal}")
-
-
-@router.post("/upload-resume/")
-async def upload_resume(file: UploadFile = File(...)):
-    conn = None
-    cur = None
+@router.on_event("startup")
+def startup_event():
+    # Load the checkpoint and replay any write-ahead log left by a crash
+    faiss_store.load()
+    try:
+        init_fingerprint_table()
+    except Exception as e:
+        logging.warning(f"Could not ensure resume_fingerprints table: {e}")
+    try:
+        init_candidate_embeddings_table()
+    except Exception as e:
+        logging.warning(f"Could not ensure candidate_embeddings table: {e}")
+
+
+@router.on_event("shutdown")
+def shutdown_event():
+    faiss_store.close()
+
+
+def snippet_metadata_entry(resume_id, structured_json: dict, resume_text: str) -> dict:
+    """Metadata stored next to a resume's FAISS vector and returned by /search."""
+    return {
+        "candidate_id": str(resume_id),
+        "name": structured_json.get('name', 'Unknown'),
+        "text": resume_text[:600] + "..." if len(resume_text) > 600 else resume_text
+    }
+
+
+async def run_llm_passes(cleaned_text: str, extraction_mode: str = DEFAULT_EXTRACTION_MODE):
+    """
+    "combined" asks for the structured resume and traits in one prompt and falls
+    back to the two-pass path when that response fails validation.
+
+    In "two_pass" mode, LLM pass 1 (structured JSON) and pass 2 (traits) only
+    depend on the cleaned text, so they run side by side in worker threads:
+    latency is max(pass1, pass2) and the event loop stays free meanwhile.
+    """
+    if extraction_mode == "combined":
+        combined = await run_in_threadpool(extract_combined, cleaned_text)
+        if combined:
+            return combined
+        logging.warning("Combined extraction failed validation; falling back to two-pass extraction.")
+
+    structured_json, trait_json = await asyncio.gather(
+        run_in_threadpool(extract_structured_json, cleaned_text),
+        run_in_threadpool(infer_traits, cleaned_text),
+    )
+    return structured_json, trait_json
+
+
+def store_resume(cleaned_text: str, structured_json: dict, trait_json: dict, fingerprint: dict,
+                 resume_embedding: np.ndarray, resume_text: str):
+    """
+    Persist one resume (blocking; run in the threadpool), then add it to FAISS
+    and record the mapping. Returns (resume_id, faiss_index).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
     try:
-        name = os.path.splitext(file.filename)[0]
-
-        # 1. Save uploaded file
-        upload_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # 2. Clean resume
-        cleaned_text = clean_resume_file(upload_path)
-        cleaned_path = os.path.join(CLEANED_DIR, f"{name}_cleaned.txt")
-        save_cleaned_text(cleaned_text, cleaned_path)
-
-        # 3. LLM Pass 1 - Structured JSON
-        structured_json = extract_structured_json(cleaned_text)
-        json_path = os.path.join(JSON_DIR, f"{name}_structured.json")
-        save_json_output(structured_json, json_path)
-
-        # 4. LLM Pass 2 - Traits
-        trait_json = infer_traits(cleaned_text)
-        traits_path = os.path.join(TRAITS_DIR, f"{name}_traits.json")
-        save_traits_json(trait_json, traits_path)
-
-        # 5. Create embedding (using only resume text for search consistency)
-        resume_text = flatten_resume_json(structured_json)
-        resume_embedding = model.encode(resume_text).astype('float32')
-
         # ====================== DATABASE OPERATIONS ======================
-        conn = get_connection()
-        cur = conn.cursor()
-
         # Insert into resumes table
         cur.execute("""
             INSERT INTO resumes (name, email, phone, raw_text, cleaned_text)
@@ -146,23 +137,34 @@ async def upload_resume(file: UploadFile = File(...)):
             trait_json.get('attention_to_detail', 0.0)
         ))
 
-        # ====================== FAISS OPERATIONS ======================
-        index, candidate_ids, snippet_metadata = load_or_create_faiss_index()
+        # Fingerprint for future duplicate checks
+        save_fingerprint(cur, resume_id, fingerprint)
 
-        # Add embedding to FAISS
-        index.add(np.expand_dims(resume_embedding, axis=0))
-        faiss_idx = index.ntotal - 1
+        # Normalised skills for the ranking index
+        save_candidate_skills(cur, resume_id, structured_json)
 
-        # Update metadata
-        candidate_ids.append(int(resume_id))
-        snippet_metadata[str(faiss_idx)] = {
-            "candidate_id": str(resume_id),
-            "name": structured_json.get('name', 'Unknown'),
-            "text": resume_text[:600] + "..." if len(resume_text) > 600 else resume_text
-        }
+        # Persisted embedding read by compare / team-fit
+        save_candidate_embeddings(cur, [(resume_id, resume_embedding)])
+
+        # Commit before the durable FAISS write so a failed commit never leaves a searchable vector
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        cur.close()
+        release_connection(conn)
+        raise
 
-        # Save FAISS data to disk
-        save_faiss_data(index, candidate_ids, snippet_metadata)
+    candidate_skill_index.invalidate([resume_id])
+    candidate_repository.invalidate(resume_id)
+
+    try:
+        # ====================== FAISS OPERATIONS ======================
+        # Appended to the in-memory index + write-ahead log; checkpointed periodically.
+        # A crash before the mapping below is committed is repaired by bulk_ingest's reconcile.
+        faiss_idx = faiss_store.add(
+            np.expand_dims(resume_embedding, axis=0),
+            [(int(resume_id), snippet_metadata_entry(resume_id, structured_json, resume_text))]
+        )[0]
 
         # ====================== Sync FAISS with PostgreSQL ======================
         cur.execute("""
@@ -171,12 +173,83 @@ async def upload_resume(file: UploadFile = File(...)):
             ON CONFLICT (resume_id) 
             DO UPDATE SET faiss_index = EXCLUDED.faiss_index
         """, (resume_id, faiss_idx))
-
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+    return resume_id, faiss_idx
+
+
+@router.post("/upload-resume/")
+async def upload_resume(
+    file: UploadFile = File(...),
+    extraction_mode: str = Form(DEFAULT_EXTRACTION_MODE)
+):
+    if extraction_mode not in EXTRACTION_MODES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"extraction_mode must be one of {list(EXTRACTION_MODES)}"}
+        )
+
+    try:
+        name = os.path.splitext(file.filename)[0]
+
+        # 1. Save uploaded file
+        upload_path = os.path.join(UPLOAD_DIR, file.filename)
+        with open(upload_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+        # 2. Clean resume
+        cleaned_text = clean_resume_file(upload_path)
+        cleaned_path = os.path.join(CLEANED_DIR, f"{name}_cleaned.txt")
+        save_cleaned_text(cleaned_text, cleaned_path)
+
+        # 2b. Duplicate check — short-circuits before any LLM or embedding work
+        fingerprint = compute_fingerprint(cleaned_text)
+        duplicate = await run_in_threadpool(find_duplicate_resume, fingerprint)
+        if duplicate:
+            logging.info(f"Duplicate of resume {duplicate['resume_id']} ({duplicate['match_type']}) — skipping ingestion")
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "duplicate": True,
+                    "message": f"Resume already exists ({duplicate['match_type']} match)",
+                    "resume_id": int(duplicate["resume_id"]),
+                    "match_type": duplicate["match_type"],
+                    "hamming_distance": duplicate["hamming_distance"],
+                    "files": {
+                        "uploaded": upload_path,
+                        "cleaned": cleaned_path
+                    }
+                }
+            )
+
+        # 3 + 4. LLM Pass 1 (Structured JSON) and Pass 2 (Traits) — concurrently or as one combined call
+        structured_json, trait_json = await run_llm_passes(cleaned_text, extraction_mode)
+
+        json_path = os.path.join(JSON_DIR, f"{name}_structured.json")
+        save_json_output(structured_json, json_path)
+
+        traits_path = os.path.join(TRAITS_DIR, f"{name}_traits.json")
+        save_traits_json(trait_json, traits_path)
+
+        # 5. Create embedding (using only resume text for search consistency)
+        resume_text = flatten_resume_json(structured_json)
+        resume_embedding = (await embedding_service.embed([resume_text]))[0]
+
+        # ====================== DATABASE + FAISS OPERATIONS ======================
+        resume_id, faiss_idx = await run_in_threadpool(
+            store_resume, cleaned_text, structured_json, trait_json, fingerprint, resume_embedding, resume_text
+        )
 
         # Neo4j Graph Sync (non-blocking)
         try:
-            insert_candidate_graph(
+            await run_in_threadpool(
+                insert_candidate_graph,
                 resume_id=resume_id,
                 structured_json=structured_json,
                 traits=trait_json
@@ -190,6 +263,7 @@ async def upload_resume(file: UploadFile = File(...)):
             content={
                 "success": True,
                 "message": "Resume processed successfully",
+                "duplicate": False,
                 "resume_id": int(resume_id),
                 "faiss_index": int(faiss_idx),
                 "name": structured_json.get('name', 'Unknown'),
@@ -209,8 +283,6 @@ async def upload_resume(file: UploadFile = File(...)):
 
     except psycopg2.errors.UniqueViolation as db_err:
         logging.error(f"Database unique violation: {db_err}")
-        if conn:
-            conn.rollback()
         return JSONResponse(
             status_code=500, 
             content={"error": "Duplicate FAISS index detected. Please try again."}
@@ -220,15 +292,7 @@ async def upload_resume(file: UploadFile = File(...)):
         logging.error("Error in upload_resume: %s", str(e))
         logging.error(traceback.format_exc())
 
-        if conn:
-            conn.rollback()
         return JSONResponse(
             status_code=500, 
             content={"error": str(e)}
         )
-
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            release_connection(conn)
\ No newline at end of file